@@ -3,6 +3,7 @@ Gemini AI Agents for the Diabetic Recipe App.
 """
 
 from .conversation_agent import ConversationAgent
+from .gemini_client import GeminiClientManager, get_gemini_client
 from .meal_plan_agent import MealPlanAgent
 
-__all__ = ["ConversationAgent", "MealPlanAgent"]
\ No newline at end of file
+__all__ = ["ConversationAgent", "GeminiClientManager", "get_gemini_client", "MealPlanAgent"]
\ No newline at end of file
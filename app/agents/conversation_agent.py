@@ -3,12 +3,15 @@ Conversation Agent - Handles natural language understanding with Gemini.
 Uses Function Calling to interact with the recipe database.
 """
 
-import json
-from typing import Any, Callable, Dict, List, Optional
+import asyncio
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
 
-import google.generativeai as genai
 from google.generativeai.types import FunctionDeclaration, Tool
 
+from app.agents.conversation_memory import ConversationMemory
+from app.agents.gemini_client import get_gemini_client
+from app.agents.prompt_encoding import RecipeTable, restore_text
+from app.agents.rate_limiter import is_quota_error
 from app.config import get_settings
 from app.models.health import HealthMetrics
 
@@ -43,30 +46,51 @@ class ConversationAgent:
     - Use search_recipes when user asks for food recommendations
     - Use get_meal_suggestion when user asks about specific meals (breakfast/lunch/dinner)
     - Extract preferences like "light", "quick", "no seafood" from user messages
+    - When a request needs several searches, call all the functions in one turn
+    - Refer to recipes by name; never mention the ids in function results
     """
 
-    def __init__(self, recipe_search_func: Callable):
+    def __init__(self, recipe_search_func: Callable, recipe_batch_search_func: Optional[Callable] = None):
         """
         Initialize the conversation agent.
 
         Args:
             recipe_search_func: Function to search recipes (injected for testability)
+            recipe_batch_search_func: Optional function searching several categories
+                in one query: (categories, max_carbs=...) -> {category: recipes}
         """
-        settings = get_settings()
-        genai.configure(api_key=settings.gemini_api_key)
-
+        self.client = get_gemini_client()
         self.recipe_search_func = recipe_search_func
-        self.functions = self._define_functions()
-        self.tools = Tool(function_declarations=self.functions)
+        self.recipe_batch_search_func = recipe_batch_search_func
 
-        self.model = genai.GenerativeModel(
-            "gemini-3-flash-preview", tools=[self.tools], system_instruction=self.SYSTEM_PROMPT
-        )
+        # Shared by all users; only the chat handle is per user
+        self.model = self.client.get_model("conversation", self._model_config)
 
         self.chat = None
         self.health_metrics: Optional[HealthMetrics] = None
 
-    def _define_functions(self) -> List[FunctionDeclaration]:
+        # Bounded history; turns hold the lock so compaction never races a send
+        settings = get_settings()
+        self.memory = ConversationMemory(
+            self.client,
+            token_budget=settings.chat_history_token_budget,
+            keep_messages=settings.chat_history_keep_messages,
+        )
+        self._lock = asyncio.Lock()
+        # Tool turns so far; part of every short id, so ids kept in the
+        # history never name a different recipe in a later turn
+        self._tool_turns = 0
+        # Short id -> recipe name of every table sent, for ids that leak into replies
+        self._recipe_names: Dict[str, str] = {}
+
+    @classmethod
+    def _model_config(cls) -> Dict[str, Any]:
+        """Keyword arguments for the shared conversation model."""
+        tools = Tool(function_declarations=cls._define_functions())
+        return {"tools": [tools], "system_instruction": cls.SYSTEM_PROMPT}
+
+    @staticmethod
+    def _define_functions() -> List[FunctionDeclaration]:
         """Define the functions that Gemini can call."""
         return [
             FunctionDeclaration(
@@ -86,6 +110,11 @@ class ConversationAgent:
                             "type": "string",
                             "description": "User preference keywords like: light, filling, quick, simple",
                         },
+                        "exclude_ingredients": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "description": "Ingredients or groups the user wants to avoid, e.g. seafood, peanuts",
+                        },
                     },
                 },
             ),
@@ -107,12 +136,15 @@ class ConversationAgent:
             ),
         ]
 
-    def start_conversation(self, health_metrics: HealthMetrics) -> None:
+    def start_conversation(
+        self, health_metrics: HealthMetrics, history: Optional[List[Dict[str, str]]] = None
+    ) -> None:
         """
         Start a new conversation with user health context.
 
         Args:
             health_metrics: User's calculated health metrics
+            history: Earlier {"role", "content"} messages to restore, if any
         """
         self.health_metrics = health_metrics
 
@@ -129,17 +161,22 @@ class ConversationAgent:
         """
 
         # Initialize chat with context
-        self.chat = self.model.start_chat(
-            history=[
-                {"role": "user", "parts": [context]},
-                {
-                    "role": "model",
-                    "parts": [
-                        "Understood! I will recommend suitable meals based on your nutritional targets. What would you like to eat today?"
-                    ],
-                },
-            ]
-        )
+        messages = [
+            {"role": "user", "parts": [context]},
+            {
+                "role": "model",
+                "parts": [
+                    "Understood! I will recommend suitable meals based on your nutritional targets. What would you like to eat today?"
+                ],
+            },
+        ]
+        for message in self.memory.trim_restored(history or []):
+            role = "model" if message["role"] == "assistant" else "user"
+            messages.append({"role": role, "parts": [message["content"]]})
+
+        self.chat = self.client.start_chat(self.model, messages)
+        self.memory.reset()
+        self._recipe_names.clear()
 
     async def process_message(self, user_message: str) -> Dict[str, Any]:
         """
@@ -154,69 +191,249 @@ class ConversationAgent:
         if self.chat is None:
             return {"type": "error", "message": "Conversation not started. Please register first."}
 
-        try:
-            # Send message to Gemini
-            response = await self.chat.send_message_async(user_message)
+        async with self._lock:
+            try:
+                result = await self._process(user_message)
+            except Exception as e:
+                return self._error_response(e)
 
-            # Check if Gemini wants to call a function
-            for part in response.parts:
-                if hasattr(part, "function_call") and part.function_call:
-                    return await self._handle_function_call(part.function_call)
+            self._compact_history()
+            return result
 
-            # Regular text response
-            return {"type": "text", "message": response.text}
+    async def _process(self, user_message: str) -> Dict[str, Any]:
+        """One turn of process_message, called under the turn lock."""
+        # Send message to Gemini
+        response = await self.client.send_message(self.chat, user_message)
 
+        # Check if Gemini wants to call functions (possibly several at once)
+        function_calls = [
+            part.function_call for part in response.parts
+            if hasattr(part, "function_call") and part.function_call
+        ]
+        if function_calls:
+            return await self._handle_function_calls(function_calls)
+
+        # Regular text response
+        return {"type": "text", "message": self._restore_names(response.text)}
+
+    def _restore_names(self, text: str) -> str:
+        """Reply text with any short recipe ids replaced by the recipe names."""
+        return restore_text(text, self._recipe_names)
+
+    def _table(self, recipes: List[Dict[str, Any]], prefix: str) -> RecipeTable:
+        """A recipe table for a tool result, remembering its short ids."""
+        table = RecipeTable(recipes, prefix=prefix)
+        self._recipe_names.update(table.names())
+        return table
+
+    def _compact_history(self) -> None:
+        """Keep the chat history within its token budget after a turn."""
+        try:
+            self.memory.compact(self.chat, self._lock)
         except Exception as e:
-            msg = str(e)
-            if "429" in msg or "ResourceExhausted" in msg or "Quota" in msg or "quota" in msg.lower():
-                 return {"type": "error", "message": "⚠️ AI Service Usage Limit Reached. Please try again later."}
-            return {"type": "error", "message": f"Sorry, something went wrong: {msg}"}
+            print(f"ConversationAgent history compaction error: {e}")
 
-    async def _handle_function_call(self, function_call) -> Dict[str, Any]:
+    async def stream_message(self, user_message: str) -> AsyncIterator[Dict[str, Any]]:
         """
-        Handle a function call from Gemini.
+        Process a user message, yielding events as soon as they are available.
+
+        Events:
+            {"event": "token", "data": {"text": ...}} for each piece of model text
+            {"event": "recipes", "data": {...}} with tool results, before the follow-up
+            {"event": "done", "data": {...}} with the same dict process_message returns;
+            its message has short recipe ids replaced, the token events do not
 
         Args:
-            function_call: The function call object from Gemini
+            user_message: The user's input message
+        """
+        if self.chat is None:
+            yield {"event": "done", "data": {"type": "error", "message": "Conversation not started. Please register first."}}
+            return
+
+        async with self._lock:
+            try:
+                function_calls = []
+                text = []
+                async for chunk in self.client.stream_message(self.chat, user_message):
+                    for part in chunk.parts:
+                        if hasattr(part, "function_call") and part.function_call:
+                            function_calls.append(part.function_call)
+                        elif part.text:
+                            text.append(part.text)
+                            yield {"event": "token", "data": {"text": part.text}}
+
+                if not function_calls:
+                    yield {"event": "done", "data": {"type": "text", "message": self._restore_names("".join(text))}}
+                    return
+
+                executed = await self._execute_functions(function_calls)
+                if executed is None:
+                    yield {"event": "done", "data": self._unknown_function_response(function_calls)}
+                    return
+
+                # Send tool results to the client before waiting on Gemini's follow-up
+                result, result_message = executed
+                yield {"event": "recipes", "data": result}
+
+                text = []
+                async for chunk in self.client.stream_message(self.chat, result_message):
+                    for part in chunk.parts:
+                        if part.text:
+                            text.append(part.text)
+                            yield {"event": "token", "data": {"text": part.text}}
+
+                yield {"event": "done", "data": {**result, "message": self._restore_names("".join(text))}}
+
+            except Exception as e:
+                yield {"event": "done", "data": self._error_response(e)}
+            finally:
+                self._compact_history()
+
+    async def _handle_function_calls(self, function_calls: List[Any]) -> Dict[str, Any]:
+        """
+        Handle the function calls of one Gemini response.
+
+        Args:
+            function_calls: The function call objects from Gemini
 
         Returns:
             Dict with response including function results
         """
+        executed = await self._execute_functions(function_calls)
+        if executed is None:
+            return self._unknown_function_response(function_calls)
+
+        # Send all results back to Gemini in one message for a natural language response
+        result, result_message = executed
+        follow_up = await self.client.send_message(self.chat, result_message)
+
+        return {**result, "message": self._restore_names(follow_up.text)}
+
+    async def _execute_functions(self, function_calls: List[Any]) -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Run every tool Gemini asked for in one turn, concurrently.
+
+        A single call keeps its own response shape. Several calls return
+        {"type": "multiple_results", "results": [...], "recipes": [...]}
+        with the recipes of all calls merged, and one result message
+        answering each call in order.
+
+        Args:
+            function_calls: The function call objects from Gemini
+
+        Returns:
+            (response fields, result message for Gemini), or None if no function is known
+        """
+        multiple = len(function_calls) > 1
+        self._tool_turns += 1
+        turn = self._tool_turns
+        # Short-id prefixes unique per turn and call (3R1, or 3.2R1 with several calls)
+        executed = await asyncio.gather(*(
+            self._execute_function(call, prefix=f"{turn}.{i + 1}" if multiple else f"{turn}")
+            for i, call in enumerate(function_calls)
+        ))
+        if all(item is None for item in executed):
+            return None
+
+        results, messages, recipes = [], [], []
+        for call, item in zip(function_calls, executed):
+            if item is None:
+                messages.append(f"{call.name}: unknown function, no results.")
+                continue
+            result, result_message = item
+            results.append(result)
+            messages.append(f"{call.name}:\n{result_message}" if multiple else result_message)
+            recipes.extend(self._result_recipes(result))
+
+        result_message = "\n\n".join(messages)
+        self.memory.track_tool_result(result_message, recipes)
+
+        if not multiple:
+            return results[0], result_message
+
+        # Same recipe from two searches is listed once
+        merged = list({recipe.get("id"): recipe for recipe in recipes}.values())
+        return {"type": "multiple_results", "results": results, "recipes": merged}, result_message
+
+    @staticmethod
+    def _result_recipes(result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """All recipes of one tool result, flattening grouped suggestions."""
+        recipes = result.get("recipes") or []
+        if isinstance(recipes, dict):
+            return [recipe for group in recipes.values() for recipe in group]
+        return list(recipes)
+
+    @staticmethod
+    def _unknown_function_response(function_calls: List[Any]) -> Dict[str, Any]:
+        names = ", ".join(call.name for call in function_calls)
+        return {"type": "unknown_function", "message": f"Unknown function: {names}"}
+
+    async def _execute_function(self, function_call, prefix: str = "") -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Run one tool Gemini asked for.
+
+        Tool functions are synchronous, so they run in worker threads to
+        keep the event loop free; independent sub-queries run concurrently.
+
+        Args:
+            function_call: The function call object from Gemini
+            prefix: Prepended to the short recipe ids of this call's tables
+
+        Returns:
+            (response fields, result message for Gemini), or None if the function is unknown
+        """
         func_name = function_call.name
-        func_args = dict(function_call.args)
+        # Repeated proto values (e.g. exclude_ingredients) become plain lists
+        func_args = {
+            key: value if isinstance(value, (str, int, float, bool)) else list(value)
+            for key, value in function_call.args.items()
+        }
 
         # Execute the appropriate function
         if func_name == "search_recipes":
-            recipes = self.recipe_search_func(**func_args)
-
-            # Send results back to Gemini for natural language response
-            result_message = f"Search results: {json.dumps(recipes, ensure_ascii=False)}"
-            follow_up = await self.chat.send_message_async(result_message)
+            recipes = await asyncio.to_thread(self.recipe_search_func, **func_args)
 
+            result_message = f"Search results (one recipe per row):\n{self._table(recipes, prefix + 'R').encode()}"
             return {
                 "type": "recipes_found",
                 "recipes": recipes,
-                "message": follow_up.text,
                 "function_called": func_name,
                 "function_args": func_args,
-            }
+            }, result_message
 
         elif func_name == "get_meal_suggestion":
             # For meal suggestions, search multiple categories
             meal_type = func_args.get("meal_type", "lunch")
             carb_budget = func_args.get("carb_budget", self.health_metrics.max_carbs_per_meal)
 
-            # Get protein and vegetable options
-            proteins = self.recipe_search_func(category="protein", max_carbs=carb_budget)
-            vegetables = self.recipe_search_func(category="vegetable", max_carbs=carb_budget)
+            # Get protein and vegetable options: one batched query, or both searches at once
+            if self.recipe_batch_search_func is not None:
+                grouped = await asyncio.to_thread(
+                    self.recipe_batch_search_func, ["protein", "vegetable"], max_carbs=carb_budget
+                )
+                proteins, vegetables = grouped["protein"], grouped["vegetable"]
+            else:
+                proteins, vegetables = await asyncio.gather(
+                    asyncio.to_thread(self.recipe_search_func, category="protein", max_carbs=carb_budget),
+                    asyncio.to_thread(self.recipe_search_func, category="vegetable", max_carbs=carb_budget),
+                )
 
             combined = {"proteins": proteins, "vegetables": vegetables}
-            result_message = f"Food options for {meal_type}: {json.dumps(combined, ensure_ascii=False)}"
-            follow_up = await self.chat.send_message_async(result_message)
-
-            return {"type": "meal_suggestion", "recipes": combined, "message": follow_up.text, "meal_type": meal_type}
-
-        return {"type": "unknown_function", "message": f"Unknown function: {func_name}"}
+            result_message = (
+                f"Food options for {meal_type}.\n"
+                f"PROTEINS:\n{self._table(proteins, prefix + 'P').encode()}\n"
+                f"VEGETABLES:\n{self._table(vegetables, prefix + 'V').encode()}"
+            )
+            return {"type": "meal_suggestion", "recipes": combined, "meal_type": meal_type}, result_message
+
+        return None
+
+    @staticmethod
+    def _error_response(error: Exception) -> Dict[str, Any]:
+        """Map an exception from Gemini or a tool to an error response."""
+        if is_quota_error(error):
+            return {"type": "error", "message": "⚠️ AI Service Usage Limit Reached. Please try again later."}
+        return {"type": "error", "message": f"Sorry, something went wrong: {error}"}
 
     def reset_conversation(self) -> None:
         """Reset the conversation history."""
@@ -0,0 +1,204 @@
+"""
+Bounded chat history for ConversationAgent.
+Old tool results shrink to recipe ids, and once the history exceeds its
+token budget the oldest turns are folded into a running summary.
+"""
+
+import asyncio
+from typing import Any, Dict, List, Optional
+
+from app.agents.gemini_client import GeminiClientManager
+from app.agents.rate_limiter import estimate_tokens
+
+
+SUMMARY_PROMPT = """
+Summarize this conversation between a diabetic user and a meal assistant
+in at most 150 words. Keep the user's preferences, allergies, dislikes and
+goals, and the recipes already suggested (with their ids). Plain text only.
+
+{previous}
+CONVERSATION:
+{transcript}
+"""
+
+
+def _message_text(content: Any) -> str:
+    """Text of a history entry; function calls count as their name and arguments."""
+    texts = []
+    for part in content.parts:
+        if part.text:
+            texts.append(part.text)
+        elif part.function_call:
+            texts.append(f"{part.function_call.name}({dict(part.function_call.args)})")
+    return "\n".join(texts)
+
+
+def _has_function_call(content: Any) -> bool:
+    return any(part.function_call for part in content.parts)
+
+
+class ConversationMemory:
+    """
+    Keeps one chat's history within a token budget.
+
+    The first `head_messages` entries (the health-context exchange) are
+    never touched. Each tool result is registered with a compact form and
+    replaced by it once it falls out of the last `keep_messages` entries.
+    When the history is still over budget, the oldest turns are folded
+    into a summary exchange placed right after the head.
+    """
+
+    def __init__(
+        self,
+        client: GeminiClientManager,
+        token_budget: int = 4000,
+        keep_messages: int = 6,
+        head_messages: int = 2
+    ):
+        """
+        Args:
+            client: Shared Gemini client, used for the summaries
+            token_budget: History size (estimated tokens) that triggers summarization
+            keep_messages: Most recent entries always kept verbatim
+            head_messages: Leading entries never compacted
+        """
+        self.client = client
+        self.model = client.get_model("summary", lambda: {})
+        self.token_budget = token_budget
+        self.keep_messages = keep_messages
+        self.head_messages = head_messages
+
+        self.summary: Optional[str] = None
+        self._compact_results: Dict[str, str] = {}
+        self._task: Optional[asyncio.Task] = None
+
+        self.history_tokens = 0
+        self.peak_history_tokens = 0
+        self.summaries = 0
+        self.folded_messages = 0
+        self.truncated_results = 0
+
+    def track_tool_result(self, message: str, recipes: List[Dict[str, Any]]) -> None:
+        """Register the compact form of a tool result sent to Gemini."""
+        listed = ", ".join(f"{r.get('name')} ({r.get('id')})" for r in recipes) or "none"
+        self._compact_results[message] = f"[Earlier tool result, recipes: {listed}]"
+
+    def trim_restored(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """
+        Most recent {"role", "content"} messages that fit in the budget.
+
+        Used when a chat is rebuilt from stored history; the result always
+        starts with a user message.
+        """
+        kept, tokens = [], 0
+        for message in reversed(messages):
+            tokens += estimate_tokens(message["content"])
+            if tokens > self.token_budget and len(kept) >= self.keep_messages:
+                break
+            kept.append(message)
+        kept.reverse()
+
+        while kept and kept[0]["role"] != "user":
+            kept.pop(0)
+        self.folded_messages += len(messages) - len(kept)
+        return kept
+
+    def measure(self, history: List[Any]) -> int:
+        """Estimated tokens of a history, recorded in the counters."""
+        self.history_tokens = estimate_tokens(*(_message_text(content) for content in history))
+        self.peak_history_tokens = max(self.peak_history_tokens, self.history_tokens)
+        return self.history_tokens
+
+    def compact(self, chat: Any, lock: asyncio.Lock) -> None:
+        """
+        Shrink old tool results, and start a summary if still over budget.
+
+        Call at the end of a turn while holding `lock`.
+        """
+        history = list(chat.history)
+        recent = len(history) - self.keep_messages
+        changed = False
+
+        for i in range(self.head_messages, max(recent, self.head_messages)):
+            compact = self._compact_results.pop(_message_text(history[i]), None)
+            if compact is not None:
+                history[i] = {"role": history[i].role, "parts": [compact]}
+                self.truncated_results += 1
+                changed = True
+
+        if changed:
+            chat.history = history
+
+        if self.measure(chat.history) > self.token_budget and (self._task is None or self._task.done()):
+            # Summarize off the request path; the swap waits for the turn lock
+            self._task = asyncio.create_task(self.summarize(chat, lock))
+
+    def _fold_point(self, history: List[Any], start: int) -> int:
+        """
+        Index of the first entry kept after folding.
+
+        It must be a user message that does not answer a function call,
+        so roles keep alternating and no call loses its result.
+        """
+        for i in range(len(history) - self.keep_messages, start, -1):
+            if history[i].role == "user" and not _has_function_call(history[i - 1]):
+                return i
+        return start
+
+    async def summarize(self, chat: Any, lock: asyncio.Lock) -> None:
+        """Fold the oldest turns of `chat` into the running summary."""
+        history = list(chat.history)
+        start = self.head_messages + (2 if self.summary else 0)
+        cut = self._fold_point(history, start)
+        if cut <= start:
+            return
+
+        folded = history[start:cut]
+        transcript = "\n".join(f"{content.role}: {_message_text(content)}" for content in folded)
+        previous = f"PREVIOUS SUMMARY:\n{self.summary}\n" if self.summary else ""
+
+        try:
+            response = await self.client.generate_content(
+                self.model, SUMMARY_PROMPT.format(previous=previous, transcript=transcript)
+            )
+            summary = response.text.strip()
+        except Exception as e:
+            print(f"ConversationMemory summary error: {e}")
+            # Keep the gist without Gemini: the latest folded text, clipped
+            summary = " ".join(filter(None, [self.summary, transcript]))[-self.token_budget:]
+
+        async with lock:
+            current = chat.history
+            # Give up if the history was reset or rewritten meanwhile
+            if len(current) < cut or current[cut - 1] is not folded[-1]:
+                return
+
+            chat.history = current[:self.head_messages] + [
+                {"role": "user", "parts": [f"Summary of our earlier conversation: {summary}"]},
+                {"role": "model", "parts": ["Got it, I'll keep that in mind."]},
+            ] + current[cut:]
+
+            self.summary = summary
+            self.summaries += 1
+            self.folded_messages += len(folded)
+            self.measure(chat.history)
+
+    def reset(self) -> None:
+        """Forget the summary and pending compactions."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self.summary = None
+        self._compact_results.clear()
+        self.history_tokens = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-session history counters."""
+        return {
+            "history_tokens": self.history_tokens,
+            "peak_history_tokens": self.peak_history_tokens,
+            "token_budget": self.token_budget,
+            "summaries": self.summaries,
+            "folded_messages": self.folded_messages,
+            "truncated_tool_results": self.truncated_results,
+            "summarizing": self._task is not None and not self._task.done(),
+        }
@@ -0,0 +1,158 @@
+"""
+Process-wide Gemini client.
+Configures the SDK once and shares model objects between all users.
+"""
+
+import asyncio
+import threading
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+import google.generativeai as genai
+
+from app.agents.rate_limiter import GeminiRateLimiter, estimate_tokens
+from app.config import get_settings
+
+
+class GeminiClientManager:
+    """
+    Owns the Gemini configuration and model objects.
+
+    Models are stateless and built once per configuration; per-user state
+    lives only in the lightweight ChatSession handles from start_chat.
+    All outbound calls go through send_message / stream_message /
+    generate_content so that timeouts, concurrency limits and the shared
+    rate limiter apply everywhere.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-3-flash-preview",
+        transport: Optional[str] = None,
+        timeout_seconds: Optional[float] = None,
+        max_concurrency: int = 16,
+        limiter: Optional[GeminiRateLimiter] = None
+    ):
+        """
+        Args:
+            api_key: Gemini API key
+            model_name: Model used by all agents
+            transport: grpc, grpc_asyncio or rest (SDK default if None)
+            timeout_seconds: Per-request timeout
+            max_concurrency: Maximum in-flight requests per worker
+            limiter: Rate limiter for all calls (unlimited defaults if None)
+        """
+        genai.configure(api_key=api_key, transport=transport or None)
+
+        self.model_name = model_name
+        self.max_concurrency = max_concurrency
+        self.request_options = {"timeout": timeout_seconds} if timeout_seconds else {}
+        self.limiter = limiter or GeminiRateLimiter()
+
+        self._models: Dict[str, genai.GenerativeModel] = {}
+        self._lock = threading.Lock()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.in_flight = 0
+
+    def get_model(self, key: str, factory: Callable[[], Dict[str, Any]]) -> genai.GenerativeModel:
+        """
+        Return the shared model for a key, building it on first use.
+
+        Args:
+            key: Name of the model configuration (e.g. "conversation")
+            factory: Returns the GenerativeModel keyword arguments
+        """
+        model = self._models.get(key)
+        if model is None:
+            with self._lock:
+                model = self._models.get(key)
+                if model is None:
+                    model = genai.GenerativeModel(self.model_name, **factory())
+                    self._models[key] = model
+        return model
+
+    def start_chat(self, model: genai.GenerativeModel, history: List[Dict]) -> genai.ChatSession:
+        """Create a per-user chat handle on a shared model."""
+        return model.start_chat(history=history)
+
+    @staticmethod
+    def _chat_tokens(chat: genai.ChatSession, content: Any) -> int:
+        """Estimate prompt tokens of a chat turn; the whole history is resent."""
+        history = (part.text for message in chat.history for part in message.parts)
+        return estimate_tokens(content, *history)
+
+    async def _call(self, coroutine_factory) -> Any:
+        """Run one attempt under the concurrency limit."""
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                return await coroutine_factory()
+            finally:
+                self.in_flight -= 1
+
+    async def send_message(self, chat: genai.ChatSession, content: Any, **kwargs) -> Any:
+        """Send a chat message through the rate limiter."""
+        return await self.limiter.run(
+            lambda: self._call(
+                lambda: chat.send_message_async(content, request_options=self.request_options, **kwargs)
+            ),
+            tokens=self._chat_tokens(chat, content)
+        )
+
+    async def stream_message(self, chat: genai.ChatSession, content: Any) -> AsyncIterator[Any]:
+        """Send a chat message and yield response chunks as they arrive."""
+        response = await self.limiter.run(
+            lambda: self._call(
+                lambda: chat.send_message_async(content, stream=True, request_options=self.request_options)
+            ),
+            tokens=self._chat_tokens(chat, content)
+        )
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                async for chunk in response:
+                    yield chunk
+            finally:
+                self.in_flight -= 1
+
+    async def generate_content(self, model: genai.GenerativeModel, prompt: Any, **kwargs) -> Any:
+        """Generate content through the rate limiter."""
+        return await self.limiter.run(
+            lambda: self._call(
+                lambda: model.generate_content_async(prompt, request_options=self.request_options, **kwargs)
+            ),
+            tokens=estimate_tokens(prompt)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Client counters."""
+        return {
+            "model": self.model_name,
+            "models_built": sorted(self._models),
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "rate_limiter": self.limiter.stats(),
+        }
+
+
+@lru_cache()
+def get_gemini_client() -> GeminiClientManager:
+    """Get the process-wide Gemini client."""
+    settings = get_settings()
+    return GeminiClientManager(
+        api_key=settings.gemini_api_key,
+        model_name=settings.gemini_model,
+        transport=settings.gemini_transport,
+        timeout_seconds=settings.gemini_timeout_seconds,
+        max_concurrency=settings.gemini_max_concurrency,
+        limiter=GeminiRateLimiter(
+            requests_per_minute=settings.gemini_requests_per_minute,
+            tokens_per_minute=settings.gemini_tokens_per_minute,
+            max_queue=settings.gemini_max_queue,
+            queue_timeout_seconds=settings.gemini_queue_timeout_seconds,
+            max_retries=settings.gemini_max_retries,
+            backoff_seconds=settings.gemini_backoff_seconds,
+            max_backoff_seconds=settings.gemini_max_backoff_seconds
+        )
+    )
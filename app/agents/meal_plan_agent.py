@@ -3,13 +3,30 @@ Meal Plan Agent - Generates personalized meal plans with Gemini.
 Uses Structured Output for reliable JSON responses.
 """
 
+import asyncio
 import json
+from collections import Counter
+from dataclasses import asdict
+from functools import lru_cache
 from typing import Any, Dict, List, Optional
 
-import google.generativeai as genai
-
+from app.agents.gemini_client import get_gemini_client
+from app.agents.prompt_encoding import RecipeTable, compact_recipe
+from app.agents.rate_limiter import is_quota_error
 from app.config import get_settings
 from app.models.health import HealthMetrics
+from app.services.meal_plan_solver import MealPlanSolver
+from app.services.response_cache import get_response_cache, make_cache_key
+from app.services.weekly_plan import (
+    WEEK_DAYS,
+    build_shopping_list,
+    clean_day,
+    day_from_solver,
+    empty_meals,
+    enforce_variety,
+    group_by_category,
+    weekly_summary,
+)
 
 
 class MealPlanAgent:
@@ -22,13 +39,27 @@ class MealPlanAgent:
     def __init__(self):
         """Initialize the meal plan agent."""
         settings = get_settings()
-        genai.configure(api_key=settings.gemini_api_key)
+        self.client = get_gemini_client()
 
-        # Configure model for JSON output
-        self.model = genai.GenerativeModel(
-            "gemini-3-flash-preview", generation_config={"response_mime_type": "application/json"}
+        # Shared model configured for JSON output
+        self.model = self.client.get_model(
+            "meal_plan", lambda: {"generation_config": {"response_mime_type": "application/json"}}
         )
 
+        # Identical prompt inputs give identical plans, so reuse earlier responses
+        self.cache = get_response_cache() if settings.response_cache_enabled else None
+
+    def _cache_get(self, kind: str, payload: Dict[str, Any]) -> tuple:
+        """Look up a cached response; returns (key, value or None)."""
+        if self.cache is None:
+            return None, None
+        key = make_cache_key(kind, {"model": self.model.model_name, **payload})
+        return key, self.cache.get(key)
+
+    def _cache_set(self, key: Optional[str], value: Dict[str, Any]) -> None:
+        if self.cache is not None and key is not None:
+            self.cache.set(key, value)
+
     async def generate_daily_plan(
         self,
         health_metrics: HealthMetrics,
@@ -48,8 +79,17 @@ class MealPlanAgent:
         Returns:
             Structured meal plan as dictionary
         """
+        cache_key, cached = self._cache_get("daily_plan", {
+            "metrics": asdict(health_metrics),
+            "recipes": available_recipes,
+            "preferences": user_preferences,
+            "language": language,
+        })
+        if cached is not None:
+            return cached
 
         # Build the prompt
+        table = RecipeTable(available_recipes)
         prompt = f"""
         Create a diabetic-friendly daily meal plan based on the following:
         
@@ -63,8 +103,8 @@ class MealPlanAgent:
         USER PREFERENCES:
         {user_preferences or "No specific preferences"}
         
-        AVAILABLE RECIPES:
-        {json.dumps(available_recipes, ensure_ascii=False, indent=2)}
+        AVAILABLE RECIPES (one per row; refer to recipes by their id):
+        {table.encode()}
         
         INSTRUCTIONS:
         1. Select recipes to create balanced meals for breakfast, lunch, dinner, and snacks
@@ -121,23 +161,153 @@ class MealPlanAgent:
         """
 
         try:
-            response = await self.model.generate_content_async(prompt)
-            result = json.loads(response.text)
+            response = await self.client.generate_content(self.model, prompt)
+            result = table.restore(json.loads(response.text))
 
             # Validate the response structure
             self._validate_meal_plan(result, health_metrics)
 
+            self._cache_set(cache_key, result)
             return result
 
         except json.JSONDecodeError as e:
             return self._create_error_response(f"Failed to parse response: {e}")
         except Exception as e:
             print(f"MealPlanAgent Error: {e}")
-            msg = str(e)
-            if "429" in msg or "ResourceExhausted" in msg or "Quota" in msg or "quota" in msg.lower():
+            if is_quota_error(e):
                 return self._create_error_response("⚠️ AI Service Usage Limit Reached. Please try again later.")
             return self._create_error_response(f"Failed to generate meal plan: {e}")
 
+    async def generate_local_plan(
+        self,
+        health_metrics: HealthMetrics,
+        grouped_recipes: Dict[str, List[Dict]],
+        user_preferences: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Generate a daily meal plan with the local solver.
+
+        Recipes are chosen by MealPlanSolver, so the plan is always within
+        limits; Gemini only writes the tips and message. If that call
+        fails the plan is still returned with default text.
+
+        Args:
+            health_metrics: User's health targets
+            grouped_recipes: Recipes grouped by category
+            user_preferences: Optional user preferences
+
+        Returns:
+            Meal plan in the same structure as generate_daily_plan
+        """
+        plan = MealPlanSolver(health_metrics).solve(grouped_recipes)
+        meals = plan.model_dump(include={"breakfast", "lunch", "dinner", "snacks"})
+
+        result = {
+            "meal_plan": meals,
+            "daily_totals": plan.daily_totals.model_dump(),
+            "tips": [
+                "Eat the protein and vegetables before the carbs to soften blood sugar spikes.",
+                "Take a short walk after meals to help lower post-meal glucose.",
+                "Drink water instead of sugary beverages throughout the day.",
+            ],
+            "message": "Here is a balanced plan that keeps every meal within your carb limits.",
+        }
+
+        prompt = f"""
+        A diabetic patient has this meal plan for today:
+        {json.dumps(meals, ensure_ascii=False)}
+        
+        DAILY TOTALS: {json.dumps(result["daily_totals"])}
+        DAILY TARGETS: {health_metrics.daily_calories} kcal, {health_metrics.daily_carbs_limit}g carbs, {health_metrics.protein_target}g protein
+        USER PREFERENCES: {user_preferences or "No specific preferences"}
+        
+        Do not change the plan. Write 3 personalized tips for blood sugar management
+        and a warm, personalized message about the plan, in English.
+        
+        Return this EXACT JSON structure:
+        {{
+            "tips": ["Personalized tip 1", "Personalized tip 2", "Personalized tip 3"],
+            "message": "A warm, personalized message about today's meal plan"
+        }}
+        """
+
+        try:
+            response = await self.client.generate_content(self.model, prompt)
+            text = json.loads(response.text)
+            result["tips"] = text.get("tips") or result["tips"]
+            result["message"] = text.get("message") or result["message"]
+        except Exception as e:
+            print(f"MealPlanAgent Error: {e}")
+
+        return result
+
+    async def regenerate_meal(
+        self,
+        health_metrics: HealthMetrics,
+        meal_type: str,
+        grouped_recipes: Dict[str, List[Dict]],
+        max_carbs: float,
+        max_calories: float,
+        exclude_ids: List[str],
+        user_preferences: Optional[str] = None,
+        use_gemini: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Plan one meal within what the rest of the day leaves.
+
+        With Gemini, the model picks from the candidates in a prompt a
+        fraction of the size of a full day; its pick is re-totalled from
+        the recipe data and replaced by the solver's if it breaks the budget.
+
+        Args:
+            health_metrics: User's health targets
+            meal_type: breakfast, lunch, dinner or snacks
+            grouped_recipes: Candidate recipes grouped by category
+            max_carbs: Carbs left for this meal
+            max_calories: Calories left for this meal
+            exclude_ids: Recipes not to use (the rest of the day and the meal being replaced)
+            user_preferences: Optional preferences for the new meal
+            use_gemini: Let Gemini choose, or use only the solver
+
+        Returns:
+            Meal dict (recipes and totals), or None if no candidate fits
+        """
+        solver = MealPlanSolver(health_metrics)
+        excluded = set(exclude_ids)
+        candidates = [r for recipes in grouped_recipes.values() for r in recipes if r["id"] not in excluded]
+
+        if use_gemini and candidates:
+            table = RecipeTable(candidates)
+            prompt = f"""
+            Choose a new {meal_type} for a diabetic patient.
+            
+            BUDGET FOR THIS MEAL: at most {max_carbs:.0f}g carbs and {max_calories:.0f} kcal
+            PROTEIN TARGET FOR THE DAY: {health_metrics.protein_target}g
+            PREFERENCES: {user_preferences or "None"}
+            
+            AVAILABLE RECIPES (one per row; refer to recipes by their id):
+            {table.encode()}
+            
+            Pick 1-3 recipes that together stay within the budget{"" if meal_type == "snacks" else " and include protein"}.
+            
+            Return JSON with this structure:
+            {{"recipes": ["recipe_id"]}}
+            """
+
+            try:
+                response = await self.client.generate_content(self.model, prompt)
+                ids = table.restore(json.loads(response.text)).get("recipes") or []
+                by_id = {r["id"]: r for r in candidates}
+                chosen = tuple(by_id[rid] for rid in dict.fromkeys(ids) if rid in by_id)
+                meal = solver.build_meal(chosen) if chosen else None
+                if meal is not None and meal.total_carbs <= max_carbs and meal.total_calories <= max_calories:
+                    return meal.model_dump()
+            except Exception as e:
+                print(f"MealPlanAgent Error: {e}")
+
+        meal = solver.solve_meal(meal_type, grouped_recipes, max_carbs, max_calories, excluded)
+        return meal.model_dump() if meal is not None else None
+
     async def adapt_recipe(
         self, recipe: Dict, health_metrics: HealthMetrics, adaptation_request: str
     ) -> Dict[str, Any]:
@@ -152,12 +322,19 @@ class MealPlanAgent:
         Returns:
             Adapted recipe with explanation
         """
+        cache_key, cached = self._cache_get("adapt_recipe", {
+            "recipe": recipe,
+            "max_carbs_per_meal": health_metrics.max_carbs_per_meal,
+            "request": adaptation_request,
+        })
+        if cached is not None:
+            return cached
 
         prompt = f"""
         Adapt this recipe for a diabetic patient:
         
         ORIGINAL RECIPE:
-        {json.dumps(recipe, ensure_ascii=False, indent=2)}
+        {json.dumps(compact_recipe(recipe), ensure_ascii=False)}
         
         USER REQUEST:
         {adaptation_request}
@@ -189,11 +366,12 @@ class MealPlanAgent:
         """
 
         try:
-            response = await self.model.generate_content_async(prompt)
-            return json.loads(response.text)
+            response = await self.client.generate_content(self.model, prompt)
+            result = json.loads(response.text)
+            self._cache_set(cache_key, result)
+            return result
         except Exception as e:
-            msg = str(e)
-            if "429" in msg or "ResourceExhausted" in msg or "Quota" in msg or "quota" in msg.lower():
+            if is_quota_error(e):
                 return {"error": "⚠️ AI Service Usage Limit Reached. Please try again later."}
             return {"error": str(e)}
 
@@ -211,7 +389,15 @@ class MealPlanAgent:
         Returns:
             Weekly meal plan
         """
+        cache_key, cached = self._cache_get("weekly_plan", {
+            "metrics": asdict(health_metrics),
+            "recipes": available_recipes,
+            "preferences": user_preferences,
+        })
+        if cached is not None:
+            return cached
 
+        table = RecipeTable(available_recipes)
         prompt = f"""
         Create a 7-day diabetic-friendly meal plan.
         
@@ -220,8 +406,8 @@ class MealPlanAgent:
         - Max Carbs per Meal: {health_metrics.max_carbs_per_meal}g
         - Daily Carb Limit: {health_metrics.daily_carbs_limit}g
         
-        AVAILABLE RECIPES:
-        {json.dumps(available_recipes, ensure_ascii=False)}
+        AVAILABLE RECIPES (one per row; refer to recipes by their id):
+        {table.encode()}
         
         PREFERENCES: {user_preferences or "None"}
         
@@ -233,7 +419,7 @@ class MealPlanAgent:
         Return JSON with this structure:
         {{
             "weekly_plan": {{
-                "monday": {{"breakfast": [], "lunch": [], "dinner": [], "snacks": []}},
+                "monday": {{"breakfast": ["recipe_id"], "lunch": ["recipe_id"], "dinner": ["recipe_id"], "snacks": ["recipe_id"]}},
                 "tuesday": {{}},
                 "wednesday": {{}},
                 "thursday": {{}},
@@ -251,14 +437,187 @@ class MealPlanAgent:
         """
 
         try:
-            response = await self.model.generate_content_async(prompt)
-            return json.loads(response.text)
+            response = await self.client.generate_content(self.model, prompt)
+            result = json.loads(response.text)
+            # Meals are returned as full recipes, as before the ids were shortened
+            result["weekly_plan"] = table.expand(result.get("weekly_plan") or {})
+            result = table.restore(result)
+            self._cache_set(cache_key, result)
+            return result
         except Exception as e:
-            msg = str(e)
-            if "429" in msg or "ResourceExhausted" in msg or "Quota" in msg or "quota" in msg.lower():
+            if is_quota_error(e):
                 return {"error": "⚠️ AI Service Usage Limit Reached. Please try again later."}
             return {"error": str(e)}
 
+    # Returned with day-by-day weekly plans, which have no single prompt to write them
+    MEAL_PREP_TIPS = [
+        "Cook proteins for two or three days at once and keep them refrigerated.",
+        "Wash and cut the week's vegetables after shopping so sides take minutes.",
+        "Portion carbs into containers ahead of time to keep each meal within budget.",
+    ]
+
+    async def generate_weekly_plan_by_day(
+        self,
+        health_metrics: HealthMetrics,
+        available_recipes: List[Dict],
+        user_preferences: Optional[str] = None,
+        use_gemini: bool = True,
+        max_repeats: int = 3,
+    ) -> Dict[str, Any]:
+        """
+        Generate a 7-day meal plan one day at a time, then merge the days.
+
+        With Gemini, the seven days are requested concurrently as small
+        prompts; a day that fails or comes back malformed is planned by the
+        local solver instead, so one bad response never loses the week.
+        Without Gemini, the solver plans the days in order. Solver days
+        prefer recipes under the weekly limit and penalize earlier uses.
+
+        Variety (at most `max_repeats` uses of a recipe), the shopping list
+        and the summary are then computed from the merged week.
+
+        Args:
+            health_metrics: User's health targets
+            available_recipes: Available recipes
+            user_preferences: Optional preferences
+            use_gemini: Ask Gemini for each day, or use only the solver
+            max_repeats: Most times one recipe may appear in the week
+
+        Returns:
+            Weekly meal plan in the structure of generate_weekly_plan, with
+            recipe ids rather than full recipes per meal
+        """
+        recipes_by_id = {recipe["id"]: recipe for recipe in available_recipes}
+        grouped = group_by_category(available_recipes)
+        solver = MealPlanSolver(health_metrics)
+
+        if use_gemini:
+            table = RecipeTable(available_recipes)
+            days = await asyncio.gather(*(
+                self._generate_day(day, index, table, health_metrics, user_preferences)
+                for index, day in enumerate(WEEK_DAYS)
+            ))
+            week = {day: clean_day(value, recipes_by_id) for day, value in zip(WEEK_DAYS, days)}
+            fallback_days = [day for day in WEEK_DAYS if week[day] is None]
+        else:
+            week = dict.fromkeys(WEEK_DAYS)
+            fallback_days = list(WEEK_DAYS)
+
+        # Solver days account for every recipe already in the week
+        uses = Counter(rid for day in week.values() if day for ids in day.values() for rid in ids)
+        for day in fallback_days:
+            week[day] = self._solve_week_day(solver, grouped, uses, max_repeats)
+            uses.update(rid for ids in week[day].values() for rid in ids)
+
+        replaced, dropped, over_limit = enforce_variety(
+            week, recipes_by_id, max_repeats, health_metrics.max_carbs_per_meal
+        )
+
+        return {
+            "weekly_plan": week,
+            "shopping_list": build_shopping_list(week, recipes_by_id),
+            "meal_prep_tips": self.MEAL_PREP_TIPS,
+            "weekly_summary": weekly_summary(week, recipes_by_id),
+            "generation": {
+                "mode": "daily" if use_gemini else "local",
+                "solver_days": fallback_days,
+                "max_repeats": max_repeats,
+                "replaced_repeats": replaced,
+                "dropped_repeats": dropped,
+                "over_limit_repeats": over_limit,
+                "empty_meals": empty_meals(week),
+            },
+        }
+
+    @staticmethod
+    def _solve_week_day(
+        solver: MealPlanSolver,
+        grouped: Dict[str, List[Dict]],
+        uses: Counter,
+        max_repeats: int
+    ) -> Dict[str, List[str]]:
+        """
+        Plan one day of a week with the solver.
+
+        Recipes at their weekly limit are left out first. If that fills
+        fewer meals than the full catalog would, the day is planned from
+        the full catalog, with earlier uses penalized instead.
+        """
+        capped = {
+            category: [recipe for recipe in recipes if uses[recipe["id"]] < max_repeats]
+            for category, recipes in grouped.items()
+        }
+        day = day_from_solver(solver.solve(capped, prior_uses=uses))
+        if all(day.values()):
+            return day
+
+        reused = day_from_solver(solver.solve(grouped, prior_uses=uses))
+        filled = lambda plan: sum(1 for ids in plan.values() if ids)
+        return reused if filled(reused) > filled(day) else day
+
+    async def _generate_day(
+        self,
+        day: str,
+        index: int,
+        table: RecipeTable,
+        health_metrics: HealthMetrics,
+        user_preferences: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Ask Gemini for one day of a weekly plan.
+
+        Each day features a different seventh of the recipes so that
+        concurrent days don't all pick the same favourites.
+
+        Returns:
+            The parsed day with real recipe ids, or None on any failure
+        """
+        featured = [short_id for i, short_id in enumerate(table.ids) if i % len(WEEK_DAYS) == index]
+
+        cache_key, cached = self._cache_get("weekly_day", {
+            "day": day,
+            "metrics": asdict(health_metrics),
+            "recipes": table.recipes,
+            "preferences": user_preferences,
+        })
+        if cached is not None:
+            return cached
+
+        prompt = f"""
+        Plan {day.capitalize()} of a 7-day diabetic-friendly meal plan.
+        
+        HEALTH TARGETS:
+        - Daily Calories: {health_metrics.daily_calories} kcal
+        - Max Carbs per Meal: {health_metrics.max_carbs_per_meal}g
+        - Daily Carb Limit: {health_metrics.daily_carbs_limit}g
+        - Protein Target: {health_metrics.protein_target}g
+        
+        AVAILABLE RECIPES (one per row; refer to recipes by their id):
+        {table.encode()}
+        
+        FEATURED TODAY: {", ".join(featured) or "none"} (build the day around these so the week has variety)
+        
+        PREFERENCES: {user_preferences or "None"}
+        
+        REQUIREMENTS:
+        1. Keep every meal within the carb limit per meal
+        2. Include protein in breakfast, lunch and dinner
+        
+        Return JSON with this structure:
+        {{"breakfast": ["recipe_id"], "lunch": ["recipe_id"], "dinner": ["recipe_id"], "snacks": ["recipe_id"]}}
+        """
+
+        try:
+            response = await self.client.generate_content(self.model, prompt)
+            result = table.restore(json.loads(response.text))
+        except Exception as e:
+            print(f"MealPlanAgent {day} error: {e}")
+            return None
+
+        if isinstance(result, dict):
+            self._cache_set(cache_key, result)
+        return result
+
     def _validate_meal_plan(self, plan: Dict, metrics: HealthMetrics) -> None:
         """Validate that the meal plan meets requirements."""
         totals = plan.get("daily_totals", {})
@@ -275,3 +634,9 @@ class MealPlanAgent:
     def _create_error_response(self, error_message: str) -> Dict[str, Any]:
         """Create a standardized error response."""
         return {"error": True, "message": error_message, "meal_plan": None}
+
+
+@lru_cache()
+def get_meal_plan_agent() -> MealPlanAgent:
+    """Get the process-wide meal plan agent (it keeps no per-user state)."""
+    return MealPlanAgent()
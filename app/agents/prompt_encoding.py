@@ -0,0 +1,108 @@
+"""
+Compact prompt encoding of recipes.
+Sends Gemini a header line plus CSV rows with short ids instead of
+indented JSON of full database rows, and maps the ids back afterwards.
+"""
+
+import csv
+import io
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# (recipe column, header name) - only what the model needs to choose recipes
+PROMPT_FIELDS: List[Tuple[str, str]] = [
+    ("name", "name"),
+    ("category", "cat"),
+    ("calories", "kcal"),
+    ("carbs", "carbs_g"),
+    ("protein", "protein_g"),
+    ("fat", "fat_g"),
+    ("fiber", "fiber_g"),
+    ("sodium", "sodium_mg"),
+    ("gi_level", "gi"),
+    ("cooking_time_mins", "mins"),
+]
+
+# Columns never useful in a prompt
+OMITTED_FIELDS = {"id", "created_at", "updated_at", "image_url", "diabetic_friendly", "name_en"}
+
+
+def _format_value(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class RecipeTable:
+    """
+    Recipes rendered as a compact table for one prompt.
+
+    Each recipe gets a short id (R1, R2, ...). Gemini is asked to refer
+    to recipes by that id; restore() swaps the real ids back into its
+    response and expand() the full recipe rows.
+    """
+
+    def __init__(self, recipes: List[Dict[str, Any]], prefix: str = "R"):
+        """
+        Args:
+            recipes: Recipe rows (any columns; only PROMPT_FIELDS are sent)
+            prefix: Short id prefix, distinct per table within one prompt
+        """
+        self.recipes = recipes
+        self.rows: Dict[str, Dict[str, Any]] = {f"{prefix}{i + 1}": recipe for i, recipe in enumerate(recipes)}
+        self.ids: Dict[str, Any] = {short_id: recipe.get("id") for short_id, recipe in self.rows.items()}
+
+    def encode(self, fields: Optional[List[Tuple[str, str]]] = None) -> str:
+        """Header line plus one CSV row per recipe."""
+        fields = fields or PROMPT_FIELDS
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["id"] + [header for _, header in fields])
+        for short_id, recipe in zip(self.ids, self.recipes):
+            writer.writerow([short_id] + [_format_value(recipe.get(column)) for column, _ in fields])
+        return buffer.getvalue().rstrip("\n")
+
+    def restore(self, value: Any) -> Any:
+        """Replace short ids anywhere in a parsed response with the real recipe ids."""
+        if isinstance(value, dict):
+            return {key: self.restore(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.restore(item) for item in value]
+        if isinstance(value, str) and value in self.ids:
+            return self.ids[value]
+        return value
+
+    def expand(self, value: Any) -> Any:
+        """Replace short ids anywhere in a parsed response with the full recipe rows."""
+        if isinstance(value, dict):
+            return {key: self.expand(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.expand(item) for item in value]
+        if isinstance(value, str) and value in self.ids:
+            return self.rows[value]
+        return value
+
+    def names(self) -> Dict[str, str]:
+        """Short id -> recipe name, for ids the model mentions in free text."""
+        return {short_id: recipe.get("name") or "" for short_id, recipe in self.rows.items()}
+
+
+def restore_text(text: str, names: Dict[str, str]) -> str:
+    """Replace short ids mentioned in model free text with the recipe names."""
+    if not text or not names:
+        return text
+    # Longest first, so 3.2R1 is never read as 2R1
+    ids = sorted(names, key=len, reverse=True)
+    pattern = re.compile(r"\b(?:" + "|".join(map(re.escape, ids)) + r")\b")
+    return pattern.sub(lambda match: names[match.group(0)], text)
+
+
+def compact_recipe(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """A single recipe without empty values and metadata columns."""
+    return {
+        key: value for key, value in recipe.items()
+        if key not in OMITTED_FIELDS and value not in (None, "", "[]")
+    }
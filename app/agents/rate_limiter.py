@@ -0,0 +1,173 @@
+"""
+Shared rate limiter for outbound Gemini calls.
+Token buckets on requests and tokens per minute, a bounded wait queue
+with deadlines, and jittered exponential retry on quota errors.
+"""
+
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from google.api_core import exceptions as google_exceptions
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be admitted before its deadline."""
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Whether an exception means the Gemini quota was exhausted."""
+    if isinstance(error, (RateLimitExceeded, google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)):
+        return True
+    msg = str(error)
+    return "429" in msg or "ResourceExhausted" in msg or "quota" in msg.lower()
+
+
+def estimate_tokens(*texts: Any) -> int:
+    """Rough token estimate (~4 characters per token)."""
+    return sum(len(str(text)) for text in texts) // 4 + 1
+
+
+class TokenBucket:
+    """Continuously refilling bucket holding up to one minute of budget."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until `amount` is available (0 if it is now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class GeminiRateLimiter:
+    """
+    Admits Gemini calls at the configured rate.
+
+    Callers wait in FIFO order; when more than `max_queue` are waiting,
+    or a caller would wait past its deadline, RateLimitExceeded is raised
+    instead. A quota error pauses admission for every caller for the
+    backoff period, so a burst backs off together instead of retrying
+    into the same wall.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 60,
+        tokens_per_minute: int = 1_000_000,
+        max_queue: int = 100,
+        queue_timeout_seconds: float = 30.0,
+        max_retries: int = 3,
+        backoff_seconds: float = 1.0,
+        max_backoff_seconds: float = 30.0
+    ):
+        """
+        Args:
+            requests_per_minute: Request budget
+            tokens_per_minute: Prompt token budget
+            max_queue: Maximum callers waiting for admission
+            queue_timeout_seconds: Deadline for a call, including retries
+            max_retries: Retries after a quota error
+            backoff_seconds: Base of the exponential backoff
+            max_backoff_seconds: Upper bound of a single backoff
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+
+        self._lock = asyncio.Lock()
+        self._paused_until = 0.0
+
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.quota_errors = 0
+        self.retries = 0
+
+    async def acquire(self, tokens: int, deadline: float) -> None:
+        """Wait until the call fits in both buckets, or raise RateLimitExceeded."""
+        if self.queue_depth >= self.max_queue:
+            self.rejected += 1
+            raise RateLimitExceeded("Gemini request queue is full")
+
+        self.queue_depth += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            async with self._lock:
+                while True:
+                    now = time.monotonic()
+                    wait = max(
+                        self._paused_until - now,
+                        self.requests.wait_time(1, now),
+                        self.tokens.wait_time(tokens, now),
+                    )
+                    if wait <= 0:
+                        self.requests.consume(1)
+                        self.tokens.consume(tokens)
+                        self.admitted += 1
+                        return
+                    if now + wait > deadline:
+                        self.rejected += 1
+                        raise RateLimitExceeded("Timed out waiting for Gemini quota")
+                    await asyncio.sleep(wait)
+        finally:
+            self.queue_depth -= 1
+
+    async def run(self, call: Callable[[], Awaitable[Any]], tokens: int = 1) -> Any:
+        """
+        Run a Gemini call once admitted, retrying on quota errors.
+
+        Args:
+            call: Zero-argument coroutine factory (called once per attempt)
+            tokens: Estimated prompt tokens
+        """
+        deadline = time.monotonic() + self.queue_timeout_seconds
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(tokens, deadline)
+            try:
+                return await call()
+            except Exception as e:
+                if not is_quota_error(e):
+                    raise
+                self.quota_errors += 1
+                if attempt == self.max_retries:
+                    raise
+
+                # Full jitter keeps retries from re-synchronizing
+                delay = random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+                if time.monotonic() + delay > deadline:
+                    raise
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                self.retries += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Limiter counters."""
+        return {
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "quota_errors": self.quota_errors,
+            "retries": self.retries,
+            "paused_for_seconds": round(max(0.0, self._paused_until - time.monotonic()), 2),
+        }
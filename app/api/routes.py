@@ -2,25 +2,224 @@
 API Routes for the Diabetic Recipe App.
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+import asyncio
+import json
+from dataclasses import asdict
+from datetime import date
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, List
 from uuid import uuid4
 
-from app.database.connection import get_db
+from app.config import get_settings
+from app.database.connection import (
+    get_async_db, get_async_session_factory, get_pool_stats, get_tool_session
+)
 from app.models.user import UserProfileRequest, UserPreferences
-from app.models.health import HealthMetricsResponse
+from app.models.health import HealthMetrics, HealthMetricsResponse
 from app.models.recipe import Recipe, MealPlanResponse
 from app.services.health_calculator import HealthCalculator
-from app.services.recipe_repository import RecipeRepository, get_recipes_for_agent
+from app.services.recipe_repository import (
+    AsyncRecipeRepository,
+    get_recipes_by_categories_for_agent,
+    get_recipes_for_agent,
+)
+from app.services.job_queue import FINISHED_STATUSES, QueueFullError, get_job_queue
+from app.services.meal_plan_repository import MEAL_TYPES, AsyncMealPlanRepository
+from app.services.response_cache import get_response_cache
+from app.services.session_backend import create_session_backend
+from app.services.session_store import SessionStore
+from app.agents.gemini_client import get_gemini_client
 from app.agents.conversation_agent import ConversationAgent
-from app.agents.meal_plan_agent import MealPlanAgent
+from app.agents.meal_plan_agent import MealPlanAgent, get_meal_plan_agent
 
 # Create router
 router = APIRouter(prefix="/api", tags=["Diabetic Recipe API"])
 
-# Store active sessions (in production, use Redis or database)
-active_sessions = {}
+# Store active sessions (bounded; evicted sessions are rebuilt from the backend)
+settings = get_settings()
+session_store = SessionStore(
+    backend=create_session_backend(
+        settings.session_backend,
+        settings.redis_url,
+        ttl_seconds=settings.session_ttl_seconds,
+        max_profiles=settings.session_memory_max_profiles
+    ),
+    max_sessions=settings.session_max_entries,
+    ttl_seconds=settings.session_ttl_seconds
+)
+
+
+async def _weekly_plan(
+    meal_plan_agent: MealPlanAgent,
+    metrics: HealthMetrics,
+    exclude_ingredients: List[str],
+    user_prefs: Optional[str],
+    mode: str,
+    async_db: AsyncSession
+) -> dict:
+    """
+    Generate a weekly plan.
+    
+    mode "single" asks Gemini for the whole week at once, "daily" asks for
+    each day concurrently and merges them, "local" uses only the solver.
+    """
+    repo = AsyncRecipeRepository(async_db)
+    if mode == "local":
+        grouped = await repo.get_all_for_meal_planning(
+            metrics.max_carbs_per_meal,
+            exclude_ingredients=exclude_ingredients
+        )
+        recipes = [recipe for group in grouped.values() for recipe in group]
+    else:
+        recipes = await repo.search(
+            gi_level="low",
+            exclude_ingredients=exclude_ingredients,
+            limit=30
+        )
+    
+    if mode == "single":
+        return await meal_plan_agent.generate_weekly_plan(
+            health_metrics=metrics,
+            available_recipes=recipes,
+            user_preferences=user_prefs
+        )
+    
+    return await meal_plan_agent.generate_weekly_plan_by_day(
+        health_metrics=metrics,
+        available_recipes=recipes,
+        user_preferences=user_prefs,
+        use_gemini=mode != "local",
+        max_repeats=settings.weekly_plan_max_repeats
+    )
+
+
+async def _run_weekly_plan_job(payload: dict) -> dict:
+    """Job handler: generate a weekly plan from the inputs captured at submission."""
+    async with get_async_session_factory()() as async_db:
+        return await _weekly_plan(
+            get_meal_plan_agent(),
+            HealthMetrics(**payload["metrics"]),
+            payload["exclude_ingredients"],
+            payload["preferences"],
+            payload.get("mode", "single"),  # Jobs queued before modes existed
+            async_db
+        )
+
+
+# Long generations run in the background; workers are started by the app lifespan
+job_queue = get_job_queue()
+job_queue.register("weekly_plan", _run_weekly_plan_job)
+
+
+def _create_session(user_id: str, profile: UserProfileRequest) -> dict:
+    """
+    Calculate metrics for a user; the conversation agent is created on first chat.
+    """
+    return {
+        "user_id": user_id,
+        "profile": profile,
+        # Calculate health metrics (no AI needed)
+        "metrics": HealthCalculator.calculate(profile),
+        "conversation_agent": None,
+        # Number of backend chat messages reflected in the agent's history
+        "synced_messages": 0
+    }
+
+
+async def _get_session(user_id: str, detail: str = "User not found. Please register first.") -> dict:
+    """Get the user's session, rebuilding it if it was evicted."""
+    session = session_store.get(user_id)
+    if session is None:
+        # Rebuilding reads the profile from the backend, off the event loop
+        session = await asyncio.to_thread(
+            session_store.rebuild, user_id, lambda profile: _create_session(user_id, profile)
+        )
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=detail
+        )
+    return session
+
+
+async def _get_conversation_agent(user_id: str, session: dict) -> ConversationAgent:
+    """
+    The user's conversation agent, up to date with the stored chat history.
+    
+    The agent is created on first use from the stored history; later
+    calls reload the history if another worker has extended it. Backend
+    reads run in a thread, and the agent is only touched on the event
+    loop. The agent outlives the request that created it, so its tools
+    open their own short-lived session per call.
+    """
+    backend = session_store.backend
+    agent = session["conversation_agent"]
+    if agent is not None:
+        if not backend.stores_messages:
+            return agent
+        if await asyncio.to_thread(backend.count_messages, user_id) == session["synced_messages"]:
+            return agent
+    
+    history = await asyncio.to_thread(backend.load_messages, user_id) if backend.stores_messages else []
+    if agent is None:
+        if session["conversation_agent"] is not None:
+            return session["conversation_agent"]  # Created by a concurrent request meanwhile
+        profile = session["profile"]
+        
+        # Create recipe search function for this session; allergies always apply
+        def recipe_search_func(exclude_ingredients=None, **kwargs):
+            excluded = profile.excluded_ingredients() + list(exclude_ingredients or [])
+            with get_tool_session() as db:
+                return get_recipes_for_agent(db, exclude_ingredients=excluded, **kwargs)
+        
+        def recipe_batch_search_func(categories, **kwargs):
+            with get_tool_session() as db:
+                return get_recipes_by_categories_for_agent(
+                    db, categories, exclude_ingredients=profile.excluded_ingredients(), **kwargs
+                )
+        
+        agent = ConversationAgent(recipe_search_func, recipe_batch_search_func)
+        session["conversation_agent"] = agent
+    
+    agent.start_conversation(session["metrics"], history)
+    session["synced_messages"] = len(history)
+    return agent
+
+
+async def _store_turn(user_id: str, session: dict, user_message: str, reply: str) -> None:
+    """Persist a chat turn so other workers can continue the conversation."""
+    backend = session_store.backend
+    if not backend.stores_messages:
+        return
+    
+    await asyncio.to_thread(backend.append_messages, user_id, [("user", user_message), ("assistant", reply)])
+    session["synced_messages"] += 2
+
+
+def _plan_date(value: Optional[str]) -> date:
+    """Plan date from an ISO string; today if not given."""
+    if not value:
+        return date.today()
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid date, expected YYYY-MM-DD."
+        )
+
+
+def _within_limits(plan: dict, metrics: HealthMetrics) -> dict:
+    """Flag a stored plan's daily totals against the user's limits."""
+    totals = plan["daily_totals"]
+    totals["within_limits"] = (
+        totals["carbs"] <= metrics.daily_carbs_limit
+        and totals["calories"] <= metrics.daily_calories
+    )
+    return plan
 
 
 # ============================================================
@@ -28,44 +227,25 @@ active_sessions = {}
 # ============================================================
 
 @router.post("/register", response_model=dict)
-async def register_user(
-    profile: UserProfileRequest,
-    db: Session = Depends(get_db)
-):
+async def register_user(profile: UserProfileRequest):
     """
     Register a new user and calculate their health metrics.
     
     This endpoint:
     1. Validates user profile data
     2. Calculates BMR, TDEE, and nutritional targets
-    3. Initializes conversation agent for the user
+    3. Stores the profile (agents are created on the first chat or meal plan)
     
     Returns health metrics and a session ID.
     """
     # Generate user ID if not provided
     user_id = profile.user_id or str(uuid4())
     
-    # Calculate health metrics (no AI needed)
-    metrics = HealthCalculator.calculate(profile)
-    
-    # Create recipe search function for this session
-    def recipe_search_func(**kwargs):
-        return get_recipes_for_agent(db, **kwargs)
-    
-    # Initialize conversation agent
-    conversation_agent = ConversationAgent(recipe_search_func)
-    conversation_agent.start_conversation(metrics)
-    
-    # Initialize meal plan agent
-    meal_plan_agent = MealPlanAgent()
-    
-    # Store session
-    active_sessions[user_id] = {
-        "profile": profile,
-        "metrics": metrics,
-        "conversation_agent": conversation_agent,
-        "meal_plan_agent": meal_plan_agent
-    }
+    # Store session (the backend writes run off the event loop)
+    await asyncio.to_thread(session_store.backend.clear_messages, user_id)
+    session = _create_session(user_id, profile)
+    metrics = session["metrics"]
+    await asyncio.to_thread(session_store.put, user_id, profile, session, metrics)
     
     return {
         "status": "success",
@@ -82,16 +262,54 @@ async def register_user(
     }
 
 
+@router.post("/register/batch")
+async def register_users_batch(profiles: List[UserProfileRequest]):
+    """
+    Register a cohort of users in one request.
+    
+    Metrics for the whole batch are calculated at once, and profiles are
+    stored in chunks, one backend transaction each, without building
+    agents (a user's session is created on their first chat or meal plan
+    request).
+    
+    Request body: a JSON array of /register profiles.
+    
+    Returns NDJSON, one line per profile in request order:
+    {"index": 0, "user_id": "...", "health_metrics": {...}}
+    """
+    metrics_list = HealthCalculator.calculate_batch(profiles)
+    
+    registrations = [
+        (profile.user_id or str(uuid4()), profile, metrics)
+        for profile, metrics in zip(profiles, metrics_list)
+    ]
+    chunk_size = max(settings.register_batch_chunk_size, 1)
+    
+    def lines():
+        # Sync generator: the backend writes run in the threadpool, off the event loop
+        for start in range(0, len(registrations), chunk_size):
+            chunk = registrations[start:start + chunk_size]
+            session_store.backend.register_profiles(chunk)
+            for index, (user_id, _, metrics) in enumerate(chunk, start):
+                # A live session of a re-registered user still holds the old metrics
+                session_store.discard(user_id)
+                yield json.dumps({"index": index, "user_id": user_id, "health_metrics": asdict(metrics)}) + "\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/health-metrics/{user_id}", response_model=HealthMetricsResponse)
 async def get_health_metrics(user_id: str):
     """Get health metrics for a registered user."""
-    if user_id not in active_sessions:
+    profile = await asyncio.to_thread(session_store.get_profile, user_id)
+    if profile is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="User not found. Please register first."
         )
     
-    metrics = active_sessions[user_id]["metrics"]
+    # Pure calculation, so no need to rebuild an evicted session
+    metrics = HealthCalculator.calculate(profile)
     return HealthMetricsResponse(
         bmr=metrics.bmr,
         tdee=metrics.tdee,
@@ -103,6 +321,36 @@ async def get_health_metrics(user_id: str):
     )
 
 
+@router.get("/sessions/stats")
+async def get_session_stats():
+    """Session store counters (live sessions, evictions, history size)."""
+    return session_store.stats()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Gemini response cache counters (hits, misses, entries)."""
+    return get_response_cache().stats()
+
+
+@router.get("/gemini/stats")
+async def get_gemini_stats():
+    """Shared Gemini client counters (models, in-flight requests)."""
+    return get_gemini_client().stats()
+
+
+@router.get("/db/stats")
+async def get_db_stats():
+    """Connection pool counters per engine, slowest queries and SQLite PRAGMAs."""
+    return get_pool_stats()
+
+
+@router.get("/jobs/stats")
+async def get_job_stats():
+    """Background job counters for this worker (running, deduplicated, failed)."""
+    return job_queue.stats()
+
+
 # ============================================================
 # Chat Endpoints (Conversation Agent)
 # ============================================================
@@ -110,8 +358,7 @@ async def get_health_metrics(user_id: str):
 @router.post("/chat/{user_id}")
 async def chat(
     user_id: str,
-    message: dict,
-    db: Session = Depends(get_db)
+    message: dict
 ):
     """
     Send a message to the conversation agent.
@@ -123,11 +370,7 @@ async def chat(
     
     Request body: {"message": "I want something light"}
     """
-    if user_id not in active_sessions:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found. Please register first."
-        )
+    session = await _get_session(user_id)
     
     user_message = message.get("message", "")
     if not user_message:
@@ -136,27 +379,81 @@ async def chat(
             detail="Message cannot be empty."
         )
     
-    agent = active_sessions[user_id]["conversation_agent"]
+    agent = await _get_conversation_agent(user_id, session)
     response = await agent.process_message(user_message)
     
+    if response.get("type") != "error":
+        await _store_turn(user_id, session, user_message, response.get("message", ""))
+    
     return response
 
 
+@router.post("/chat/{user_id}/stream")
+async def chat_stream(
+    user_id: str,
+    message: dict
+):
+    """
+    Streaming variant of /chat/{user_id} using Server-Sent Events.
+    
+    Events:
+    - token: {"text": "..."} as Gemini generates the reply
+    - recipes: function results, sent as soon as the search finishes
+    - done: the same payload /chat/{user_id} would return
+    
+    Request body: {"message": "I want something light"}
+    """
+    session = await _get_session(user_id)
+    
+    user_message = message.get("message", "")
+    if not user_message:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Message cannot be empty."
+        )
+    
+    agent = await _get_conversation_agent(user_id, session)
+    
+    async def event_stream():
+        async for event in agent.stream_message(user_message):
+            data = json.dumps(event["data"], ensure_ascii=False, default=str)
+            yield f"event: {event['event']}\ndata: {data}\n\n"
+            
+            if event["event"] == "done" and event["data"].get("type") != "error":
+                await _store_turn(user_id, session, user_message, event["data"].get("message", ""))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/chat/{user_id}/reset")
 async def reset_chat(user_id: str):
     """Reset the conversation history for a user."""
-    if user_id not in active_sessions:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found."
-        )
+    session = await _get_session(user_id, detail="User not found.")
     
-    agent = active_sessions[user_id]["conversation_agent"]
-    agent.reset_conversation()
+    # Nothing to reset in an agent that was never created
+    agent = session["conversation_agent"]
+    if agent is not None:
+        agent.reset_conversation()
+    await asyncio.to_thread(session_store.backend.clear_messages, user_id)
+    session["synced_messages"] = 0
     
     return {"status": "success", "message": "Conversation reset."}
 
 
+@router.get("/chat/{user_id}/memory")
+async def chat_memory_stats(user_id: str):
+    """History size and summarization counters for a user's conversation."""
+    session = await _get_session(user_id, detail="User not found.")
+    agent = session["conversation_agent"]
+    if agent is None:
+        return {"conversation_started": False}
+    return {"conversation_started": True, **agent.memory.stats()}
+
+
 # ============================================================
 # Meal Plan Endpoints (Meal Plan Agent)
 # ============================================================
@@ -165,42 +462,63 @@ async def reset_chat(user_id: str):
 async def generate_meal_plan(
     user_id: str,
     preferences: Optional[dict] = None,
-    db: Session = Depends(get_db)
+    async_db: AsyncSession = Depends(get_async_db)
 ):
     """
     Generate a personalized daily meal plan.
     
-    Request body (optional): {"preferences": "I want something light"}
-    """
-    if user_id not in active_sessions:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found. Please register first."
-        )
+    Request body (optional): {"preferences": "I want something light", "mode": "local", "date": "2026-10-18"}
     
-    session = active_sessions[user_id]
+    mode "local" picks recipes with the constraint solver and only uses
+    Gemini for tips; mode "gemini" lets Gemini build the whole plan.
+    The plan is stored for the date (default today), replacing any earlier
+    plan, so single meals can be regenerated later.
+    """
+    session = await _get_session(user_id)
     metrics = session["metrics"]
-    meal_plan_agent = session["meal_plan_agent"]
-    
-    # Get available recipes from database
-    repo = RecipeRepository(db)
-    recipes = repo.search(
-        max_carbs=metrics.max_carbs_per_meal,
-        gi_level="low",
-        limit=20
-    )
+    meal_plan_agent = get_meal_plan_agent()
     
-    # Generate meal plan with Gemini
     user_prefs = preferences.get("preferences") if preferences else None
-    plan = await meal_plan_agent.generate_daily_plan(
-        health_metrics=metrics,
-        available_recipes=recipes,
-        user_preferences=user_prefs
-    )
+    mode = (preferences or {}).get("mode") or settings.meal_plan_mode
+    plan_date = _plan_date((preferences or {}).get("date"))
+    repo = AsyncRecipeRepository(async_db)
+    
+    if mode == "local":
+        grouped = await repo.get_all_for_meal_planning(
+            metrics.max_carbs_per_meal,
+            exclude_ingredients=session["profile"].excluded_ingredients()
+        )
+        plan = await meal_plan_agent.generate_local_plan(
+            health_metrics=metrics,
+            grouped_recipes=grouped,
+            user_preferences=user_prefs
+        )
+    else:
+        # Get available recipes from database
+        recipes = await repo.search(
+            max_carbs=metrics.max_carbs_per_meal,
+            gi_level="low",
+            exclude_ingredients=session["profile"].excluded_ingredients(),
+            limit=20
+        )
+        
+        # Generate meal plan with Gemini
+        plan = await meal_plan_agent.generate_daily_plan(
+            health_metrics=metrics,
+            available_recipes=recipes,
+            user_preferences=user_prefs
+        )
+    
+    plan_id = None
+    if not plan.get("error"):
+        plan_id = await AsyncMealPlanRepository(async_db).save(user_id, plan_date, mode, plan)
+        await async_db.commit()
     
     return {
         "status": "success",
         "meal_plan": plan,
+        "plan_id": plan_id,
+        "plan_date": plan_date.isoformat(),
         "health_metrics": {
             "daily_calories": metrics.daily_calories,
             "daily_carbs_limit": metrics.daily_carbs_limit
@@ -208,36 +526,226 @@ async def generate_meal_plan(
     }
 
 
-@router.post("/meal-plan/{user_id}/weekly")
-async def generate_weekly_plan(
+@router.get("/meal-plan/{user_id}")
+async def get_stored_meal_plan(
     user_id: str,
-    preferences: Optional[dict] = None,
-    db: Session = Depends(get_db)
+    plan_date: Optional[str] = Query(default=None, alias="date"),
+    async_db: AsyncSession = Depends(get_async_db)
 ):
-    """Generate a 7-day meal plan."""
-    if user_id not in active_sessions:
+    """Stored daily meal plan for a date (default today)."""
+    session = await _get_session(user_id)
+    plan = await AsyncMealPlanRepository(async_db).get(user_id, _plan_date(plan_date))
+    if plan is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="User not found."
+            detail="No meal plan stored for this date."
         )
     
-    session = active_sessions[user_id]
+    return {"status": "success", "meal_plan": _within_limits(plan, session["metrics"])}
+
+
+@router.post("/meal-plan/{user_id}/meals/{meal_type}")
+async def regenerate_meal(
+    user_id: str,
+    meal_type: str,
+    request: Optional[dict] = None,
+    async_db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Regenerate one meal of a stored daily plan, keeping the other meals.
+    
+    Request body (optional): {"date": "2026-10-18", "preferences": "something warm", "mode": "local"}
+    
+    The new meal gets the carbs and calories the rest of the day leaves
+    (carbs capped at the per-meal limit), worked out from the stored totals,
+    and uses recipes not already in the day.
+    """
+    if meal_type not in MEAL_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"meal_type must be one of: {', '.join(MEAL_TYPES)}."
+        )
+    
+    session = await _get_session(user_id)
     metrics = session["metrics"]
-    meal_plan_agent = session["meal_plan_agent"]
+    body = request or {}
+    
+    plans = AsyncMealPlanRepository(async_db)
+    plan = await plans.get(user_id, _plan_date(body.get("date")))
+    if plan is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No meal plan stored for this date. Generate one first."
+        )
     
-    repo = RecipeRepository(db)
-    recipes = repo.search(gi_level="low", limit=30)
+    # Remaining budget: daily limits minus every other meal
+    current = plan["meal_plan"].get(meal_type) or {"recipes": [], "total_calories": 0, "total_carbs": 0}
+    max_carbs = min(
+        metrics.max_carbs_per_meal,
+        metrics.daily_carbs_limit - (plan["daily_totals"]["carbs"] - current["total_carbs"])
+    )
+    max_calories = metrics.daily_calories - (plan["daily_totals"]["calories"] - current["total_calories"])
+    exclude_ids = [r["id"] for meal in plan["meal_plan"].values() for r in meal["recipes"]]
     
-    user_prefs = preferences.get("preferences") if preferences else None
-    plan = await meal_plan_agent.generate_weekly_plan(
+    grouped = await AsyncRecipeRepository(async_db).get_all_for_meal_planning(
+        max_carbs,
+        exclude_ingredients=session["profile"].excluded_ingredients()
+    )
+    mode = body.get("mode") or settings.meal_plan_mode
+    meal = await get_meal_plan_agent().regenerate_meal(
         health_metrics=metrics,
-        available_recipes=recipes,
-        user_preferences=user_prefs
+        meal_type=meal_type,
+        grouped_recipes=grouped,
+        max_carbs=max_carbs,
+        max_calories=max_calories,
+        exclude_ids=exclude_ids,
+        user_preferences=body.get("preferences"),
+        use_gemini=mode != "local"
+    )
+    if meal is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"No recipes fit the remaining budget for {meal_type}."
+        )
+    
+    delta = await plans.replace_meal(plan["plan_id"], meal_type, meal)
+    await async_db.commit()
+    
+    plan["meal_plan"][meal_type] = meal
+    for key, change in delta.items():
+        total = plan["daily_totals"][key] + change
+        plan["daily_totals"][key] = round(total) if key == "calories" else round(total, 1)
+    
+    return {
+        "status": "success",
+        "meal_type": meal_type,
+        "meal": meal,
+        "meal_plan": _within_limits(plan, metrics),
+        "budget": {"max_carbs": max_carbs, "max_calories": max_calories}
+    }
+
+
+@router.post("/meal-plan/{user_id}/weekly")
+async def generate_weekly_plan(
+    user_id: str,
+    preferences: Optional[dict] = None,
+    async_db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Generate a 7-day meal plan.
+    
+    Request body (optional): {"preferences": "quick meals", "mode": "daily"}
+    
+    mode "daily" plans the days concurrently and merges them with a limit
+    on repeated recipes, "local" uses only the constraint solver, and
+    "single" asks Gemini for the whole week in one response.
+    """
+    session = await _get_session(user_id, detail="User not found.")
+    
+    user_prefs = preferences.get("preferences") if preferences else None
+    mode = (preferences or {}).get("mode") or settings.weekly_plan_mode
+    plan = await _weekly_plan(
+        get_meal_plan_agent(),
+        session["metrics"],
+        session["profile"].excluded_ingredients(),
+        user_prefs,
+        mode,
+        async_db
     )
     
     return {"status": "success", "weekly_plan": plan}
 
 
+@router.post("/meal-plan/{user_id}/weekly/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_weekly_plan_job(
+    user_id: str,
+    preferences: Optional[dict] = None
+):
+    """
+    Queue a 7-day meal plan and return immediately with a job id.
+    
+    Poll GET /api/jobs/{job_id} or subscribe to GET /api/jobs/{job_id}/events;
+    the finished job's `result` is the `weekly_plan` of /meal-plan/{user_id}/weekly.
+    Submitting the same inputs again returns the existing job.
+    """
+    session = await _get_session(user_id, detail="User not found.")
+    payload = {
+        "metrics": asdict(session["metrics"]),
+        "exclude_ingredients": session["profile"].excluded_ingredients(),
+        "preferences": preferences.get("preferences") if preferences else None,
+        "mode": (preferences or {}).get("mode") or settings.weekly_plan_mode
+    }
+    
+    try:
+        job, created = await job_queue.submit("weekly_plan", user_id, payload)
+    except QueueFullError as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    
+    return {
+        "status": "accepted",
+        "job_id": job["job_id"],
+        "job_status": job["status"],
+        "deduplicated": not created,
+        "status_url": f"/api/jobs/{job['job_id']}",
+        "events_url": f"/api/jobs/{job['job_id']}/events"
+    }
+
+
+# ============================================================
+# Background Job Endpoints
+# ============================================================
+
+async def _get_job(job_id: str) -> dict:
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found."
+        )
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Status of a background job, with its result once it has succeeded."""
+    return await _get_job(job_id)
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Server-Sent Events for a background job.
+    
+    Events:
+    - status: {"job_id", "status"} whenever the status changes
+    - done: the full job, as GET /api/jobs/{job_id} returns it
+    """
+    job = await _get_job(job_id)
+    
+    async def event_stream():
+        current, last_status = job, None
+        while True:
+            if current["status"] != last_status:
+                last_status = current["status"]
+                data = json.dumps({"job_id": job_id, "status": last_status})
+                yield f"event: status\ndata: {data}\n\n"
+            
+            if current["status"] in FINISHED_STATUSES:
+                data = json.dumps(current, ensure_ascii=False, default=str)
+                yield f"event: done\ndata: {data}\n\n"
+                return
+            
+            # Woken early when this worker runs the job; re-read either way
+            await job_queue.wait(job_id, timeout=2.0)
+            current = await job_queue.get(job_id) or current
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============================================================
 # Recipe Endpoints
 # ============================================================
@@ -248,8 +756,12 @@ async def search_recipes(
     max_carbs: Optional[float] = None,
     max_cooking_time: Optional[int] = None,
     gi_level: str = "low",
-    limit: int = 10,
-    db: Session = Depends(get_db)
+    exclude_ingredients: Optional[str] = None,
+    include_ingredients: Optional[str] = None,
+    fields: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(default=10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Search recipes with filters.
@@ -259,14 +771,63 @@ async def search_recipes(
     - max_carbs: Maximum carbs per serving
     - max_cooking_time: Maximum cooking time in minutes
     - gi_level: low, medium, high (default: low)
+    - exclude_ingredients: Comma-separated ingredients or allergy groups (e.g. peanuts,seafood)
+    - include_ingredients: Comma-separated ingredients every result must contain
+    - fields: Comma-separated columns to return, or "summary" for list views
+    - cursor: `next_cursor` of the previous page
+    - limit: Page size (default: 10, max: 100)
+    
+    Pages follow the carbs ASC, protein DESC, id ordering; keep passing
+    `next_cursor` until it is null.
+    """
+    repo = AsyncRecipeRepository(db)
+    try:
+        page = await repo.search_page(
+            category=category,
+            max_carbs=max_carbs,
+            max_cooking_time=max_cooking_time,
+            gi_level=gi_level,
+            exclude_ingredients=exclude_ingredients.split(",") if exclude_ingredients else None,
+            include_ingredients=include_ingredients.split(",") if include_ingredients else None,
+            fields=fields.split(",") if fields else None,
+            cursor=cursor,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    return {**page, "count": len(page["recipes"])}
+
+
+@router.get("/recipes/search")
+async def search_recipes_text(
+    q: str,
+    category: Optional[str] = None,
+    max_carbs: Optional[float] = None,
+    max_cooking_time: Optional[int] = None,
+    gi_level: Optional[str] = "low",
+    exclude_ingredients: Optional[str] = None,
+    limit: int = 10,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Keyword search over recipe names, descriptions, tags and ingredients.
+    
+    Query parameters:
+    - q: Keywords, e.g. "garlic chicken"
+    - category, max_carbs, max_cooking_time, gi_level, exclude_ingredients: as for /recipes
     - limit: Number of results (default: 10)
+    
+    Results are ranked by relevance and include a `score`.
     """
-    repo = RecipeRepository(db)
-    recipes = repo.search(
+    repo = AsyncRecipeRepository(db)
+    recipes = await repo.search_text(
+        q,
         category=category,
         max_carbs=max_carbs,
         max_cooking_time=max_cooking_time,
         gi_level=gi_level,
+        exclude_ingredients=exclude_ingredients.split(",") if exclude_ingredients else None,
         limit=limit
     )
     
@@ -276,11 +837,11 @@ async def search_recipes(
 @router.get("/recipes/{recipe_id}")
 async def get_recipe(
     recipe_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a single recipe by ID."""
-    repo = RecipeRepository(db)
-    recipe = repo.get_by_id(recipe_id)
+    repo = AsyncRecipeRepository(db)
+    recipe = await repo.get_by_id(recipe_id)
     
     if not recipe:
         raise HTTPException(
@@ -293,10 +854,10 @@ async def get_recipe(
 
 @router.get("/recipes/categories/all")
 async def get_recipes_by_categories(
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all recipes grouped by category."""
-    repo = RecipeRepository(db)
-    grouped = repo.get_all_for_meal_planning()
+    repo = AsyncRecipeRepository(db)
+    grouped = await repo.get_all_for_meal_planning()
     
     return {"categories": grouped}
\ No newline at end of file
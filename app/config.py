@@ -12,9 +12,41 @@ class Settings(BaseSettings):
     
     # Gemini API
     gemini_api_key: str
+    gemini_model: str = "gemini-3-flash-preview"
+    gemini_transport: str = ""            # grpc, grpc_asyncio, rest (empty = SDK default)
+    gemini_timeout_seconds: float = 60.0  # Per-request timeout
+    gemini_max_concurrency: int = 16      # In-flight requests per worker
+    gemini_requests_per_minute: int = 60
+    gemini_tokens_per_minute: int = 1000000
+    gemini_max_queue: int = 100               # Callers waiting for quota before rejecting
+    gemini_queue_timeout_seconds: float = 30.0
+    gemini_max_retries: int = 3               # Retries on quota (429) errors
+    gemini_backoff_seconds: float = 1.0
+    gemini_max_backoff_seconds: float = 30.0
     
     # Database
     database_url: str
+    async_database_url: str = ""  # Defaults to DATABASE_URL with the async driver
+    db_pool_size: int = 5                  # Pooled connections kept per engine and worker
+    db_max_overflow: int = 10              # Extra connections allowed under load
+    db_pool_timeout_seconds: float = 30.0  # Wait for a free connection before failing
+    db_pool_recycle_seconds: int = 3600    # Reconnect connections older than this
+    
+    # SQLite tuning, applied to every connection (ignored for other databases)
+    sqlite_tuning_enabled: bool = True
+    sqlite_journal_mode: str = "wal"       # wal: readers don't block on the writer
+    sqlite_synchronous: str = "normal"     # normal: fsync at checkpoints only (safe with WAL)
+    sqlite_cache_size_kb: int = 65536      # Page cache per connection
+    sqlite_mmap_size_mb: int = 256         # Memory-mapped reads (0 disables)
+    sqlite_temp_store: str = "memory"      # Sorts and temp tables in memory
+    sqlite_busy_timeout_ms: int = 5000     # Wait for a lock before "database is locked"
+    
+    # SQL logging
+    sql_echo: bool = False                  # Print every statement (local debugging only)
+    slow_query_log_enabled: bool = True
+    slow_query_threshold_ms: float = 200.0  # Statements at least this slow are logged
+    slow_query_sample_rate: float = 1.0     # Fraction of slow statements printed
+    slow_query_log_params: bool = False     # Include bound parameters, clipped; they may hold user data, so opt in
     
     # App Settings
     app_env: str = "development"
@@ -22,6 +54,38 @@ class Settings(BaseSettings):
     app_host: str = "0.0.0.0"
     app_port: int = 8000
     
+    # Recipe search
+    recipe_index_enabled: bool = False  # Serve searches from the in-memory index
+    
+    # Sessions
+    session_backend: str = "memory"   # memory (single worker), sql, redis
+    redis_url: str = "redis://localhost:6379/0"
+    session_max_entries: int = 1000   # Live sessions kept per worker (LRU beyond)
+    session_ttl_seconds: int = 3600   # Idle time before a session is dropped
+    session_memory_max_profiles: int = 100000  # Profiles kept by the memory backend (LRU beyond)
+    register_batch_chunk_size: int = 200  # Profiles written per transaction by /register/batch
+    
+    # Conversation memory
+    chat_history_token_budget: int = 4000  # History size that triggers summarization
+    chat_history_keep_messages: int = 6    # Recent messages always kept verbatim
+    
+    # Meal planning
+    meal_plan_mode: str = "gemini"  # gemini, local (solver picks recipes)
+    weekly_plan_mode: str = "daily"  # single (one Gemini call), daily (one call per day), local (solver)
+    weekly_plan_max_repeats: int = 3  # Most uses of one recipe in a week (daily and local modes)
+    
+    # Background jobs (weekly plans)
+    job_workers: int = 2                  # Generations running at once per worker process
+    job_max_queued: int = 100             # Queued jobs before submissions are rejected
+    job_timeout_seconds: float = 300.0    # Per-job limit; stale running jobs are requeued after it
+    job_result_ttl_seconds: int = 86400   # Finished jobs kept and reused for identical inputs
+    
+    # Gemini response cache
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 512
+    response_cache_ttl_seconds: int = 86400
+    response_cache_path: str = ""  # SQLite file for the on-disk tier (empty = memory only)
+    
     # CORS
     allowed_origins: str = "http://localhost:3000"
     
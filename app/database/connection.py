@@ -3,25 +3,89 @@ Database connection and session management.
 """
 
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
-from contextlib import contextmanager
-from typing import Generator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from contextlib import asynccontextmanager, contextmanager
+from functools import lru_cache
+from typing import Any, AsyncGenerator, Dict, Generator
 
 from app.config import get_settings
+from app.database.fulltext import create_fulltext_index
+from app.database.indexes import create_indexes
+from app.database.pool import PoolMetrics, pool_options
+from app.database.query_log import SlowQueryLog
+from app.database.sqlite import configure_sqlite, read_pragmas, sqlite_pragmas
 
 
-# Create engine
+# Checkout counters of each engine's pool (see get_pool_stats)
+sync_pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
+
 settings = get_settings()
+
+# Slow statements of both engines (see get_pool_stats)
+slow_query_log = SlowQueryLog(
+    threshold_ms=settings.slow_query_threshold_ms,
+    sample_rate=settings.slow_query_sample_rate,
+    log_params=settings.slow_query_log_params
+)
+
+# Create engine
 engine = create_engine(
     settings.database_url,
     pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,   # Recycle connections after 1 hour
-    echo=settings.debug  # Log SQL in debug mode
+    echo=settings.sql_echo,  # Print every statement (local debugging only)
+    **pool_options(settings.database_url, QueuePool, sync_pool_metrics, settings)
 )
+configure_sqlite(engine, sqlite_pragmas(settings))
+if settings.slow_query_log_enabled:
+    slow_query_log.attach(engine, "sync")
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async drivers for the sync URLs used by scripts
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "mysql": "mysql+asyncmy",
+}
+
+
+def get_async_database_url() -> str:
+    """Async URL: ASYNC_DATABASE_URL, or DATABASE_URL with its async driver."""
+    if settings.async_database_url:
+        return settings.async_database_url
+    
+    url = make_url(settings.database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver configured for {url.get_backend_name()}")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """Async engine, created on first use so scripts don't need the async driver."""
+    url = get_async_database_url()
+    async_engine = create_async_engine(
+        url,
+        pool_pre_ping=True,
+        echo=settings.sql_echo,
+        **pool_options(url, AsyncAdaptedQueuePool, async_pool_metrics, settings)
+    )
+    configure_sqlite(async_engine.sync_engine, sqlite_pragmas(settings))
+    if settings.slow_query_log_enabled:
+        slow_query_log.attach(async_engine.sync_engine, "async")
+    return async_engine
+
+
+@lru_cache()
+def get_async_session_factory() -> async_sessionmaker:
+    """Async session factory bound to the async engine."""
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
 
 def get_db() -> Generator[Session, None, None]:
     """
@@ -39,6 +103,19 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency for FastAPI to get an async database session.
+    
+    Usage:
+        @app.get("/items")
+        async def get_items(db: AsyncSession = Depends(get_async_db)):
+            ...
+    """
+    async with get_async_session_factory()() as db:
+        yield db
+
+
 @contextmanager
 def get_db_context() -> Generator[Session, None, None]:
     """
@@ -59,6 +136,60 @@ def get_db_context() -> Generator[Session, None, None]:
         db.close()
 
 
+@asynccontextmanager
+async def get_async_db_context() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Async counterpart of get_db_context, for code running on the event loop.
+    
+    Usage:
+        async with get_async_db_context() as db:
+            ...
+    """
+    async with get_async_session_factory()() as db:
+        try:
+            yield db
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+
+@contextmanager
+def get_tool_session() -> Generator[Session, None, None]:
+    """
+    Short-lived session for one agent tool call.
+    
+    Tool calls run in worker threads and outlive the request that created
+    the agent, so each call checks a connection out of the pool and
+    returns it as soon as the call ends. Tools only read; nothing is committed.
+    
+    Usage:
+        with get_tool_session() as db:
+            ...
+    """
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """
+    Checkout counters and occupancy of the sync and (if created) async pools,
+    the slow-query counters, and the PRAGMAs in effect when the database is SQLite.
+    """
+    stats = {"sync": sync_pool_metrics.stats(engine.pool)}
+    if get_async_engine.cache_info().currsize:
+        stats["async"] = async_pool_metrics.stats(get_async_engine().pool)
+    if settings.slow_query_log_enabled:
+        stats["slow_queries"] = slow_query_log.stats()
+    if engine.dialect.name == "sqlite":
+        with engine.connect() as connection:
+            stats["sqlite_pragmas"] = read_pragmas(connection, list(sqlite_pragmas(settings)))
+    return stats
+
+
 class DatabaseManager:
     """Manager class for database operations."""
     
@@ -77,11 +208,16 @@ class DatabaseManager:
             for statement in statements:
                 if statement:
                     db.execute(text(statement))
+            
+            # Secondary and full-text indexes for the repository queries
+            create_indexes(db.connection())
+            create_fulltext_index(db.connection())
     
     @staticmethod
     def seed_sample_data():
         """Insert sample recipe data."""
         from sqlalchemy import text
+        from app.services.recipe_repository import notify_recipes_changed
         
         sample_recipes = [
             ("r001", "Steamed Chicken Breast", "Steamed Chicken Breast", "protein", 180, 0, 32, 4, 0, 120, "low", 20),
@@ -94,6 +230,7 @@ class DatabaseManager:
             ("r008", "Edamame", "Edamame", "snack", 120, 9, 11, 5, 4, 50, "low", 10),
         ]
         
+        inserted = False
         with get_db_context() as db:
             for recipe in sample_recipes:
                 # Check if exists (compatible with SQLite and MySQL)
@@ -115,4 +252,19 @@ class DatabaseManager:
                             "protein": recipe[6], "fat": recipe[7], "fiber": recipe[8],
                             "sodium": recipe[9], "gi_level": recipe[10], "cooking_time": recipe[11]
                         }
-                    )
\ No newline at end of file
+                    )
+                    inserted = True
+        
+        if inserted:
+            notify_recipes_changed()
+    
+    @staticmethod
+    def rebuild_ingredient_index():
+        """Rebuild recipe_ingredients from the recipes table."""
+        from app.services.ingredient_index import rebuild_recipe_ingredients
+        from app.services.recipe_repository import notify_recipes_changed
+        
+        with get_db_context() as db:
+            terms = rebuild_recipe_ingredients(db)
+        notify_recipes_changed()
+        return terms
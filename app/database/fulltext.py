@@ -0,0 +1,132 @@
+"""
+Full-text index over recipe text columns.
+SQLite uses an FTS5 table keyed by recipe id, kept in sync by triggers;
+MySQL uses a FULLTEXT index, which InnoDB maintains itself.
+Created by DatabaseManager.create_tables alongside the secondary indexes.
+"""
+
+import re
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+FULLTEXT_COLUMNS = ["name", "name_en", "description", "tags", "ingredients"]
+
+# BM25 column weights (same order as FULLTEXT_COLUMNS): a hit in the name
+# outranks one in the ingredient list
+SQLITE_WEIGHTS = [10.0, 10.0, 2.0, 4.0, 3.0]
+
+SQLITE_TRIGGERS = ["recipes_fts_insert", "recipes_fts_delete", "recipes_fts_update"]
+
+MYSQL_INDEX_NAME = "ft_recipes_text"
+
+_columns = ", ".join(FULLTEXT_COLUMNS)
+_new_values = ", ".join(f"new.{column}" for column in FULLTEXT_COLUMNS)
+
+# recipes has a text primary key, so its rowid is an implicit column that
+# VACUUM or INSERT OR REPLACE may renumber. The FTS table keeps its own
+# copy of the text with the recipe id (not searched) and is joined on it.
+SQLITE_STATEMENTS = [
+    f"CREATE VIRTUAL TABLE recipes_fts USING fts5({_columns}, recipe_id UNINDEXED)",
+    f"""
+    CREATE TRIGGER recipes_fts_insert AFTER INSERT ON recipes BEGIN
+        INSERT INTO recipes_fts ({_columns}, recipe_id) VALUES ({_new_values}, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_fts_delete AFTER DELETE ON recipes BEGIN
+        DELETE FROM recipes_fts WHERE recipe_id = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER recipes_fts_update AFTER UPDATE OF id, {_columns} ON recipes BEGIN
+        DELETE FROM recipes_fts WHERE recipe_id = old.id;
+        INSERT INTO recipes_fts ({_columns}, recipe_id) VALUES ({_new_values}, new.id);
+    END
+    """,
+    # Index rows inserted before the table existed
+    f"INSERT INTO recipes_fts ({_columns}, recipe_id) SELECT {_columns}, id FROM recipes",
+]
+
+
+def create_fulltext_index(connection: Connection) -> bool:
+    """
+    Create the full-text index if it is missing.
+
+    A SQLite index from before recipe_id was stored (joined on rowid) is
+    dropped and rebuilt.
+
+    Args:
+        connection: Connection inside the schema-creation transaction
+
+    Returns:
+        True if the index was created
+    """
+    dialect = connection.dialect.name
+
+    if dialect == "sqlite":
+        existing = connection.execute(
+            text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'recipes_fts'")
+        ).scalar()
+        if existing and "recipe_id" in existing:
+            return False
+        if existing:
+            for trigger in SQLITE_TRIGGERS:
+                connection.exec_driver_sql(f"DROP TRIGGER IF EXISTS {trigger}")
+            connection.exec_driver_sql("DROP TABLE recipes_fts")
+        for statement in SQLITE_STATEMENTS:
+            connection.exec_driver_sql(statement)
+        return True
+
+    if dialect == "mysql":
+        existing = {index["name"] for index in inspect(connection).get_indexes("recipes")}
+        if MYSQL_INDEX_NAME in existing:
+            return False
+        connection.execute(text(f"CREATE FULLTEXT INDEX {MYSQL_INDEX_NAME} ON recipes ({_columns})"))
+        return True
+
+    print(f"⚠️ Full-text search is not supported on {dialect}")
+    return False
+
+
+def _fts5_match_expression(query: str) -> str:
+    """Quote each word as a prefix term and OR them, so partial matches still rank."""
+    words = re.findall(r"\w+", query.lower())
+    return " OR ".join(f'"{word}"*' for word in words)
+
+
+def build_fulltext_query(dialect: str, query: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """
+    Leading SELECT ... WHERE of a keyword search, with a relevance `score` column.
+
+    The caller appends further `AND` conditions and `ORDER BY score DESC`.
+
+    Returns:
+        (sql, params), or None if the query has no searchable words
+    """
+    if dialect == "sqlite":
+        match = _fts5_match_expression(query)
+        if not match:
+            return None
+        score = f"-bm25(recipes_fts, {', '.join(str(w) for w in SQLITE_WEIGHTS)})"
+        sql = f"""
+            SELECT recipes.*, {score} AS score
+            FROM recipes_fts JOIN recipes ON recipes.id = recipes_fts.recipe_id
+            WHERE recipes_fts MATCH :match
+        """
+        return sql, {"match": match}
+
+    if dialect == "mysql":
+        if not re.search(r"\w", query):
+            return None
+        score = f"MATCH ({_columns}) AGAINST (:match IN NATURAL LANGUAGE MODE)"
+        sql = f"""
+            SELECT recipes.*, {score} AS score
+            FROM recipes
+            WHERE {score}
+        """
+        return sql, {"match": query}
+
+    raise ValueError(f"Full-text search is not supported on {dialect}")
@@ -0,0 +1,81 @@
+"""
+Secondary indexes matching the repository access patterns.
+Created by DatabaseManager.create_tables (CREATE INDEX IF NOT EXISTS is not portable to MySQL).
+"""
+
+from typing import List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+
+# (name, table, columns) - leading equality columns, then the range/sort columns
+INDEXES: List[Tuple[str, str, List[str]]] = [
+    # RecipeRepository.search with a category: equality on gi_level, category and
+    # diabetic_friendly, range on carbs, ORDER BY carbs, protein DESC read from the
+    # index (id breaks ties for keyset pagination); sodium and cooking time are
+    # trailing so their filters skip row lookups
+    (
+        "idx_recipes_search",
+        "recipes",
+        ["gi_level", "category", "diabetic_friendly", "carbs", "protein DESC", "id", "sodium", "cooking_time_mins"],
+    ),
+    # Same search without a category (meal planning, weekly plans)
+    (
+        "idx_recipes_gi_carbs",
+        "recipes",
+        ["gi_level", "diabetic_friendly", "carbs", "protein DESC", "id", "sodium", "cooking_time_mins"],
+    ),
+    # Cuisine-filtered search
+    ("idx_recipes_cuisine", "recipes", ["cuisine", "gi_level", "diabetic_friendly", "carbs", "protein DESC", "id"]),
+    # Ingredient exclusion/inclusion: term -> recipe ids
+    ("idx_recipe_ingredients_term", "recipe_ingredients", ["term", "recipe_id"]),
+    # Per-user history, newest last
+    ("idx_meal_logs_user_logged", "meal_logs", ["user_id", "logged_at"]),
+    # One stored plan per user and day (see UNIQUE_INDEXES)
+    ("idx_meal_plans_user_date", "meal_plans", ["user_id", "plan_date"]),
+    ("idx_chat_history_user_created", "chat_history", ["user_id", "created_at"]),
+    ("idx_health_profiles_user", "user_health_profiles", ["user_id"]),
+    # Job deduplication by input, and the queued backlog in submission order
+    ("idx_generation_jobs_input", "generation_jobs", ["input_key", "status"]),
+    ("idx_generation_jobs_status", "generation_jobs", ["status", "created_at"]),
+]
+
+# Indexes that also enforce uniqueness of their columns
+UNIQUE_INDEXES = {"idx_meal_plans_user_date"}
+
+
+def create_indexes(connection: Connection) -> List[str]:
+    """
+    Create any missing managed index.
+
+    An existing index whose columns or uniqueness differ from INDEXES and
+    UNIQUE_INDEXES is dropped and rebuilt, so changing a definition
+    upgrades existing databases.
+
+    Args:
+        connection: Connection inside the schema-creation transaction
+
+    Returns:
+        Names of the indexes that were created
+    """
+    inspector = inspect(connection)
+    created = []
+
+    for name, table, columns in INDEXES:
+        unique = name in UNIQUE_INDEXES
+        existing = {
+            index["name"]: (index["column_names"], bool(index.get("unique")))
+            for index in inspector.get_indexes(table)
+        }
+        if name in existing:
+            if existing[name] == ([column.split()[0] for column in columns], unique):
+                continue
+            drop = f"DROP INDEX {name} ON {table}" if connection.dialect.name == "mysql" else f"DROP INDEX {name}"
+            connection.execute(text(drop))
+
+        kind = "UNIQUE INDEX" if unique else "INDEX"
+        connection.execute(text(f"CREATE {kind} {name} ON {table} ({', '.join(columns)})"))
+        created.append(name)
+
+    return created
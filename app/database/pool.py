@@ -0,0 +1,100 @@
+"""
+Connection pool sizing and checkout metrics.
+Both engines use a QueuePool subclass that times every checkout, so
+pool exhaustion shows up as waits before it shows up as timeouts.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Type
+
+from sqlalchemy import exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import Pool, QueuePool
+
+
+# Checkouts slower than this count as having waited for a connection
+WAIT_THRESHOLD_SECONDS = 0.001
+
+
+class PoolMetrics:
+    """Checkout counters for one engine's pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        """Record one checkout and how long it took."""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait_seconds += seconds
+            self.max_wait_seconds = max(self.max_wait_seconds, seconds)
+            if seconds >= WAIT_THRESHOLD_SECONDS:
+                self.waits += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self, pool: Pool) -> Dict[str, Any]:
+        """Counters plus the pool's current occupancy."""
+        stats = {
+            "pool": type(pool).__name__,
+            "checkouts": self.checkouts,
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "avg_checkout_ms": round(self.total_wait_seconds / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_checkout_ms": round(self.max_wait_seconds * 1000, 3),
+        }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+            })
+        return stats
+
+
+def metered_pool_class(base: Type[QueuePool], metrics: PoolMetrics) -> Type[QueuePool]:
+    """
+    Subclass of `base` that records every checkout in `metrics`.
+
+    The metrics live on the class, so they survive engine.dispose(),
+    which recreates the pool from its class.
+    """
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            connection = base.connect(self)
+        except exc.TimeoutError:
+            self.metrics.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record(time.perf_counter() - start)
+        return connection
+
+    return type(f"Metered{base.__name__}", (base,), {"metrics": metrics, "connect": connect})
+
+
+def pool_options(url: str, base: Type[QueuePool], metrics: PoolMetrics, settings: Any) -> Dict[str, Any]:
+    """
+    create_engine keyword arguments for a sized, metered pool.
+
+    In-memory SQLite keeps SQLAlchemy's default single-connection pool,
+    since every new connection would be a new empty database.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+
+    return {
+        "poolclass": metered_pool_class(base, metrics),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout_seconds,
+        "pool_recycle": settings.db_pool_recycle_seconds,
+    }
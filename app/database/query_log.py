@@ -0,0 +1,174 @@
+"""
+Sampled slow-query log.
+Times every statement through engine events and writes one JSON line per
+sampled statement over the threshold, so production keeps a record of
+slow SQL without echoing every statement.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Fingerprints tracked in stats(); any further ones are counted as "other"
+MAX_FINGERPRINTS = 200
+
+_COMMENT = re.compile(r"--[^\n]*|/\*.*?\*/", re.DOTALL)
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"(?:\?|%s|:\w+)(?:\s*,\s*(?:\?|%s|:\w+))+")
+_ROW_LIST = re.compile(r"(\([^()]*\))(?:\s*,\s*\([^()]*\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint(statement: str) -> str:
+    """
+    Statement without comments, with literals replaced by ? and lists collapsed.
+
+    Queries that differ only in values or IN-list length share a fingerprint.
+    """
+    normalized = _COMMENT.sub(" ", statement)
+    normalized = _STRING.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("?, ...", normalized)
+    normalized = _ROW_LIST.sub(r"\1, ...", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _clip(value: Any, max_length: int) -> Any:
+    """Parameter value safe to log: long strings and bytes are cut short."""
+    if isinstance(value, (bytes, bytearray)):
+        return f"<{len(value)} bytes>"
+    if isinstance(value, str) and len(value) > max_length:
+        return value[:max_length] + "..."
+    if value is None or isinstance(value, (int, float, bool, str)):
+        return value
+    return _clip(str(value), max_length)
+
+
+class SlowQueryLog:
+    """
+    Logs statements slower than a threshold, a sampled fraction of them.
+
+    Every slow statement counts towards the per-fingerprint stats; only
+    the sampled ones are printed.
+    """
+
+    def __init__(
+        self,
+        threshold_ms: float = 200.0,
+        sample_rate: float = 1.0,
+        log_params: bool = False,
+        max_param_length: int = 200
+    ):
+        """
+        Args:
+            threshold_ms: Statements at least this slow are slow
+            sample_rate: Fraction of slow statements printed (0-1)
+            log_params: Include bound parameters in the log line (off by
+                default: they may hold user data)
+            max_param_length: Longest string parameter printed in full
+        """
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.log_params = log_params
+        self.max_param_length = max_param_length
+
+        self._lock = threading.Lock()
+        self._fingerprints: Dict[str, Dict[str, Any]] = {}
+        self.statements = 0
+        self.slow = 0
+        self.logged = 0
+
+    def attach(self, engine: Engine, name: str) -> None:
+        """
+        Time the statements of `engine`.
+
+        Args:
+            engine: Sync engine, or the sync_engine of an AsyncEngine
+            name: Engine label in log lines (sync, async)
+        """
+
+        @event.listens_for(engine, "before_cursor_execute")
+        def start_timer(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def stop_timer(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info["query_start_time"].pop()
+            self.record(name, statement, parameters, executemany, (time.perf_counter() - started) * 1000)
+
+        # A failed statement never reaches after_cursor_execute
+        @event.listens_for(engine, "handle_error")
+        def drop_timer(exception_context):
+            connection = exception_context.connection
+            if connection is not None and connection.info.get("query_start_time"):
+                connection.info["query_start_time"].pop()
+
+    def record(self, engine: str, statement: str, parameters: Any, executemany: bool, duration_ms: float) -> None:
+        """Count one statement; log it if slow and sampled."""
+        self.statements += 1  # Unlocked on the fast path; approximate under threads
+        if duration_ms < self.threshold_ms:
+            return
+
+        key = fingerprint(statement)
+        with self._lock:
+            self.slow += 1
+            if key not in self._fingerprints and len(self._fingerprints) >= MAX_FINGERPRINTS:
+                key = "other"
+            entry = self._fingerprints.setdefault(key, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            entry["count"] += 1
+            entry["total_ms"] += duration_ms
+            entry["max_ms"] = max(entry["max_ms"], duration_ms)
+
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            return
+
+        line = {
+            "event": "slow_query",
+            "engine": engine,
+            "duration_ms": round(duration_ms, 2),
+            "fingerprint": key,
+        }
+        if executemany:
+            line["rows"] = len(parameters)
+        if self.log_params:
+            line["params"] = self._params(parameters[0] if executemany and parameters else parameters)
+        self.logged += 1
+        print(json.dumps(line, ensure_ascii=False, default=str))
+
+    def _params(self, parameters: Any) -> Optional[Any]:
+        if isinstance(parameters, dict):
+            return {key: _clip(value, self.max_param_length) for key, value in parameters.items()}
+        if isinstance(parameters, (list, tuple)):
+            return [_clip(value, self.max_param_length) for value in parameters]
+        return None
+
+    def stats(self, top: int = 10) -> Dict[str, Any]:
+        """Counters and the slowest fingerprints by total time."""
+        with self._lock:
+            slowest = sorted(self._fingerprints.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+            return {
+                "threshold_ms": self.threshold_ms,
+                "sample_rate": self.sample_rate,
+                "statements": self.statements,
+                "slow": self.slow,
+                "logged": self.logged,
+                "slowest": [
+                    {
+                        "fingerprint": key,
+                        "count": entry["count"],
+                        "avg_ms": round(entry["total_ms"] / entry["count"], 2),
+                        "max_ms": round(entry["max_ms"], 2),
+                    }
+                    for key, entry in slowest
+                ],
+            }
@@ -106,6 +106,36 @@ CREATE TABLE IF NOT EXISTS meal_logs (
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
 
+-- Generated daily meal plans, one per user and date
+-- Totals are running sums of meal_plan_meals (see app/services/meal_plan_repository.py)
+CREATE TABLE IF NOT EXISTS meal_plans (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    plan_date DATE NOT NULL,
+    mode VARCHAR(10) NOT NULL, -- gemini, local
+    total_calories DECIMAL(7,1) NOT NULL DEFAULT 0,
+    total_carbs DECIMAL(6,1) NOT NULL DEFAULT 0,
+    total_protein DECIMAL(6,1) NOT NULL DEFAULT 0,
+    tips TEXT, -- JSON
+    message TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Meals of a stored plan
+CREATE TABLE IF NOT EXISTS meal_plan_meals (
+    plan_id VARCHAR(36) NOT NULL,
+    meal_type VARCHAR(20) NOT NULL, -- breakfast, lunch, dinner, snacks
+    recipes TEXT NOT NULL, -- JSON
+    total_calories DECIMAL(7,1) NOT NULL DEFAULT 0,
+    total_carbs DECIMAL(5,1) NOT NULL DEFAULT 0,
+    total_protein DECIMAL(5,1) NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (plan_id, meal_type),
+    FOREIGN KEY (plan_id) REFERENCES meal_plans(id) ON DELETE CASCADE
+);
+
 -- Chat history for conversation context
 CREATE TABLE IF NOT EXISTS chat_history (
     id VARCHAR(36) PRIMARY KEY,
@@ -117,3 +147,32 @@ CREATE TABLE IF NOT EXISTS chat_history (
     
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
 );
+
+-- Inverted ingredient index: one row per normalized term of a recipe's ingredients and names
+-- Maintained by RecipeRepository.save (see app/services/ingredient_index.py)
+CREATE TABLE IF NOT EXISTS recipe_ingredients (
+    recipe_id VARCHAR(36) NOT NULL,
+    term VARCHAR(100) NOT NULL,
+    
+    PRIMARY KEY (recipe_id, term),
+    FOREIGN KEY (recipe_id) REFERENCES recipes(id) ON DELETE CASCADE
+);
+
+-- Background generation jobs (see app/services/job_queue.py)
+CREATE TABLE IF NOT EXISTS generation_jobs (
+    id VARCHAR(36) PRIMARY KEY,
+    user_id VARCHAR(36) NOT NULL,
+    kind VARCHAR(20) NOT NULL, -- weekly_plan
+    input_key VARCHAR(64) NOT NULL, -- hash of kind, user and inputs, for deduplication
+    payload TEXT NOT NULL, -- JSON
+    status VARCHAR(10) NOT NULL DEFAULT 'queued', -- queued, running, succeeded, failed
+    result TEXT, -- JSON
+    error TEXT,
+    
+    -- Epoch seconds, compared numerically for staleness and expiry
+    created_at DOUBLE NOT NULL,
+    started_at DOUBLE,
+    finished_at DOUBLE
+);
+
+-- Secondary indexes are managed in app/database/indexes.py
@@ -0,0 +1,85 @@
+"""
+SQLite connection tuning.
+Every new DB-API connection runs the configured PRAGMAs, so WAL readers
+no longer block on the writer and writers wait instead of failing.
+Engines for other databases are left untouched.
+"""
+
+from typing import Any, Dict, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+JOURNAL_MODES = ("delete", "truncate", "persist", "memory", "wal", "off")
+SYNCHRONOUS_LEVELS = ("off", "normal", "full", "extra")
+TEMP_STORES = ("default", "file", "memory")
+
+
+def sqlite_pragmas(settings: Any) -> Dict[str, Any]:
+    """
+    PRAGMAs of the configured SQLite profile, in the order they are applied.
+
+    Empty string settings keep SQLite's own default for that PRAGMA.
+
+    Raises:
+        ValueError: A setting has a value SQLite does not accept
+    """
+    if not settings.sqlite_tuning_enabled:
+        return {}
+
+    pragmas: Dict[str, Any] = {}
+    for name, value, allowed in (
+        ("journal_mode", settings.sqlite_journal_mode, JOURNAL_MODES),
+        ("synchronous", settings.sqlite_synchronous, SYNCHRONOUS_LEVELS),
+        ("temp_store", settings.sqlite_temp_store, TEMP_STORES),
+    ):
+        value = value.lower()
+        if not value:
+            continue
+        if value not in allowed:
+            raise ValueError(f"Invalid SQLite {name} '{value}', expected one of: {', '.join(allowed)}")
+        pragmas[name] = value
+
+    # Negative cache_size is in KiB rather than pages
+    pragmas["cache_size"] = -settings.sqlite_cache_size_kb
+    pragmas["mmap_size"] = settings.sqlite_mmap_size_mb * 1024 * 1024
+    pragmas["busy_timeout"] = settings.sqlite_busy_timeout_ms
+    return pragmas
+
+
+def _pragma_statements(pragmas: Dict[str, Any]) -> List[str]:
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+def configure_sqlite(engine: Engine, pragmas: Dict[str, Any]) -> bool:
+    """
+    Apply `pragmas` to every connection `engine` opens.
+
+    Args:
+        engine: Sync engine, or the sync_engine of an AsyncEngine
+        pragmas: Output of sqlite_pragmas
+
+    Returns:
+        True if the engine is SQLite and a connect listener was added
+    """
+    if engine.dialect.name != "sqlite" or not pragmas:
+        return False
+
+    statements = _pragma_statements(pragmas)
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return True
+
+
+def read_pragmas(connection: Any, names: List[str]) -> Dict[str, Any]:
+    """Current values of PRAGMAs on an open connection (for stats and benchmarks)."""
+    return {name: connection.exec_driver_sql(f"PRAGMA {name}").scalar() for name in names}
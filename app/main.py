@@ -9,7 +9,8 @@ from contextlib import asynccontextmanager
 
 from app.config import get_settings
 from app.api.routes import router
-from app.database.connection import DatabaseManager
+from app.database.connection import DatabaseManager, get_async_engine
+from app.services.job_queue import get_job_queue
 
 
 @asynccontextmanager
@@ -27,16 +28,25 @@ async def lifespan(app: FastAPI):
         try:
             DatabaseManager.create_tables()
             DatabaseManager.seed_sample_data()
+            DatabaseManager.rebuild_ingredient_index()
             print("✅ Database initialized with sample data")
         except Exception as e:
             print(f"⚠️ Database initialization skipped: {e}")
     
+    try:
+        await get_job_queue().start()
+    except Exception as e:
+        print(f"⚠️ Background jobs disabled: {e}")
+    
     print("✅ Application started successfully!")
     
     yield
     
     # Shutdown
     print("👋 Shutting down...")
+    await get_job_queue().stop()
+    if get_async_engine.cache_info().currsize:
+        await get_async_engine().dispose()
 
 
 # Create FastAPI application
@@ -94,9 +104,13 @@ async def root():
         "health": "/health",
         "endpoints": {
             "register": "POST /api/register",
+            "register_batch": "POST /api/register/batch",
             "chat": "POST /api/chat/{user_id}",
+            "chat_stream": "POST /api/chat/{user_id}/stream",
             "meal_plan": "POST /api/meal-plan/{user_id}",
-            "recipes": "GET /api/recipes"
+            "weekly_plan_job": "POST /api/meal-plan/{user_id}/weekly/jobs",
+            "recipes": "GET /api/recipes",
+            "recipe_search": "GET /api/recipes/search?q="
         }
     }
 
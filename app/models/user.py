@@ -30,6 +30,12 @@ class UserProfileRequest(BaseModel):
     activity_level: ActivityLevel = Field(..., description="1=Sedentary, 2=Light, 3=Moderate, 4=Active")
     exercise_freq_per_week: int = Field(default=0, ge=0, le=7, description="Exercise sessions per week")
     diabetic_type: DiabeticType
+    allergies: List[str] = Field(default_factory=list, description="Ingredients or allergy groups, e.g. seafood")
+    disliked_ingredients: List[str] = Field(default_factory=list)
+    
+    def excluded_ingredients(self) -> List[str]:
+        """Ingredients every recipe search for this user must leave out."""
+        return self.allergies + self.disliked_ingredients
     
     class Config:
         json_schema_extra = {
@@ -38,7 +44,8 @@ class UserProfileRequest(BaseModel):
                 "weight_kg": 75,
                 "activity_level": 2,
                 "exercise_freq_per_week": 3,
-                "diabetic_type": "type2"
+                "diabetic_type": "type2",
+                "allergies": ["peanuts"]
             }
         }
 
@@ -3,11 +3,30 @@ Health metrics calculation service.
 Pure math calculations - NO AI needed.
 """
 
-from app.models.user import UserProfile, UserProfileRequest
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.models.user import DiabeticType, UserProfile, UserProfileRequest
 from app.models.health import HealthMetrics
 from app.config import DIABETIC_GUIDELINES, ACTIVITY_MULTIPLIERS
 
 
+# Lookup arrays for calculate_batch, built once from the config tables.
+# Activity multipliers are indexed by level (missing levels fall back to 1.2
+# like calculate_tdee); diabetic limits by position in DiabeticType.
+_ACTIVITY_MULTIPLIER_TABLE = np.array(
+    [ACTIVITY_MULTIPLIERS.get(level, {}).get("multiplier", 1.2) for level in range(max(ACTIVITY_MULTIPLIERS) + 1)]
+)
+_DIABETIC_TYPES = list(DiabeticType)
+_DAILY_CARBS_TABLE = np.array(
+    [DIABETIC_GUIDELINES.get(t.value, {"daily_carbs": 150})["daily_carbs"] for t in _DIABETIC_TYPES]
+)
+_PER_MEAL_CARBS_TABLE = np.array(
+    [DIABETIC_GUIDELINES.get(t.value, {"per_meal_carbs": 45})["per_meal_carbs"] for t in _DIABETIC_TYPES]
+)
+
+
 class HealthCalculator:
     """
     Calculates health metrics based on user profile.
@@ -92,6 +111,67 @@ class HealthCalculator:
             sodium_limit=2000  # Standard recommendation
         )
     
+    @staticmethod
+    def calculate_arrays(
+        height_cm: np.ndarray,
+        weight_kg: np.ndarray,
+        activity_level: np.ndarray,
+        exercise_freq: np.ndarray,
+        diabetic_type_index: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """
+        Vectorized calculate: the same formulas over whole columns.
+        
+        Args:
+            height_cm, weight_kg: Float arrays
+            activity_level: Int array of ActivityLevel values
+            exercise_freq: Int array of exercise sessions per week
+            diabetic_type_index: Int array of positions in DiabeticType
+            
+        Returns:
+            HealthMetrics field name -> int64 array
+        """
+        bmr = 10 * weight_kg + 6.25 * height_cm - 250
+        tdee = bmr * _ACTIVITY_MULTIPLIER_TABLE[activity_level] + exercise_freq * 50
+        
+        # np.rint rounds half to even, like round()
+        return {
+            "bmr": np.rint(bmr).astype(np.int64),
+            "tdee": np.rint(tdee).astype(np.int64),
+            "daily_calories": np.rint(tdee * 0.9).astype(np.int64),
+            "max_carbs_per_meal": _PER_MEAL_CARBS_TABLE[diabetic_type_index],
+            "daily_carbs_limit": _DAILY_CARBS_TABLE[diabetic_type_index],
+            "protein_target": np.rint(weight_kg * 1.2).astype(np.int64),
+            "sodium_limit": np.full(len(bmr), 2000, dtype=np.int64),
+        }
+    
+    @classmethod
+    def calculate_batch(cls, profiles: Sequence[UserProfileRequest]) -> List[HealthMetrics]:
+        """
+        Calculate health metrics for many users at once.
+        
+        Gives exactly the results of calculate() for each profile, but the
+        arithmetic runs as NumPy array operations over the whole batch.
+        
+        Args:
+            profiles: User profiles
+            
+        Returns:
+            HealthMetrics in the order of the profiles
+        """
+        type_index = {t: i for i, t in enumerate(_DIABETIC_TYPES)}
+        columns = cls.calculate_arrays(
+            height_cm=np.fromiter((p.height_cm for p in profiles), dtype=np.float64, count=len(profiles)),
+            weight_kg=np.fromiter((p.weight_kg for p in profiles), dtype=np.float64, count=len(profiles)),
+            activity_level=np.fromiter((p.activity_level.value for p in profiles), dtype=np.int64, count=len(profiles)),
+            exercise_freq=np.fromiter((p.exercise_freq_per_week for p in profiles), dtype=np.int64, count=len(profiles)),
+            diabetic_type_index=np.fromiter((type_index[p.diabetic_type] for p in profiles), dtype=np.int64, count=len(profiles))
+        )
+        
+        # tolist() converts to Python ints in one pass
+        rows = zip(*(columns[field].tolist() for field in columns))
+        return [HealthMetrics(**dict(zip(columns, row))) for row in rows]
+    
     @classmethod
     def calculate_from_dict(cls, profile_dict: dict) -> HealthMetrics:
         """Calculate metrics from a dictionary input."""
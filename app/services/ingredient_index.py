@@ -0,0 +1,149 @@
+"""
+Ingredient normalization and the recipe_ingredients inverted index.
+Turns free-text ingredient lines and recipe names into terms used by
+exclusion and inclusion filters.
+"""
+
+import json
+import re
+from typing import Any, Iterable, List, Mapping, Set
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+
+# Quantity and unit words stripped from ingredient lines ("Ginger 3 slices" -> "ginger")
+UNITS = {
+    "g", "kg", "mg", "ml", "l", "oz", "lb", "lbs", "cup", "tbsp", "tsp", "tablespoon",
+    "teaspoon", "slice", "piece", "clove", "pinch", "dash", "handful", "bunch", "can",
+    "stalk", "sprig", "leaf", "serving", "small", "medium", "large", "fresh", "to", "taste",
+}
+
+# Allergy groups expanded to the ingredients they cover
+ALLERGEN_GROUPS = {
+    "seafood": ["fish", "salmon", "tuna", "cod", "tilapia", "shrimp", "prawn", "crab",
+                "lobster", "clam", "mussel", "oyster", "scallop", "squid", "octopus", "anchovy"],
+    "shellfish": ["shrimp", "prawn", "crab", "lobster", "clam", "mussel", "oyster", "scallop"],
+    "fish": ["fish", "salmon", "tuna", "cod", "tilapia", "anchovy", "sardine", "mackerel"],
+    "nut": ["almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "macadamia", "peanut"],
+    "tree nut": ["almond", "walnut", "cashew", "pecan", "pistachio", "hazelnut", "macadamia"],
+    "dairy": ["milk", "cheese", "butter", "cream", "yogurt"],
+    "gluten": ["wheat", "flour", "bread", "pasta", "noodle", "barley", "rye", "soy sauce"],
+    "egg": ["egg"],
+    "soy": ["soy", "tofu", "edamame", "soy sauce"],
+}
+
+MAX_TERM_LENGTH = 100
+
+# Recipe columns the terms come from. Names count too, so a recipe without
+# ingredient data ("Pan-seared Salmon") is still excluded for a seafood allergy
+TERM_COLUMNS = ("name", "name_en", "ingredients")
+
+
+def _singular(word: str) -> str:
+    """Crude English singularization, applied to both recipes and queries."""
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def _tokens(value: str) -> List[str]:
+    value = re.sub(r"\(.*?\)", " ", value.lower())
+    words = re.findall(r"[a-z]+", value)
+    return [_singular(w) for w in words if w not in UNITS and _singular(w) not in UNITS]
+
+
+def normalize_ingredient(value: str) -> str:
+    """Normalized ingredient name: "Chicken breasts 200g" -> "chicken breast"."""
+    return " ".join(_tokens(value))[:MAX_TERM_LENGTH]
+
+
+def ingredient_terms(value: str) -> Set[str]:
+    """
+    Every contiguous word sequence of the normalized name.
+
+    "Boneless chicken breast" yields "chicken", "chicken breast", ... so
+    excluding "chicken" or "chicken breast" both match it.
+    """
+    tokens = _tokens(value)
+    return {
+        " ".join(tokens[start:end])[:MAX_TERM_LENGTH]
+        for start in range(len(tokens))
+        for end in range(start + 1, len(tokens) + 1)
+    }
+
+
+def parse_ingredients(value: Any) -> List[str]:
+    """Ingredient lines from the recipes.ingredients JSON column."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except ValueError:
+            return [value]
+    return [str(item) for item in value] if isinstance(value, list) else []
+
+
+def recipe_terms(recipe: Mapping[str, Any]) -> Set[str]:
+    """All terms of a recipe's ingredients and names."""
+    terms: Set[str] = set()
+    for line in parse_ingredients(recipe.get("ingredients")):
+        terms |= ingredient_terms(line)
+    for column in ("name", "name_en"):
+        if recipe.get(column):
+            terms |= ingredient_terms(str(recipe[column]))
+    return terms
+
+
+def exclusion_terms(values: Iterable[str]) -> List[str]:
+    """Normalize excluded ingredients, expanding allergy groups."""
+    terms = set()
+    for value in values or []:
+        term = normalize_ingredient(value)
+        if not term:
+            continue
+        terms.add(term)
+        terms.update(ALLERGEN_GROUPS.get(term, []))
+    return sorted(terms)
+
+
+def inclusion_terms(values: Iterable[str]) -> List[str]:
+    """Normalize required ingredients."""
+    return sorted({term for term in (normalize_ingredient(v) for v in values or []) if term})
+
+
+def sync_recipe_ingredients(db: Session, recipe_id: str) -> None:
+    """Replace the indexed terms of one recipe from its stored row (call on recipe insert/update)."""
+    db.execute(text("DELETE FROM recipe_ingredients WHERE recipe_id = :recipe_id"), {"recipe_id": recipe_id})
+
+    recipe = db.execute(
+        text(f"SELECT {', '.join(TERM_COLUMNS)} FROM recipes WHERE id = :recipe_id"), {"recipe_id": recipe_id}
+    ).mappings().first()
+    terms = recipe_terms(recipe) if recipe else set()
+    if terms:
+        db.execute(
+            text("INSERT INTO recipe_ingredients (recipe_id, term) VALUES (:recipe_id, :term)"),
+            [{"recipe_id": recipe_id, "term": term} for term in sorted(terms)]
+        )
+
+
+def rebuild_recipe_ingredients(db: Session) -> int:
+    """
+    Rebuild the whole inverted index from the recipes table.
+
+    Returns:
+        Number of (recipe, term) rows written
+    """
+    db.execute(text("DELETE FROM recipe_ingredients"))
+    rows = []
+    for recipe in db.execute(text(f"SELECT id, {', '.join(TERM_COLUMNS)} FROM recipes")).mappings():
+        rows.extend({"recipe_id": recipe["id"], "term": term} for term in sorted(recipe_terms(recipe)))
+
+    if rows:
+        db.execute(text("INSERT INTO recipe_ingredients (recipe_id, term) VALUES (:recipe_id, :term)"), rows)
+    return len(rows)
@@ -0,0 +1,405 @@
+"""
+Background jobs for long Gemini generations.
+Jobs are persisted in the generation_jobs table and run by a bounded pool
+of asyncio workers, so the submitting request returns a job id at once.
+"""
+
+import asyncio
+import json
+import time
+from contextlib import AbstractAsyncContextManager
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+from uuid import uuid4
+
+from sqlalchemy import text
+
+from app.config import get_settings
+from app.services.response_cache import make_cache_key
+
+
+# Runs one job: payload -> JSON-serializable result; a result with an
+# "error" key (the agents' failure shape) marks the job failed
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+FINISHED_STATUSES = ("succeeded", "failed")
+
+
+class QueueFullError(Exception):
+    """Raised when a submission would exceed the queued-job limit."""
+
+
+class JobQueue:
+    """
+    Persistent job queue with a fixed number of asyncio workers.
+
+    Submitting an input that matches a queued, running or recently
+    succeeded job returns that job instead of starting another one.
+    Each process runs its own workers; a job is claimed with a
+    conditional UPDATE, so only one worker ever runs it. All database
+    access goes through async sessions, so the event loop never blocks on it. Jobs left
+    running longer than the timeout (their process died) are requeued
+    by a periodic sweep and no longer absorb new submissions.
+    """
+
+    # Longest pause between sweeps for stale running jobs
+    MAX_SWEEP_INTERVAL_SECONDS = 60.0
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AbstractAsyncContextManager],
+        workers: int = 2,
+        max_queued: int = 100,
+        timeout_seconds: float = 300.0,
+        result_ttl_seconds: int = 86400
+    ):
+        """
+        Args:
+            session_factory: Returns an async context manager yielding a committed AsyncSession
+            workers: Jobs running at once in this process
+            max_queued: Queued jobs (all processes) before submit() rejects
+            timeout_seconds: Limit per job; running jobs older than this are requeued
+            result_ttl_seconds: How long finished jobs are kept and reused
+        """
+        self.session_factory = session_factory
+        self.workers = workers
+        self.max_queued = max_queued
+        self.timeout_seconds = timeout_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._sweeper: Optional[asyncio.Task] = None
+        self._submit_lock: Optional[asyncio.Lock] = None
+        self._running: Set[str] = set()
+        self._events: Dict[str, asyncio.Event] = {}
+        self._waiters: Dict[str, int] = {}
+
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.requeued = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Set the coroutine function that runs jobs of `kind`."""
+        self._handlers[kind] = handler
+
+    async def submit(self, kind: str, user_id: str, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Queue a job, or find the existing job for the same input.
+
+        Args:
+            kind: Registered job kind
+            user_id: Owner of the job
+            payload: JSON-serializable handler input
+
+        Returns:
+            (job, created) - created is False when an existing job was reused
+
+        Raises:
+            QueueFullError: The queued backlog is at max_queued
+        """
+        input_key = make_cache_key(kind, {"user_id": user_id, "payload": payload})
+        if self._submit_lock is None:
+            self._submit_lock = asyncio.Lock()
+
+        # Check and insert without another submission of this process in between
+        async with self._submit_lock, self.session_factory() as db:
+            now = time.time()
+            existing = (await db.execute(
+                text("""
+                    SELECT * FROM generation_jobs
+                    WHERE input_key = :input_key
+                      AND (status = 'queued'
+                           OR (status = 'running' AND started_at >= :stale_before)
+                           OR (status = 'succeeded' AND finished_at > :fresh_after))
+                    ORDER BY created_at DESC
+                    LIMIT 1
+                """),
+                {
+                    "input_key": input_key,
+                    "stale_before": now - self.timeout_seconds,
+                    "fresh_after": now - self.result_ttl_seconds
+                }
+            )).mappings().first()
+            if existing is not None:
+                self.deduplicated += 1
+                return self._to_dict(existing), False
+
+            queued = (await db.execute(text("SELECT COUNT(*) FROM generation_jobs WHERE status = 'queued'"))).scalar()
+            if queued >= self.max_queued:
+                self.rejected += 1
+                raise QueueFullError(f"{queued} jobs are already queued. Please try again later.")
+
+            job = {
+                "id": str(uuid4()),
+                "user_id": user_id,
+                "kind": kind,
+                "input_key": input_key,
+                "payload": json.dumps(payload, ensure_ascii=False, default=str),
+                "status": "queued",
+                "result": None,
+                "error": None,
+                "created_at": now,
+                "started_at": None,
+                "finished_at": None,
+            }
+            await db.execute(
+                text("""
+                    INSERT INTO generation_jobs (id, user_id, kind, input_key, payload, status, created_at)
+                    VALUES (:id, :user_id, :kind, :input_key, :payload, :status, :created_at)
+                """),
+                job
+            )
+
+        self.submitted += 1
+        if self._queue is not None:
+            self._queue.put_nowait(job["id"])
+        return self._to_dict(job), True
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job with its parsed result, or None if unknown or expired."""
+        async with self.session_factory() as db:
+            row = (await db.execute(
+                text("SELECT * FROM generation_jobs WHERE id = :id"), {"id": job_id}
+            )).mappings().first()
+        return self._to_dict(row) if row is not None else None
+
+    async def wait(self, job_id: str, timeout: float) -> None:
+        """
+        Wait until a job changes status in this process, or `timeout` passes.
+
+        Jobs run by another process only show up through get(), so
+        callers re-read the job after every wait.
+        """
+        event = self._events.setdefault(job_id, asyncio.Event())
+        self._waiters[job_id] = self._waiters.get(job_id, 0) + 1
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            # The last waiter drops the event, so jobs finished elsewhere leave nothing behind
+            self._waiters[job_id] -= 1
+            if not self._waiters[job_id]:
+                del self._waiters[job_id]
+                if self._events.get(job_id) is event:
+                    del self._events[job_id]
+
+    async def start(self) -> None:
+        """Recover unfinished jobs and start the workers."""
+        if self._tasks:
+            return
+
+        self._queue = asyncio.Queue()
+        for job_id in await self._recover():
+            self._queue.put_nowait(job_id)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self) -> None:
+        """Stop the workers; jobs they were running go back to the queue."""
+        tasks = self._tasks + ([self._sweeper] if self._sweeper is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._sweeper = None
+        self._queue = None
+
+        if self._running:
+            async with self.session_factory() as db:
+                for job_id in self._running:
+                    await db.execute(
+                        text("""
+                            UPDATE generation_jobs SET status = 'queued', started_at = NULL
+                            WHERE id = :id AND status = 'running'
+                        """),
+                        {"id": job_id}
+                    )
+            self._running.clear()
+
+    async def _recover(self) -> List[str]:
+        """Requeue stale running jobs, drop expired ones; returns queued ids, oldest first."""
+        now = time.time()
+        await self._requeue_stale(now)
+        async with self.session_factory() as db:
+            await db.execute(
+                text("""
+                    DELETE FROM generation_jobs
+                    WHERE status IN ('succeeded', 'failed') AND finished_at < :expired_before
+                """),
+                {"expired_before": now - self.result_ttl_seconds}
+            )
+            return list((await db.execute(
+                text("SELECT id FROM generation_jobs WHERE status = 'queued' ORDER BY created_at")
+            )).scalars())
+
+    async def _requeue_stale(self, now: float) -> List[str]:
+        """
+        Requeue jobs left running by a process that died mid-job.
+
+        A job running past the timeout in a live process has already
+        been cancelled by its wait_for, so only dead processes leave
+        them; jobs running in this process are skipped regardless.
+
+        Returns:
+            Ids of the requeued jobs
+        """
+        async with self.session_factory() as db:
+            stale = (await db.execute(
+                text("SELECT id FROM generation_jobs WHERE status = 'running' AND started_at < :stale_before"),
+                {"stale_before": now - self.timeout_seconds}
+            )).scalars().all()
+
+            requeued = []
+            for job_id in stale:
+                if job_id in self._running:
+                    continue
+                updated = (await db.execute(
+                    text("""
+                        UPDATE generation_jobs SET status = 'queued', started_at = NULL
+                        WHERE id = :id AND status = 'running' AND started_at < :stale_before
+                    """),
+                    {"id": job_id, "stale_before": now - self.timeout_seconds}
+                )).rowcount
+                if updated:
+                    requeued.append(job_id)
+
+        self.requeued += len(requeued)
+        return requeued
+
+    async def _sweep(self) -> None:
+        """Periodically requeue stale running jobs onto this process's queue."""
+        interval = min(self.timeout_seconds / 2, self.MAX_SWEEP_INTERVAL_SECONDS)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                for job_id in await self._requeue_stale(time.time()):
+                    self._queue.put_nowait(job_id)
+                    self._notify(job_id)
+            except Exception as e:
+                print(f"JobQueue sweep error: {e}")
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                print(f"JobQueue error on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        """Claim a queued job, run its handler and store the outcome."""
+        started_at = time.time()
+        async with self.session_factory() as db:
+            claimed = (await db.execute(
+                text("""
+                    UPDATE generation_jobs SET status = 'running', started_at = :now
+                    WHERE id = :id AND status = 'queued'
+                """),
+                {"id": job_id, "now": started_at}
+            )).rowcount
+            if not claimed:
+                return  # Taken by another process, or already finished
+            job = (await db.execute(
+                text("SELECT kind, payload FROM generation_jobs WHERE id = :id"), {"id": job_id}
+            )).mappings().first()
+
+        self._running.add(job_id)
+        self._notify(job_id)
+
+        result, error = None, None
+        try:
+            handler = self._handlers.get(job["kind"])
+            if handler is None:
+                raise RuntimeError(f"No handler registered for {job['kind']} jobs")
+            result = await asyncio.wait_for(handler(json.loads(job["payload"])), self.timeout_seconds)
+            if isinstance(result, dict) and result.get("error"):
+                error = str(result["error"])
+        except asyncio.TimeoutError:
+            error = f"Generation timed out after {self.timeout_seconds:g}s."
+        except Exception as e:
+            error = str(e)
+
+        # Only if still ours: a swept job may have been claimed again
+        async with self.session_factory() as db:
+            await db.execute(
+                text("""
+                    UPDATE generation_jobs
+                    SET status = :status, result = :result, error = :error, finished_at = :now
+                    WHERE id = :id AND status = 'running' AND started_at = :started_at
+                """),
+                {
+                    "id": job_id,
+                    "started_at": started_at,
+                    "status": "failed" if error else "succeeded",
+                    "result": None if error else json.dumps(result, ensure_ascii=False, default=str),
+                    "error": error,
+                    "now": time.time(),
+                }
+            )
+
+        self._running.discard(job_id)
+        if error:
+            self.failed += 1
+        else:
+            self.succeeded += 1
+        self._notify(job_id)
+
+    def _notify(self, job_id: str) -> None:
+        """Wake wait() callers; later waiters get a fresh event."""
+        event = self._events.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    @staticmethod
+    def _to_dict(row: Any) -> Dict[str, Any]:
+        result = row["result"]
+        return {
+            "job_id": row["id"],
+            "user_id": row["user_id"],
+            "kind": row["kind"],
+            "status": row["status"],
+            "result": json.loads(result) if result else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "started_at": row["started_at"],
+            "finished_at": row["finished_at"],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-process counters."""
+        return {
+            "workers": len(self._tasks),
+            "max_workers": self.workers,
+            "max_queued": self.max_queued,
+            "locally_queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": len(self._running),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "requeued_stale": self.requeued,
+        }
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue; started by the app lifespan."""
+    from app.database.connection import get_async_db_context
+
+    settings = get_settings()
+    return JobQueue(
+        get_async_db_context,
+        workers=settings.job_workers,
+        max_queued=settings.job_max_queued,
+        timeout_seconds=settings.job_timeout_seconds,
+        result_ttl_seconds=settings.job_result_ttl_seconds
+    )
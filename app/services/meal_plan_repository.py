@@ -0,0 +1,258 @@
+"""
+Meal Plan Repository - Stored daily meal plans.
+Plans are kept per user and date so single meals can be swapped later.
+"""
+
+import json
+import uuid
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+
+MEAL_TYPES = ("breakfast", "lunch", "dinner", "snacks")
+
+TOTAL_KEYS = ("calories", "carbs", "protein")
+
+# One plan per user and date (unique idx_meal_plans_user_date): saving
+# updates the day's row, or inserts it if there is none
+UPDATE_PLAN_SQL = text("""
+    UPDATE meal_plans SET
+        mode = :mode, total_calories = :calories, total_carbs = :carbs,
+        total_protein = :protein, tips = :tips, message = :message,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE user_id = :user_id AND plan_date = :plan_date
+""")
+INSERT_PLAN_SQL = text("""
+    INSERT INTO meal_plans
+    (id, user_id, plan_date, mode, total_calories, total_carbs, total_protein, tips, message)
+    VALUES (:id, :user_id, :plan_date, :mode, :calories, :carbs, :protein, :tips, :message)
+""")
+PLAN_ID_SQL = text("SELECT id FROM meal_plans WHERE user_id = :user_id AND plan_date = :plan_date")
+PLAN_SQL = text("SELECT * FROM meal_plans WHERE user_id = :user_id AND plan_date = :plan_date")
+
+DELETE_MEALS_SQL = text("DELETE FROM meal_plan_meals WHERE plan_id = :plan_id")
+MEALS_SQL = text("SELECT * FROM meal_plan_meals WHERE plan_id = :plan_id")
+MEAL_TOTALS_SQL = text("""
+    SELECT total_calories, total_carbs, total_protein FROM meal_plan_meals
+    WHERE plan_id = :plan_id AND meal_type = :meal_type
+""")
+INSERT_MEAL_SQL = text("""
+    INSERT INTO meal_plan_meals
+    (plan_id, meal_type, recipes, total_calories, total_carbs, total_protein)
+    VALUES (:plan_id, :meal_type, :recipes, :total_calories, :total_carbs, :total_protein)
+""")
+UPDATE_MEAL_SQL = text("""
+    UPDATE meal_plan_meals SET
+        recipes = :recipes, total_calories = :total_calories,
+        total_carbs = :total_carbs, total_protein = :total_protein,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE plan_id = :plan_id AND meal_type = :meal_type
+""")
+ADJUST_TOTALS_SQL = text("""
+    UPDATE meal_plans SET
+        total_calories = total_calories + :calories,
+        total_carbs = total_carbs + :carbs,
+        total_protein = total_protein + :protein,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE id = :plan_id
+""")
+
+
+def _meal_totals(meal: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """A meal's totals, summed from its recipes where the plan left them out."""
+    meal = meal or {}
+    recipes = meal.get("recipes") or []
+    return {
+        key: float(meal.get(f"total_{key}") or sum(float(r.get(key) or 0) for r in recipes))
+        for key in TOTAL_KEYS
+    }
+
+
+def _meal_values(plan_id: str, meal_type: str, meal: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Row of meal_plan_meals for one meal."""
+    meal = meal or {}
+    return {
+        "plan_id": plan_id,
+        "meal_type": meal_type,
+        "recipes": json.dumps(meal.get("recipes") or [], ensure_ascii=False),
+        **{f"total_{key}": value for key, value in _meal_totals(meal).items()}
+    }
+
+
+def _plan_values(user_id: str, plan_date: date, mode: str, plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Row of meal_plans for a plan, with a fresh id used only if it is inserted."""
+    meals = plan.get("meal_plan") or {}
+    totals = dict.fromkeys(TOTAL_KEYS, 0.0)
+    for meal_type in MEAL_TYPES:
+        for key, value in _meal_totals(meals.get(meal_type)).items():
+            totals[key] += value
+
+    return {
+        "id": str(uuid.uuid4()),
+        "user_id": user_id,
+        "plan_date": plan_date.isoformat(),
+        "mode": mode,
+        **totals,
+        "tips": json.dumps(plan.get("tips") or [], ensure_ascii=False),
+        "message": plan.get("message")
+    }
+
+
+def _meal_rows(plan_id: str, plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    meals = plan.get("meal_plan") or {}
+    return [_meal_values(plan_id, meal_type, meals.get(meal_type)) for meal_type in MEAL_TYPES]
+
+
+def _plan_dict(plan: Any, meals: Sequence[Any], plan_date: date) -> Dict[str, Any]:
+    """Stored plan in the generate_daily_plan structure plus plan_id and plan_date."""
+    return {
+        "plan_id": plan["id"],
+        "plan_date": plan_date.isoformat(),
+        "mode": plan["mode"],
+        "meal_plan": {
+            meal["meal_type"]: {
+                "recipes": json.loads(meal["recipes"]),
+                "total_calories": round(float(meal["total_calories"])),
+                "total_carbs": float(meal["total_carbs"]),
+                "total_protein": float(meal["total_protein"])
+            }
+            for meal in meals
+        },
+        "daily_totals": {
+            "calories": round(float(plan["total_calories"])),
+            "carbs": float(plan["total_carbs"]),
+            "protein": float(plan["total_protein"])
+        },
+        "tips": json.loads(plan["tips"]) if plan["tips"] else [],
+        "message": plan["message"] or ""
+    }
+
+
+def _delta(old: Any, meal: Dict[str, Any]) -> Dict[str, float]:
+    """Change of each total when a meal with `old` totals (or none) is replaced."""
+    new = _meal_totals(meal)
+    return {key: new[key] - float(old[f"total_{key}"] if old else 0) for key in TOTAL_KEYS}
+
+
+class MealPlanRepository:
+    """
+    Repository for stored meal plans.
+
+    A plan row keeps running totals of its meals; replacing one meal
+    adjusts them by the difference instead of re-summing the day.
+    Callers commit.
+    """
+
+    def __init__(self, db_session: Session):
+        self.db = db_session
+
+    def save(self, user_id: str, plan_date: date, mode: str, plan: Dict[str, Any]) -> str:
+        """
+        Store a generated daily plan, replacing that day's previous plan.
+
+        The day's plan row is updated in place (or inserted), so concurrent
+        saves for the same day leave exactly one plan.
+
+        Args:
+            user_id: Owner of the plan
+            plan_date: Day the plan is for
+            mode: How it was generated (gemini, local)
+            plan: Plan in the structure of MealPlanAgent.generate_daily_plan
+
+        Returns:
+            ID of the stored plan
+        """
+        values = _plan_values(user_id, plan_date, mode, plan)
+        if not self.db.execute(UPDATE_PLAN_SQL, values).rowcount:
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(INSERT_PLAN_SQL, values)
+            except IntegrityError:
+                self.db.execute(UPDATE_PLAN_SQL, values)  # Inserted meanwhile by another request
+
+        plan_id = self.db.execute(PLAN_ID_SQL, values).scalar_one()
+        self.db.execute(DELETE_MEALS_SQL, {"plan_id": plan_id})
+        self.db.execute(INSERT_MEAL_SQL, _meal_rows(plan_id, plan))
+        return plan_id
+
+    def get(self, user_id: str, plan_date: date) -> Optional[Dict[str, Any]]:
+        """Stored plan for a day, in the generate_daily_plan structure plus plan_id and plan_date."""
+        plan = self.db.execute(
+            PLAN_SQL, {"user_id": user_id, "plan_date": plan_date.isoformat()}
+        ).mappings().first()
+        if plan is None:
+            return None
+
+        meals = self.db.execute(MEALS_SQL, {"plan_id": plan["id"]}).mappings().all()
+        return _plan_dict(plan, meals, plan_date)
+
+    def replace_meal(self, plan_id: str, meal_type: str, meal: Dict[str, Any]) -> Dict[str, float]:
+        """
+        Swap one meal of a stored plan.
+
+        The plan totals are adjusted by the difference between the old
+        and new meal, so the other meals are never read.
+
+        Returns:
+            Change in each daily total (calories, carbs, protein)
+        """
+        old = self.db.execute(MEAL_TOTALS_SQL, {"plan_id": plan_id, "meal_type": meal_type}).mappings().first()
+        delta = _delta(old, meal)
+
+        values = _meal_values(plan_id, meal_type, meal)
+        self.db.execute(UPDATE_MEAL_SQL if old is not None else INSERT_MEAL_SQL, values)
+        self.db.execute(ADJUST_TOTALS_SQL, {"plan_id": plan_id, **delta})
+        return delta
+
+
+class AsyncMealPlanRepository:
+    """
+    Async counterpart of MealPlanRepository with the same API.
+    Used by route handlers so queries don't block the event loop.
+    """
+
+    def __init__(self, db_session: AsyncSession):
+        self.db = db_session
+
+    async def save(self, user_id: str, plan_date: date, mode: str, plan: Dict[str, Any]) -> str:
+        """Store a generated daily plan (see MealPlanRepository.save)."""
+        values = _plan_values(user_id, plan_date, mode, plan)
+        if not (await self.db.execute(UPDATE_PLAN_SQL, values)).rowcount:
+            try:
+                async with self.db.begin_nested():
+                    await self.db.execute(INSERT_PLAN_SQL, values)
+            except IntegrityError:
+                await self.db.execute(UPDATE_PLAN_SQL, values)  # Inserted meanwhile by another request
+
+        plan_id = (await self.db.execute(PLAN_ID_SQL, values)).scalar_one()
+        await self.db.execute(DELETE_MEALS_SQL, {"plan_id": plan_id})
+        await self.db.execute(INSERT_MEAL_SQL, _meal_rows(plan_id, plan))
+        return plan_id
+
+    async def get(self, user_id: str, plan_date: date) -> Optional[Dict[str, Any]]:
+        """Stored plan for a day (see MealPlanRepository.get)."""
+        plan = (await self.db.execute(
+            PLAN_SQL, {"user_id": user_id, "plan_date": plan_date.isoformat()}
+        )).mappings().first()
+        if plan is None:
+            return None
+
+        meals = (await self.db.execute(MEALS_SQL, {"plan_id": plan["id"]})).mappings().all()
+        return _plan_dict(plan, meals, plan_date)
+
+    async def replace_meal(self, plan_id: str, meal_type: str, meal: Dict[str, Any]) -> Dict[str, float]:
+        """Swap one meal of a stored plan (see MealPlanRepository.replace_meal)."""
+        old = (await self.db.execute(
+            MEAL_TOTALS_SQL, {"plan_id": plan_id, "meal_type": meal_type}
+        )).mappings().first()
+        delta = _delta(old, meal)
+
+        values = _meal_values(plan_id, meal_type, meal)
+        await self.db.execute(UPDATE_MEAL_SQL if old is not None else INSERT_MEAL_SQL, values)
+        await self.db.execute(ADJUST_TOTALS_SQL, {"plan_id": plan_id, **delta})
+        return delta
@@ -0,0 +1,238 @@
+"""
+Local meal plan solver.
+Deterministic constraint search over the recipe catalog - NO AI needed.
+"""
+
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.health import HealthMetrics
+from app.models.recipe import DailyTotals, Meal, MealItem, MealPlan
+
+
+class MealPlanSolver:
+    """
+    Picks breakfast, lunch, dinner and snacks from grouped recipes.
+
+    Hard constraints (a plan violating any of them is never returned):
+    - carbs of every meal <= max_carbs_per_meal
+    - daily carbs <= daily_carbs_limit
+    - daily sodium <= sodium_limit
+    - daily calories <= daily_calories
+
+    Within those limits the solver minimizes the protein shortfall, the
+    unused calorie budget and repeated recipes, using a beam search over
+    the meal slots.
+    """
+
+    MEAL_SLOTS = ("breakfast", "lunch", "dinner", "snacks")
+
+    # Share of the daily calories each slot should roughly cover
+    CALORIE_SHARES = {"breakfast": 0.25, "lunch": 0.35, "dinner": 0.3, "snacks": 0.1}
+
+    # Candidate meals kept per slot, and partial plans kept between slots
+    CANDIDATES_PER_SLOT = 30
+    BEAM_WIDTH = 32
+
+    # Objective weights
+    PROTEIN_WEIGHT = 2.0
+    CALORIE_WEIGHT = 1.0
+    REPEAT_PENALTY = 0.25
+
+    def __init__(self, health_metrics: HealthMetrics):
+        self.metrics = health_metrics
+
+    @staticmethod
+    def _nutrition(recipes: Tuple[Dict, ...]) -> Tuple[float, float, float, float]:
+        """Sum calories, carbs, protein and sodium of a meal."""
+        calories = sum(float(r.get("calories") or 0) for r in recipes)
+        carbs = sum(float(r.get("carbs") or 0) for r in recipes)
+        protein = sum(float(r.get("protein") or 0) for r in recipes)
+        sodium = sum(float(r.get("sodium") or 0) for r in recipes)
+        return calories, carbs, protein, sodium
+
+    def _slot_candidates(
+        self,
+        slot: str,
+        grouped: Dict[str, List[Dict]],
+        max_carbs: Optional[float] = None,
+        max_calories: Optional[float] = None
+    ) -> List[Tuple]:
+        """
+        Enumerate the meals allowed in a slot and keep the best-fitting ones.
+
+        Args:
+            slot: Meal slot
+            grouped: Recipes grouped by category
+            max_carbs: Carb limit of the meal (default: max_carbs_per_meal)
+            max_calories: Optional calorie limit of the meal
+
+        Returns:
+            List of (recipe ids, meal recipes, nutrition totals)
+        """
+        if max_carbs is None:
+            max_carbs = self.metrics.max_carbs_per_meal
+
+        proteins = grouped.get("protein") or [None]
+        vegetables = grouped.get("vegetable", [])
+        sides = grouped.get("carb", []) + grouped.get("soup", [])
+
+        if slot == "snacks":
+            combos = [(None,)] + [(r,) for r in grouped.get("snack", [])]
+        else:
+            combos = product(proteins, [None] + vegetables, [None] + sides)
+
+        calorie_share = self.metrics.daily_calories * self.CALORIE_SHARES[slot]
+        protein_share = self.metrics.protein_target * self.CALORIE_SHARES[slot]
+
+        candidates = []
+        for combo in combos:
+            meal = tuple(r for r in combo if r is not None)
+            calories, carbs, protein, sodium = self._nutrition(meal)
+            if carbs > max_carbs or (max_calories is not None and calories > max_calories):
+                continue
+
+            fit = abs(calories - calorie_share) / max(calorie_share, 1)
+            fit += abs(protein - protein_share) / max(protein_share, 1)
+            candidates.append((fit, tuple(r["id"] for r in meal), meal, (calories, carbs, protein, sodium)))
+
+        candidates.sort(key=lambda c: (c[0], c[1]))
+        return [c[1:] for c in candidates[:self.CANDIDATES_PER_SLOT]]
+
+    def _score(self, calories: float, protein: float, repeats: int) -> float:
+        """Objective to minimize for a (partial) plan."""
+        protein_gap = max(0.0, self.metrics.protein_target - protein) / max(self.metrics.protein_target, 1)
+        calorie_gap = max(0.0, self.metrics.daily_calories - calories) / max(self.metrics.daily_calories, 1)
+        return (
+            self.PROTEIN_WEIGHT * protein_gap
+            + self.CALORIE_WEIGHT * calorie_gap
+            + self.REPEAT_PENALTY * repeats
+        )
+
+    def _within_limits(self, calories: float, carbs: float, sodium: float) -> bool:
+        return (
+            carbs <= self.metrics.daily_carbs_limit
+            and sodium <= self.metrics.sodium_limit
+            and calories <= self.metrics.daily_calories
+        )
+
+    def solve(self, grouped_recipes: Dict[str, List[Dict]], prior_uses: Optional[Dict[str, int]] = None) -> MealPlan:
+        """
+        Build a daily meal plan.
+
+        Args:
+            grouped_recipes: Recipes grouped by category, as returned by
+                RecipeRepository.get_all_for_meal_planning
+            prior_uses: Times each recipe id was already used (e.g. earlier days
+                of a week); each use counts as a repeat
+
+        Returns:
+            MealPlan that is always within the user's limits
+        """
+        prior_uses = prior_uses or {}
+
+        # Beam state: (score, ids, meals, calories, carbs, protein, sodium, repeats, used ids)
+        beam = [(0.0, (), (), 0.0, 0.0, 0.0, 0.0, 0, frozenset())]
+
+        for slot in self.MEAL_SLOTS:
+            candidates = self._slot_candidates(slot, grouped_recipes)
+            expanded = []
+            for _, ids, meals, calories, carbs, protein, sodium, repeats, used in beam:
+                for meal_ids, meal, (m_calories, m_carbs, m_protein, m_sodium) in candidates:
+                    if not self._within_limits(calories + m_calories, carbs + m_carbs, sodium + m_sodium):
+                        continue
+
+                    meal_repeats = repeats + sum((rid in used) + prior_uses.get(rid, 0) for rid in meal_ids)
+                    expanded.append((
+                        self._score(calories + m_calories, protein + m_protein, meal_repeats),
+                        ids + (meal_ids,),
+                        meals + (meal,),
+                        calories + m_calories,
+                        carbs + m_carbs,
+                        protein + m_protein,
+                        sodium + m_sodium,
+                        meal_repeats,
+                        used | set(meal_ids),
+                    ))
+
+            if not expanded:
+                # No meal fits: the slot has no candidates, or each one would take
+                # every partial plan past a daily limit. Leave the slot empty.
+                expanded = [(s[0], s[1] + ((),), s[2] + ((),), *s[3:]) for s in beam]
+
+            expanded.sort(key=lambda s: (s[0], s[1]))
+            beam = expanded[:self.BEAM_WIDTH]
+
+        _, _, meals, calories, carbs, protein, sodium, _, _ = beam[0]
+        return self._build_plan(meals, calories, carbs, protein, sodium)
+
+    def solve_meal(
+        self,
+        slot: str,
+        grouped_recipes: Dict[str, List[Dict]],
+        max_carbs: float,
+        max_calories: float,
+        exclude_ids: Iterable[str] = ()
+    ) -> Optional[Meal]:
+        """
+        Pick a single meal within a remaining budget, e.g. to swap one meal of a plan.
+
+        Args:
+            slot: Meal slot to fill
+            grouped_recipes: Recipes grouped by category
+            max_carbs: Carbs left for this meal
+            max_calories: Calories left for this meal
+            exclude_ids: Recipes not to use (e.g. the rest of the day)
+
+        Returns:
+            The best-fitting non-empty Meal, or None if nothing fits
+        """
+        excluded = set(exclude_ids)
+        grouped = {
+            category: [r for r in recipes if r["id"] not in excluded]
+            for category, recipes in grouped_recipes.items()
+        }
+        for _, meal, _ in self._slot_candidates(slot, grouped, max_carbs=max_carbs, max_calories=max_calories):
+            if meal:
+                return self.build_meal(meal)
+        return None
+
+    def build_meal(self, meal: Tuple[Dict, ...]) -> Meal:
+        """Convert chosen recipes into the Meal model."""
+        m_calories, m_carbs, m_protein, _ = self._nutrition(meal)
+        return Meal(
+            recipes=[
+                MealItem(
+                    id=r["id"],
+                    name=r.get("name_en") or r["name"],
+                    carbs=float(r.get("carbs") or 0),
+                    calories=int(r.get("calories") or 0),
+                    protein=float(r.get("protein") or 0)
+                )
+                for r in meal
+            ],
+            total_calories=round(m_calories),
+            total_carbs=round(m_carbs, 1),
+            total_protein=round(m_protein, 1)
+        )
+
+    def _build_plan(
+        self,
+        meals: Tuple[Tuple[Dict, ...], ...],
+        calories: float,
+        carbs: float,
+        protein: float,
+        sodium: float
+    ) -> MealPlan:
+        """Convert the chosen recipes into the MealPlan model."""
+        slots = {slot: self.build_meal(meal) for slot, meal in zip(self.MEAL_SLOTS, meals)}
+
+        return MealPlan(
+            **slots,
+            daily_totals=DailyTotals(
+                calories=round(calories),
+                carbs=round(carbs, 1),
+                protein=round(protein, 1),
+                within_limits=self._within_limits(calories, carbs, sodium)
+            )
+        )
@@ -0,0 +1,326 @@
+"""
+In-process columnar recipe index.
+Serves RecipeRepository.search from NumPy arrays - NO database round-trip.
+"""
+
+import asyncio
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.services.ingredient_index import recipe_terms
+
+
+def _encode_categorical(values: List[Any]) -> tuple:
+    """Encode a text column as integer codes plus its vocabulary."""
+    vocab: Dict[Any, int] = {}
+    codes = np.fromiter(
+        (vocab.setdefault(value, len(vocab)) for value in values),
+        dtype=np.int32,
+        count=len(values)
+    )
+    return codes, vocab
+
+
+def _build_postings(rows: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Inverted index: ingredient or name term -> sorted row positions containing it."""
+    postings: Dict[str, List[int]] = {}
+    for position, row in enumerate(rows):
+        for term in recipe_terms(row):
+            postings.setdefault(term, []).append(position)
+    return {term: np.array(positions, dtype=np.int32) for term, positions in postings.items()}
+
+
+def _encode_numeric(values: List[Any]) -> np.ndarray:
+    """Encode a numeric column as float64, with NULL stored as NaN."""
+    return np.array(
+        [np.nan if value is None else float(value) for value in values],
+        dtype=np.float64
+    )
+
+
+class RecipeIndex:
+    """
+    Columnar snapshot of the recipes table.
+
+    Rows are loaded pre-sorted by ``carbs ASC, protein DESC, id ASC`` so that a
+    boolean filter mask over the columns yields results already in the
+    same order as the SQL path.
+
+    Every invalidation bumps a generation counter; a build only installs
+    its snapshot if no invalidation happened since it started reading,
+    so a build racing a recipe change can't serve pre-change rows.
+    """
+
+    LOAD_QUERY = "SELECT * FROM recipes ORDER BY carbs ASC, protein DESC, id ASC"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._async_lock: Optional[asyncio.Lock] = None
+        self._swap_lock = threading.Lock()
+        self._generation = 0
+        self._snapshot: Optional[Dict[str, Any]] = None
+
+    @property
+    def is_built(self) -> bool:
+        return self._snapshot is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._snapshot["rows"]) if self._snapshot else 0
+
+    def invalidate(self) -> None:
+        """Drop the snapshot; the next search rebuilds it."""
+        with self._swap_lock:
+            self._generation += 1
+            self._snapshot = None
+
+    def build(self, db: Session) -> bool:
+        """Load the recipes table into columns; False if invalidated meanwhile."""
+        generation = self._generation
+        result = db.execute(text(self.LOAD_QUERY))
+        return self.load([dict(row._mapping) for row in result], generation)
+
+    def load(self, rows: List[Dict[str, Any]], generation: Optional[int] = None) -> bool:
+        """
+        Build the columns from rows already sorted by LOAD_QUERY.
+
+        Args:
+            rows: Recipe rows
+            generation: Generation read before the rows were queried; the
+                snapshot is discarded if invalidate() ran since (None installs it)
+
+        Returns:
+            True if the snapshot was installed
+        """
+        category, category_vocab = _encode_categorical([r.get("category") for r in rows])
+        gi_level, gi_vocab = _encode_categorical([r.get("gi_level") for r in rows])
+        cuisine, cuisine_vocab = _encode_categorical([r.get("cuisine") for r in rows])
+
+        snapshot = {
+            "rows": rows,
+            "diabetic_friendly": np.array(
+                [r.get("diabetic_friendly") is not None and r.get("diabetic_friendly") == 1 for r in rows],
+                dtype=bool
+            ),
+            "category": category,
+            "category_vocab": category_vocab,
+            "gi_level": gi_level,
+            "gi_vocab": gi_vocab,
+            "cuisine": cuisine,
+            "cuisine_vocab": cuisine_vocab,
+            "id": np.array([r.get("id") for r in rows], dtype=object),
+            "carbs": _encode_numeric([r.get("carbs") for r in rows]),
+            "protein": _encode_numeric([r.get("protein") for r in rows]),
+            "sodium": _encode_numeric([r.get("sodium") for r in rows]),
+            "cooking_time_mins": _encode_numeric([r.get("cooking_time_mins") for r in rows]),
+            "ingredient_postings": _build_postings(rows),
+        }
+
+        # Swap in a complete snapshot so concurrent searches never see a partial build
+        with self._swap_lock:
+            if generation is not None and generation != self._generation:
+                return False
+            self._snapshot = snapshot
+        return True
+
+    def ensure_built(self, db: Session) -> Dict[str, Any]:
+        """Return the current snapshot, building it first if needed."""
+        snapshot = self._snapshot
+        while snapshot is None:  # Rebuild if invalidated during the build
+            with self._lock:
+                if self._snapshot is None:
+                    self.build(db)
+                snapshot = self._snapshot
+        return snapshot
+
+    async def ensure_built_async(self, db: AsyncSession) -> Dict[str, Any]:
+        """Async variant of ensure_built for AsyncRecipeRepository."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        # One build per event loop at a time; sync builds are kept out by the generation check
+        async with self._async_lock:
+            snapshot = self._snapshot
+            while snapshot is None:  # Rebuild if invalidated during the build
+                generation = self._generation
+                result = await db.execute(text(self.LOAD_QUERY))
+                self.load([dict(row._mapping) for row in result], generation)
+                snapshot = self._snapshot
+        return snapshot
+
+    def search(
+        self,
+        db: Session,
+        category: Optional[str] = None,
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10,
+        exclude_terms: Optional[List[str]] = None,
+        include_terms: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        after: Optional[Tuple[float, float, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Vectorized equivalent of the SQL query in RecipeRepository.search.
+
+        NULL handling follows SQL semantics: a NULL carbs never matches
+        ``carbs <= :max_carbs``, while a NULL sodium or cooking time
+        passes its ``IS NULL OR ...`` filter. Ingredient terms come from
+        ingredient_index.exclusion_terms / inclusion_terms.
+        """
+        return self.search_snapshot(
+            self.ensure_built(db),
+            category=category,
+            max_carbs=max_carbs,
+            max_sodium=max_sodium,
+            gi_level=gi_level,
+            max_cooking_time=max_cooking_time,
+            cuisine=cuisine,
+            limit=limit,
+            exclude_terms=exclude_terms,
+            include_terms=include_terms,
+            columns=columns,
+            after=after
+        )
+
+    def search_snapshot(
+        self,
+        snap: Dict[str, Any],
+        category: Optional[str] = None,
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10,
+        exclude_terms: Optional[List[str]] = None,
+        include_terms: Optional[List[str]] = None,
+        columns: Optional[List[str]] = None,
+        after: Optional[Tuple[float, float, str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Filter a snapshot returned by ensure_built / ensure_built_async."""
+        mask = self._filter_mask(
+            snap, category, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine,
+            exclude_terms, include_terms, after
+        )
+        if mask is None:
+            return []
+
+        matches = np.flatnonzero(mask)
+        if limit >= 0:
+            matches = matches[:limit]
+
+        rows = snap["rows"]
+        if columns:
+            return [{column: rows[i].get(column) for column in columns} for i in matches]
+        return [dict(rows[i]) for i in matches]
+
+    def search_categories_snapshot(
+        self,
+        snap: Dict[str, Any],
+        categories: List[str],
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10,
+        exclude_terms: Optional[List[str]] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Top `limit` matches of each category from a single filter pass."""
+        grouped: Dict[str, List[Dict[str, Any]]] = {category: [] for category in categories}
+        mask = self._filter_mask(
+            snap, None, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, exclude_terms
+        )
+        if mask is None:
+            return grouped
+
+        rows = snap["rows"]
+        for category in categories:
+            code = snap["category_vocab"].get(category)
+            if code is not None:
+                matches = np.flatnonzero(mask & (snap["category"] == code))[:limit]
+                grouped[category] = [dict(rows[i]) for i in matches]
+        return grouped
+
+    @staticmethod
+    def _filter_mask(
+        snap: Dict[str, Any],
+        category: Optional[str],
+        max_carbs: Optional[float],
+        max_sodium: Optional[int],
+        gi_level: Optional[str],
+        max_cooking_time: Optional[int],
+        cuisine: Optional[str],
+        exclude_terms: Optional[List[str]] = None,
+        include_terms: Optional[List[str]] = None,
+        after: Optional[Tuple[float, float, str]] = None
+    ) -> Optional[np.ndarray]:
+        """Boolean mask of matching rows, or None if nothing can match."""
+        mask = snap["diabetic_friendly"].copy()
+
+        for value, column, vocab in (
+            (gi_level, "gi_level", "gi_vocab"),
+            (category, "category", "category_vocab"),
+            (cuisine, "cuisine", "cuisine_vocab"),
+        ):
+            if value:
+                code = snap[vocab].get(value)
+                if code is None:
+                    return None
+                mask &= snap[column] == code
+
+        with np.errstate(invalid="ignore"):
+            if max_carbs is not None:
+                mask &= snap["carbs"] <= max_carbs
+
+            if max_sodium is not None:
+                sodium = snap["sodium"]
+                mask &= np.isnan(sodium) | (sodium <= max_sodium)
+
+            if max_cooking_time is not None:
+                cooking_time = snap["cooking_time_mins"]
+                mask &= np.isnan(cooking_time) | (cooking_time <= max_cooking_time)
+
+        # Set operations over the ingredient postings: drop the union of
+        # excluded terms, keep the intersection of required ones
+        postings = snap["ingredient_postings"]
+        for term in exclude_terms or []:
+            positions = postings.get(term)
+            if positions is not None:
+                mask[positions] = False
+
+        for term in include_terms or []:
+            positions = postings.get(term)
+            if positions is None:
+                return None
+            required = np.zeros_like(mask)
+            required[positions] = True
+            mask &= required
+
+        # Keyset pagination: the same row comparison as the SQL cursor condition
+        if after is not None:
+            carbs, protein = snap["carbs"], snap["protein"]
+            after_carbs, after_protein, after_id = after
+            mask &= (
+                (carbs > after_carbs)
+                | ((carbs == after_carbs) & (protein < after_protein))
+                | ((carbs == after_carbs) & (protein == after_protein) & (snap["id"] > after_id))
+            )
+
+        return mask
+
+
+# Process-wide index shared by all repositories
+recipe_index = RecipeIndex()
@@ -3,11 +3,251 @@ Recipe database operations.
 Standard SQL queries - NO AI needed.
 """
 
-from typing import List, Optional, Dict, Any
-from sqlalchemy import text
+import base64
+import json
+import re
+import uuid
+from typing import Callable, List, Optional, Dict, Any, Tuple
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
+from app.config import get_settings
+from app.database.fulltext import build_fulltext_query
 from app.models.recipe import Recipe, RecipeCategory, GILevel
+from app.services.ingredient_index import TERM_COLUMNS, exclusion_terms, inclusion_terms, sync_recipe_ingredients
+from app.services.recipe_index import recipe_index
+
+
+# Callbacks run whenever rows in the recipes table change
+_change_listeners: List[Callable[[], None]] = []
+
+
+def on_recipes_changed(callback: Callable[[], None]) -> Callable[[], None]:
+    """Register a callback to run whenever recipes are inserted or updated."""
+    _change_listeners.append(callback)
+    return callback
+
+
+def notify_recipes_changed() -> None:
+    """Notify listeners (index, caches) that the recipes table changed."""
+    for callback in _change_listeners:
+        callback()
+
+
+on_recipes_changed(recipe_index.invalidate)
+
+
+# Session.info flag set by RecipeRepository.save until the session commits
+RECIPES_CHANGED = "recipes_changed"
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_after_commit(session: Session) -> None:
+    if session.info.pop(RECIPES_CHANGED, False):
+        notify_recipes_changed()
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _discard_after_rollback(session: Session, previous_transaction: Any) -> None:
+    if previous_transaction.parent is None:  # Savepoint rollbacks keep the outer writes
+        session.info.pop(RECIPES_CHANGED, None)
+
+
+# Columns that may be requested with `fields=` or written by save()
+RECIPE_COLUMNS = [
+    "id", "name", "name_en", "description", "category", "calories", "carbs", "protein",
+    "fat", "fiber", "sodium", "sugar", "gi_level", "diabetic_friendly", "blood_sugar_impact",
+    "cooking_time_mins", "difficulty", "servings", "cuisine", "tags", "ingredients",
+    "instructions", "image_url", "created_at", "updated_at",
+]
+
+# Preset for list views: everything except the large TEXT columns
+SUMMARY_FIELDS = [
+    "id", "name", "name_en", "category", "calories", "carbs", "protein", "sodium",
+    "gi_level", "cooking_time_mins", "cuisine", "image_url",
+]
+
+# Sort key of the search ordering; always selected so a page can yield its cursor
+CURSOR_COLUMNS = ["carbs", "protein", "id"]
+
+
+def encode_cursor(recipe: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just after `recipe` in the search ordering."""
+    key = [float(recipe["carbs"]), float(recipe["protein"]), recipe["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, float, str]:
+    """Inverse of encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        carbs, protein, recipe_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(carbs), float(protein), str(recipe_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def resolve_fields(fields: Optional[List[str]]) -> Optional[List[str]]:
+    """
+    Validate a `fields=` projection, adding the cursor columns.
+    
+    "summary" expands to SUMMARY_FIELDS; None means all columns.
+    Raises ValueError for unknown columns.
+    """
+    if not fields:
+        return None
+    
+    columns = []
+    for field in fields:
+        for column in (SUMMARY_FIELDS if field == "summary" else [field]):
+            if column not in RECIPE_COLUMNS:
+                raise ValueError(f"Unknown recipe field: {column}")
+            if column not in columns:
+                columns.append(column)
+    
+    return columns + [column for column in CURSOR_COLUMNS if column not in columns]
+
+
+def _build_search_query(
+    category: Optional[str],
+    max_carbs: Optional[float],
+    max_sodium: Optional[int],
+    gi_level: Optional[str],
+    max_cooking_time: Optional[int],
+    cuisine: Optional[str],
+    limit: int,
+    exclude_terms: Optional[List[str]] = None,
+    include_terms: Optional[List[str]] = None,
+    fulltext: Optional[Tuple[str, Dict[str, Any]]] = None,
+    columns: Optional[List[str]] = None,
+    after: Optional[Tuple[float, float, str]] = None,
+    categories: Optional[List[str]] = None
+) -> Tuple[str, Dict[str, Any]]:
+    """
+    Build the SQL and parameters for RecipeRepository.search.
+    
+    With `fulltext` (from build_fulltext_query) the same filters apply
+    to the keyword matches, ranked by relevance first. `columns` projects
+    the result (from resolve_fields); `after` is a decoded cursor.
+    With `categories`, `limit` applies per category and rows come back
+    grouped by category (search_by_categories).
+    """
+    if fulltext:
+        query, params = fulltext[0] + " AND diabetic_friendly = TRUE", dict(fulltext[1])
+    else:
+        query = f"""
+            SELECT {", ".join(columns) if columns else "*"} FROM recipes 
+            WHERE diabetic_friendly = TRUE
+        """
+        params = {}
+    
+    if gi_level:
+        query += " AND gi_level = :gi_level"
+        params["gi_level"] = gi_level
+    
+    if category:
+        query += " AND category = :category"
+        params["category"] = category
+    
+    if max_carbs is not None:
+        query += " AND carbs <= :max_carbs"
+        params["max_carbs"] = max_carbs
+    
+    if max_sodium is not None:
+        query += " AND (sodium IS NULL OR sodium <= :max_sodium)"
+        params["max_sodium"] = max_sodium
+    
+    if max_cooking_time is not None:
+        query += " AND (cooking_time_mins IS NULL OR cooking_time_mins <= :max_cooking_time)"
+        params["max_cooking_time"] = max_cooking_time
+    
+    if cuisine:
+        query += " AND cuisine = :cuisine"
+        params["cuisine"] = cuisine
+    
+    # Ingredient filters resolve against the recipe_ingredients inverted index
+    # (ingredient and name terms)
+    if exclude_terms:
+        placeholders = ", ".join(f":exclude_{i}" for i in range(len(exclude_terms)))
+        query += f" AND id NOT IN (SELECT recipe_id FROM recipe_ingredients WHERE term IN ({placeholders}))"
+        params.update({f"exclude_{i}": term for i, term in enumerate(exclude_terms)})
+    
+    for i, term in enumerate(include_terms or []):
+        query += f" AND id IN (SELECT recipe_id FROM recipe_ingredients WHERE term = :include_{i})"
+        params[f"include_{i}"] = term
+    
+    # Keyset pagination: rows strictly after the cursor in the ordering below
+    if after is not None:
+        query += """ AND (carbs > :after_carbs
+            OR (carbs = :after_carbs AND protein < :after_protein)
+            OR (carbs = :after_carbs AND protein = :after_protein AND id > :after_id))"""
+        params.update({"after_carbs": after[0], "after_protein": after[1], "after_id": after[2]})
+    
+    # Top `limit` rows of every category in one statement; each branch
+    # reads its category from the index and stops after `limit` rows
+    if categories:
+        order = " ORDER BY carbs ASC, protein DESC, id ASC LIMIT :limit"
+        query = " UNION ALL ".join(
+            f"SELECT * FROM ({query} AND category = :category_{i}{order}) AS c{i}"
+            for i in range(len(categories))
+        )
+        params.update({f"category_{i}": value for i, value in enumerate(categories)})
+        params["limit"] = limit
+        return query, params
+    
+    # Order by carbs (lower first) and protein (higher first); id makes it total
+    if fulltext:
+        query += " ORDER BY score DESC, carbs ASC, protein DESC, id ASC"
+    else:
+        query += " ORDER BY carbs ASC, protein DESC, id ASC"
+    query += " LIMIT :limit"
+    params["limit"] = limit
+    
+    return query, params
+
+
+def _page(recipes: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Trim a limit + 1 fetch to a page and derive the next cursor."""
+    has_more = len(recipes) > limit
+    recipes = recipes[:limit]
+    return {
+        "recipes": recipes,
+        "next_cursor": encode_cursor(recipes[-1]) if has_more and recipes else None
+    }
+
+
+def _build_ids_query(recipe_ids: List[str]) -> Tuple[str, Dict[str, Any]]:
+    """Build the SQL and parameters for get_by_ids."""
+    placeholders = ", ".join([f":id_{i}" for i in range(len(recipe_ids))])
+    query = f"SELECT * FROM recipes WHERE id IN ({placeholders})"
+    params = {f"id_{i}": rid for i, rid in enumerate(recipe_ids)}
+    return query, params
+
+
+def _group_by_category(rows: List[Dict[str, Any]], categories: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Group rows of a search_by_categories query."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {category: [] for category in categories}
+    for row in rows:
+        grouped[row["category"]].append(row)
+    return grouped
+
+
+def _group_for_meal_planning(recipes: List[Dict[str, Any]]) -> Dict[str, List[Dict]]:
+    """Group meal-planning candidates by category."""
+    grouped = {
+        "protein": [],
+        "vegetable": [],
+        "carb": [],
+        "soup": [],
+        "snack": []
+    }
+    
+    for recipe in recipes:
+        category = recipe.get("category", "other")
+        if category in grouped:
+            grouped[category].append(recipe)
+    
+    return grouped
 
 
 class RecipeRepository:
@@ -16,8 +256,11 @@ class RecipeRepository:
     Handles all CRUD and search operations for recipes.
     """
     
-    def __init__(self, db_session: Session):
+    def __init__(self, db_session: Session, use_index: Optional[bool] = None):
         self.db = db_session
+        if use_index is None:
+            use_index = get_settings().recipe_index_enabled
+        self.use_index = use_index
     
     def search(
         self,
@@ -28,7 +271,10 @@ class RecipeRepository:
         max_cooking_time: Optional[int] = None,
         exclude_ingredients: Optional[List[str]] = None,
         cuisine: Optional[str] = None,
-        limit: int = 10
+        limit: int = 10,
+        include_ingredients: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Search recipes with filters.
@@ -39,49 +285,132 @@ class RecipeRepository:
             max_sodium: Maximum sodium per serving
             gi_level: Glycemic index level (low, medium, high)
             max_cooking_time: Maximum cooking time in minutes
-            exclude_ingredients: Ingredients to exclude
+            exclude_ingredients: Ingredients or allergy groups to exclude (e.g. "peanuts", "seafood")
             cuisine: Preferred cuisine type
             limit: Maximum number of results
+            include_ingredients: Ingredients every result must contain
+            fields: Columns to return (see resolve_fields); default all
+            cursor: Return rows after this cursor (see search_page)
             
         Returns:
             List of matching recipes
         """
-        query = """
-            SELECT * FROM recipes 
-            WHERE diabetic_friendly = TRUE
-        """
-        params = {}
-        
-        if gi_level:
-            query += " AND gi_level = :gi_level"
-            params["gi_level"] = gi_level
+        excluded, included = exclusion_terms(exclude_ingredients), inclusion_terms(include_ingredients)
+        columns, after = resolve_fields(fields), decode_cursor(cursor) if cursor else None
+        if self.use_index:
+            return recipe_index.search(
+                self.db,
+                category=category,
+                max_carbs=max_carbs,
+                max_sodium=max_sodium,
+                gi_level=gi_level,
+                max_cooking_time=max_cooking_time,
+                cuisine=cuisine,
+                limit=limit,
+                exclude_terms=excluded,
+                include_terms=included,
+                columns=columns,
+                after=after
+            )
         
-        if category:
-            query += " AND category = :category"
-            params["category"] = category
+        query, params = _build_search_query(
+            category, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=excluded, include_terms=included, columns=columns, after=after
+        )
+        result = self.db.execute(text(query), params)
+        return [dict(row._mapping) for row in result]
+    
+    def search_by_categories(
+        self,
+        categories: List[str],
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Search several categories at once.
         
-        if max_carbs is not None:
-            query += " AND carbs <= :max_carbs"
-            params["max_carbs"] = max_carbs
+        One SQL statement (a UNION ALL of per-category top-N queries) or
+        one pass over the index, instead of one search per category.
         
-        if max_sodium is not None:
-            query += " AND (sodium IS NULL OR sodium <= :max_sodium)"
-            params["max_sodium"] = max_sodium
+        Args:
+            categories: Categories to search
+            limit: Maximum results per category
+            (other filters as in search)
+            
+        Returns:
+            Dict with each category as key and its matches, in search order
+        """
+        excluded = exclusion_terms(exclude_ingredients)
+        if self.use_index:
+            return recipe_index.search_categories_snapshot(
+                recipe_index.ensure_built(self.db),
+                categories,
+                max_carbs=max_carbs,
+                max_sodium=max_sodium,
+                gi_level=gi_level,
+                max_cooking_time=max_cooking_time,
+                cuisine=cuisine,
+                limit=limit,
+                exclude_terms=excluded
+            )
         
-        if max_cooking_time is not None:
-            query += " AND (cooking_time_mins IS NULL OR cooking_time_mins <= :max_cooking_time)"
-            params["max_cooking_time"] = max_cooking_time
+        query, params = _build_search_query(
+            None, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=excluded, categories=categories
+        )
+        result = self.db.execute(text(query), params)
+        return _group_by_category([dict(row._mapping) for row in result], categories)
+    
+    def search_page(self, limit: int = 20, **filters) -> Dict[str, Any]:
+        """
+        One page of search results with the cursor of the next page.
         
-        if cuisine:
-            query += " AND cuisine = :cuisine"
-            params["cuisine"] = cuisine
+        Args:
+            limit: Page size
+            **filters: Any search argument, including fields and cursor
+            
+        Returns:
+            {"recipes": [...], "next_cursor": str or None}
+        """
+        recipes = self.search(limit=limit + 1, **filters)
+        return _page(recipes, limit)
+    
+    def search_text(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: Optional[str] = "low",
+        max_cooking_time: Optional[int] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        Keyword search over name, description, tags and ingredients.
         
-        # Order by carbs (lower first) and protein (higher first)
-        query += " ORDER BY carbs ASC, protein DESC"
-        query += " LIMIT :limit"
-        params["limit"] = limit
+        Args:
+            query: Free-text keywords
+            (other filters as in search)
+            
+        Returns:
+            Matching recipes, most relevant first, each with a `score`
+        """
+        fulltext = build_fulltext_query(self.db.get_bind().dialect.name, query)
+        if fulltext is None:
+            return []
         
-        result = self.db.execute(text(query), params)
+        sql, params = _build_search_query(
+            category, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=exclusion_terms(exclude_ingredients), fulltext=fulltext
+        )
+        result = self.db.execute(text(sql), params)
         return [dict(row._mapping) for row in result]
     
     def get_by_id(self, recipe_id: str) -> Optional[Dict[str, Any]]:
@@ -96,13 +425,51 @@ class RecipeRepository:
         if not recipe_ids:
             return []
         
-        placeholders = ", ".join([f":id_{i}" for i in range(len(recipe_ids))])
-        query = f"SELECT * FROM recipes WHERE id IN ({placeholders})"
-        params = {f"id_{i}": rid for i, rid in enumerate(recipe_ids)}
-        
+        query, params = _build_ids_query(recipe_ids)
         result = self.db.execute(text(query), params)
         return [dict(row._mapping) for row in result]
     
+    def save(self, recipe: Dict[str, Any]) -> str:
+        """
+        Insert or update a recipe and its ingredient index entries.
+        
+        Listeners (index, caches) are notified once the caller commits.
+        
+        Args:
+            recipe: Column values; list/dict values (ingredients, tags, ...) are stored as JSON
+            
+        Returns:
+            The recipe ID
+            
+        Raises:
+            ValueError: A key is not a recipe column
+        """
+        # Keys become column names in the SQL, so only known columns get through
+        unknown = [key for key in recipe if key not in RECIPE_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown recipe column: {', '.join(map(str, unknown))}")
+        
+        values = {
+            key: json.dumps(value) if isinstance(value, (list, dict)) else value
+            for key, value in recipe.items()
+        }
+        values.setdefault("id", str(uuid.uuid4()))
+        
+        columns = [key for key in values if key != "id"]
+        if self.get_by_id(values["id"]):
+            assignments = ", ".join(f"{column} = :{column}" for column in columns)
+            self.db.execute(text(f"UPDATE recipes SET {assignments} WHERE id = :id"), values)
+        else:
+            names = ", ".join(["id"] + columns)
+            placeholders = ", ".join(f":{column}" for column in ["id"] + columns)
+            self.db.execute(text(f"INSERT INTO recipes ({names}) VALUES ({placeholders})"), values)
+        
+        if any(column in recipe for column in TERM_COLUMNS):
+            sync_recipe_ingredients(self.db, values["id"])
+        
+        self.db.info[RECIPES_CHANGED] = True
+        return values["id"]
+    
     def get_by_category(self, category: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Get recipes by category."""
         return self.search(category=category, limit=limit)
@@ -115,29 +482,188 @@ class RecipeRepository:
         """Get quick recipes under specified time."""
         return self.search(max_cooking_time=max_time, limit=limit)
     
-    def get_all_for_meal_planning(self, max_carbs_per_meal: int = 45) -> Dict[str, List[Dict]]:
+    def get_all_for_meal_planning(
+        self,
+        max_carbs_per_meal: int = 45,
+        exclude_ingredients: Optional[List[str]] = None
+    ) -> Dict[str, List[Dict]]:
         """
         Get all recipes suitable for meal planning, grouped by category.
         
+        Args:
+            max_carbs_per_meal: Maximum carbs per recipe
+            exclude_ingredients: Allergies and disliked ingredients to leave out
+        
         Returns:
             Dict with categories as keys and recipe lists as values
         """
-        recipes = self.search(max_carbs=max_carbs_per_meal, gi_level="low", limit=50)
-        
-        grouped = {
-            "protein": [],
-            "vegetable": [],
-            "carb": [],
-            "soup": [],
-            "snack": []
-        }
+        recipes = self.search(
+            max_carbs=max_carbs_per_meal, gi_level="low", limit=50, exclude_ingredients=exclude_ingredients
+        )
+        return _group_for_meal_planning(recipes)
+
+
+class AsyncRecipeRepository:
+    """
+    Async counterpart of RecipeRepository with the same API.
+    Used by route handlers so queries don't block the event loop.
+    """
+    
+    def __init__(self, db_session: AsyncSession, use_index: Optional[bool] = None):
+        self.db = db_session
+        if use_index is None:
+            use_index = get_settings().recipe_index_enabled
+        self.use_index = use_index
+    
+    async def search(
+        self,
+        category: Optional[str] = None,
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10,
+        include_ingredients: Optional[List[str]] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search recipes with filters (see RecipeRepository.search)."""
+        excluded, included = exclusion_terms(exclude_ingredients), inclusion_terms(include_ingredients)
+        columns, after = resolve_fields(fields), decode_cursor(cursor) if cursor else None
+        if self.use_index:
+            snapshot = await recipe_index.ensure_built_async(self.db)
+            return recipe_index.search_snapshot(
+                snapshot,
+                category=category,
+                max_carbs=max_carbs,
+                max_sodium=max_sodium,
+                gi_level=gi_level,
+                max_cooking_time=max_cooking_time,
+                cuisine=cuisine,
+                limit=limit,
+                exclude_terms=excluded,
+                include_terms=included,
+                columns=columns,
+                after=after
+            )
         
-        for recipe in recipes:
-            category = recipe.get("category", "other")
-            if category in grouped:
-                grouped[category].append(recipe)
+        query, params = _build_search_query(
+            category, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=excluded, include_terms=included, columns=columns, after=after
+        )
+        result = await self.db.execute(text(query), params)
+        return [dict(row._mapping) for row in result]
+    
+    async def search_by_categories(
+        self,
+        categories: List[str],
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: str = "low",
+        max_cooking_time: Optional[int] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Search several categories at once (see RecipeRepository.search_by_categories)."""
+        excluded = exclusion_terms(exclude_ingredients)
+        if self.use_index:
+            return recipe_index.search_categories_snapshot(
+                await recipe_index.ensure_built_async(self.db),
+                categories,
+                max_carbs=max_carbs,
+                max_sodium=max_sodium,
+                gi_level=gi_level,
+                max_cooking_time=max_cooking_time,
+                cuisine=cuisine,
+                limit=limit,
+                exclude_terms=excluded
+            )
         
-        return grouped
+        query, params = _build_search_query(
+            None, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=excluded, categories=categories
+        )
+        result = await self.db.execute(text(query), params)
+        return _group_by_category([dict(row._mapping) for row in result], categories)
+    
+    async def search_page(self, limit: int = 20, **filters) -> Dict[str, Any]:
+        """One page of search results (see RecipeRepository.search_page)."""
+        recipes = await self.search(limit=limit + 1, **filters)
+        return _page(recipes, limit)
+    
+    async def search_text(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        max_carbs: Optional[float] = None,
+        max_sodium: Optional[int] = None,
+        gi_level: Optional[str] = "low",
+        max_cooking_time: Optional[int] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        cuisine: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Keyword search ranked by relevance (see RecipeRepository.search_text)."""
+        fulltext = build_fulltext_query(self.db.get_bind().dialect.name, query)
+        if fulltext is None:
+            return []
+        
+        sql, params = _build_search_query(
+            category, max_carbs, max_sodium, gi_level, max_cooking_time, cuisine, limit,
+            exclude_terms=exclusion_terms(exclude_ingredients), fulltext=fulltext
+        )
+        result = await self.db.execute(text(sql), params)
+        return [dict(row._mapping) for row in result]
+    
+    async def get_by_id(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single recipe by ID."""
+        query = "SELECT * FROM recipes WHERE id = :recipe_id"
+        result = await self.db.execute(text(query), {"recipe_id": recipe_id})
+        row = result.fetchone()
+        return dict(row._mapping) if row else None
+    
+    async def get_by_ids(self, recipe_ids: List[str]) -> List[Dict[str, Any]]:
+        """Get multiple recipes by IDs."""
+        if not recipe_ids:
+            return []
+        
+        query, params = _build_ids_query(recipe_ids)
+        result = await self.db.execute(text(query), params)
+        return [dict(row._mapping) for row in result]
+    
+    async def get_by_category(self, category: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get recipes by category."""
+        return await self.search(category=category, limit=limit)
+    
+    async def get_low_gi_recipes(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Get all low GI recipes."""
+        return await self.search(gi_level="low", limit=limit)
+    
+    async def get_quick_recipes(self, max_time: int = 15, limit: int = 10) -> List[Dict[str, Any]]:
+        """Get quick recipes under specified time."""
+        return await self.search(max_cooking_time=max_time, limit=limit)
+    
+    async def get_all_for_meal_planning(
+        self,
+        max_carbs_per_meal: int = 45,
+        exclude_ingredients: Optional[List[str]] = None
+    ) -> Dict[str, List[Dict]]:
+        """Get all recipes suitable for meal planning, grouped by category."""
+        recipes = await self.search(
+            max_carbs=max_carbs_per_meal, gi_level="low", limit=50, exclude_ingredients=exclude_ingredients
+        )
+        return _group_for_meal_planning(recipes)
+
+
+# Preference keywords that map to nutrition filters rather than recipe text
+PREFERENCE_FILTERS = {
+    "quick": {"max_cooking_time": 15},
+    "fast": {"max_cooking_time": 15},
+    "light": {"max_carbs": 30},
+}
 
 
 # Standalone function for use without dependency injection
@@ -146,17 +672,23 @@ def get_recipes_for_agent(
     category: Optional[str] = None,
     max_carbs: Optional[float] = None,
     max_cooking_time: Optional[int] = None,
-    preference: Optional[str] = None
+    preference: Optional[str] = None,
+    exclude_ingredients: Optional[List[str]] = None
 ) -> List[Dict[str, Any]]:
     """
     Helper function for agents to search recipes.
     This is called by the Conversation Agent via function calling.
+    Exclusions should include the user's allergies and disliked ingredients.
+    
+    Preference words with a nutrition meaning ("quick", "light") become
+    filters; the rest are matched against the full-text index, falling
+    back to the plain filtered search when nothing matches.
     """
     repo = RecipeRepository(db_session)
     
-    # Map preference keywords to filters
     filters = {
-        "gi_level": "low"  # Always prioritize low GI for diabetics
+        "gi_level": "low",  # Always prioritize low GI for diabetics
+        "exclude_ingredients": exclude_ingredients
     }
     
     if category:
@@ -168,12 +700,36 @@ def get_recipes_for_agent(
     if max_cooking_time:
         filters["max_cooking_time"] = max_cooking_time
     
-    # Handle preference keywords
-    if preference:
-        preference = preference.lower()
-        if "quick" in preference or "fast" in preference:
-            filters["max_cooking_time"] = 15
-        if "light" in preference:
-            filters["max_carbs"] = 30
+    keywords = []
+    for word in re.findall(r"\w+", (preference or "").lower()):
+        if word in PREFERENCE_FILTERS:
+            filters.update(PREFERENCE_FILTERS[word])
+        else:
+            keywords.append(word)
+    
+    if keywords:
+        recipes = repo.search_text(" ".join(keywords), **filters, limit=10)
+        if recipes:
+            return recipes
     
-    return repo.search(**filters, limit=10)
\ No newline at end of file
+    return repo.search(**filters, limit=10)
+
+
+def get_recipes_by_categories_for_agent(
+    db_session: Session,
+    categories: List[str],
+    max_carbs: Optional[float] = None,
+    exclude_ingredients: Optional[List[str]] = None
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Batched variant of get_recipes_for_agent for multi-category tools
+    such as get_meal_suggestion: one query for all categories.
+    """
+    repo = RecipeRepository(db_session)
+    return repo.search_by_categories(
+        categories,
+        max_carbs=max_carbs or None,
+        gi_level="low",
+        exclude_ingredients=exclude_ingredients,
+        limit=10
+    )
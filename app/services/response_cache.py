@@ -0,0 +1,141 @@
+"""
+Content-addressed cache for Gemini responses.
+In-memory LRU tier in front of an optional on-disk SQLite tier.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+from app.config import get_settings
+from app.services.recipe_repository import on_recipes_changed
+
+
+def make_cache_key(kind: str, payload: Any) -> str:
+    """Stable SHA-256 of a request kind and its prompt inputs."""
+    canonical = json.dumps(
+        {"kind": kind, "payload": payload},
+        sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier TTL cache of JSON-serializable responses.
+
+    Values are stored as JSON text in both tiers, so every hit returns
+    a fresh copy that callers may modify.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: int = 3600, sqlite_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Size of the in-memory LRU tier
+            ttl_seconds: Lifetime of an entry in both tiers
+            sqlite_path: File for the on-disk tier (None disables it)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+
+        self._disk = None
+        if sqlite_path:
+            self._disk = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS response_cache "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._disk.commit()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM response_cache WHERE key = ? AND expires_at > ?",
+                    (key, now)
+                ).fetchone()
+                if row:
+                    self._remember(key, row[0], row[1])
+                    self.disk_hits += 1
+                    return json.loads(row[0])
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: Any) -> None:
+        """Cache a value in both tiers."""
+        data = json.dumps(value, ensure_ascii=False, default=str)
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, data, expires_at)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, data, expires_at)
+                )
+                self._disk.execute("DELETE FROM response_cache WHERE expires_at <= ?", (time.time(),))
+                self._disk.commit()
+
+    def clear(self) -> None:
+        """Drop every entry, e.g. after the recipe catalog changed."""
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM response_cache")
+                self._disk.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_tier": self._disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+    def _remember(self, key: str, data: str, expires_at: float) -> None:
+        self._memory[key] = (expires_at, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide cache, cleared whenever recipes change."""
+    settings = get_settings()
+    cache = ResponseCache(
+        max_entries=settings.response_cache_max_entries,
+        ttl_seconds=settings.response_cache_ttl_seconds,
+        sqlite_path=settings.response_cache_path or None
+    )
+    on_recipes_changed(cache.clear)
+    return cache
@@ -0,0 +1,468 @@
+"""
+Shared session backends.
+Persist user profiles and chat history so any worker can serve any user.
+"""
+
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import AbstractContextManager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.health import HealthMetrics
+from app.models.user import UserProfileRequest
+
+
+# (user_id, profile, metrics) of one user in a batch registration
+Registration = Tuple[str, UserProfileRequest, Optional[HealthMetrics]]
+
+
+class SessionBackend(ABC):
+    """
+    Storage for the state a session is rebuilt from.
+
+    Chat history is stored compactly as {"role", "content"} messages
+    (role is "user" or "assistant"); function-call payloads are not kept.
+    Backends with `stores_messages` False keep no history; the live
+    agent is then its only copy.
+    """
+
+    stores_messages = True
+
+    @abstractmethod
+    def save_profile(
+        self, user_id: str, profile: UserProfileRequest, metrics: Optional[HealthMetrics] = None
+    ) -> None:
+        """Store (or replace) a user's profile."""
+
+    @abstractmethod
+    def load_profile(self, user_id: str) -> Optional[UserProfileRequest]:
+        """Load a user's profile, or None if the user never registered."""
+
+    @abstractmethod
+    def append_messages(self, user_id: str, messages: List[Tuple[str, str]]) -> None:
+        """Append (role, content) messages to the chat history."""
+
+    @abstractmethod
+    def load_messages(self, user_id: str) -> List[Dict[str, str]]:
+        """Load the chat history in order."""
+
+    @abstractmethod
+    def count_messages(self, user_id: str) -> int:
+        """Number of stored messages (cheap staleness check)."""
+
+    @abstractmethod
+    def clear_messages(self, user_id: str) -> None:
+        """Delete the chat history."""
+
+    def register_profiles(self, profiles: List[Registration]) -> None:
+        """
+        Store several registrations at once.
+
+        Each user's profile is replaced and their chat history cleared,
+        as /register does for one user.
+        """
+        for user_id, profile, metrics in profiles:
+            self.clear_messages(user_id)
+            self.save_profile(user_id, profile, metrics)
+
+
+class MemorySessionBackend(SessionBackend):
+    """
+    Process-local backend; only valid with a single worker.
+
+    Chat history is not stored: in a single worker the live agent already
+    holds it, and a second copy would grow without bound. Profiles are
+    kept up to `max_profiles` (LRU beyond) and expire after `ttl_seconds`
+    without use, so a user who stays away has to register again.
+    """
+
+    stores_messages = False
+
+    def __init__(self, max_profiles: int = 100000, ttl_seconds: int = 0):
+        """
+        Args:
+            max_profiles: Profiles kept before the least recently used is dropped
+            ttl_seconds: Idle time after which a profile expires (0 disables)
+        """
+        self.max_profiles = max_profiles
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._profiles: "OrderedDict[str, Tuple[UserProfileRequest, float]]" = OrderedDict()
+
+    def save_profile(self, user_id, profile, metrics=None):
+        with self._lock:
+            self._profiles[user_id] = (profile, time.monotonic())
+            self._profiles.move_to_end(user_id)
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def load_profile(self, user_id):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(now)
+            entry = self._profiles.get(user_id)
+            if entry is None:
+                return None
+            self._profiles[user_id] = (entry[0], now)
+            self._profiles.move_to_end(user_id)
+            return entry[0]
+
+    def append_messages(self, user_id, messages):
+        pass
+
+    def load_messages(self, user_id):
+        return []
+
+    def count_messages(self, user_id):
+        return 0
+
+    def clear_messages(self, user_id):
+        pass
+
+    def _expire(self, now: float) -> None:
+        """Drop idle profiles; the least recently used are at the front."""
+        if not self.ttl_seconds:
+            return
+        while self._profiles:
+            user_id, (_, last_used) = next(iter(self._profiles.items()))
+            if now - last_used < self.ttl_seconds:
+                break
+            del self._profiles[user_id]
+
+
+class SQLSessionBackend(SessionBackend):
+    """
+    Backend on the application database.
+
+    Uses the existing users, user_health_profiles and chat_history tables;
+    the profile row id is the user id.
+    """
+
+    def __init__(self, session_factory: Callable[[], AbstractContextManager]):
+        """
+        Args:
+            session_factory: Returns a context manager yielding a committed Session
+        """
+        self.session_factory = session_factory
+
+    _UPDATE_PROFILE = """
+        UPDATE user_health_profiles SET
+            height_cm = :height_cm, weight_kg = :weight_kg,
+            activity_level = :activity_level,
+            exercise_freq_per_week = :exercise_freq_per_week,
+            diabetic_type = :diabetic_type, bmr = :bmr, tdee = :tdee,
+            daily_calories = :daily_calories,
+            max_carbs_per_meal = :max_carbs_per_meal,
+            daily_carbs_limit = :daily_carbs_limit,
+            protein_target = :protein_target,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = :id
+    """
+    _INSERT_PROFILE = """
+        INSERT INTO user_health_profiles
+        (id, user_id, height_cm, weight_kg, activity_level, exercise_freq_per_week,
+         diabetic_type, bmr, tdee, daily_calories, max_carbs_per_meal,
+         daily_carbs_limit, protein_target)
+        VALUES (:id, :user_id, :height_cm, :weight_kg, :activity_level,
+                :exercise_freq_per_week, :diabetic_type, :bmr, :tdee,
+                :daily_calories, :max_carbs_per_meal, :daily_carbs_limit,
+                :protein_target)
+    """
+    _UPDATE_PREFERENCES = """
+        UPDATE user_preferences SET
+            allergies = :allergies, disliked_ingredients = :disliked_ingredients,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE id = :id
+    """
+    _INSERT_PREFERENCES = """
+        INSERT INTO user_preferences (id, user_id, allergies, disliked_ingredients)
+        VALUES (:id, :user_id, :allergies, :disliked_ingredients)
+    """
+
+    def save_profile(self, user_id, profile, metrics=None):
+        with self.session_factory() as db:
+            self._save_profiles(db, [(user_id, profile, metrics)])
+
+    def register_profiles(self, profiles):
+        # One transaction for the whole list, one statement per table
+        with self.session_factory() as db:
+            db.execute(
+                text("DELETE FROM chat_history WHERE user_id = :user_id"),
+                [{"user_id": user_id} for user_id, _, _ in profiles]
+            )
+            self._save_profiles(db, profiles)
+
+    def _save_profiles(self, db: Session, profiles: List[Registration]) -> None:
+        """Upsert the user, health profile and preference rows of several users."""
+        if not profiles:
+            return
+
+        # Registration is anonymous, so create placeholder user rows
+        user_ids = list(dict.fromkeys(user_id for user_id, _, _ in profiles))
+        existing = self._existing_ids(db, "users", user_ids)
+        missing = [
+            {"id": user_id, "email": f"{user_id}@anonymous.local"}
+            for user_id in user_ids if user_id not in existing
+        ]
+        if missing:
+            insert_user = text("INSERT INTO users (id, email) VALUES (:id, :email)")
+            try:
+                with db.begin_nested():
+                    db.execute(insert_user, missing)
+            except IntegrityError:
+                # Some were created meanwhile by another worker
+                for values in missing:
+                    try:
+                        with db.begin_nested():
+                            db.execute(insert_user, values)
+                    except IntegrityError:
+                        pass
+
+        health_rows, preference_rows = [], []
+        for user_id, profile, metrics in profiles:
+            health_rows.append({
+                "id": user_id,
+                "user_id": user_id,
+                "height_cm": profile.height_cm,
+                "weight_kg": profile.weight_kg,
+                "activity_level": profile.activity_level.value,
+                "exercise_freq_per_week": profile.exercise_freq_per_week,
+                "diabetic_type": profile.diabetic_type.value,
+                "bmr": metrics.bmr if metrics else None,
+                "tdee": metrics.tdee if metrics else None,
+                "daily_calories": metrics.daily_calories if metrics else None,
+                "max_carbs_per_meal": metrics.max_carbs_per_meal if metrics else None,
+                "daily_carbs_limit": metrics.daily_carbs_limit if metrics else None,
+                "protein_target": metrics.protein_target if metrics else None,
+            })
+            preference_rows.append({
+                "id": user_id,
+                "user_id": user_id,
+                "allergies": json.dumps(profile.allergies),
+                "disliked_ingredients": json.dumps(profile.disliked_ingredients),
+            })
+
+        self._upsert_many(db, "user_health_profiles", self._UPDATE_PROFILE, self._INSERT_PROFILE, health_rows)
+        self._upsert_many(db, "user_preferences", self._UPDATE_PREFERENCES, self._INSERT_PREFERENCES, preference_rows)
+
+    def load_profile(self, user_id):
+        with self.session_factory() as db:
+            row = db.execute(
+                text("""
+                    SELECT height_cm, weight_kg, activity_level, exercise_freq_per_week, diabetic_type
+                    FROM user_health_profiles WHERE id = :id
+                """),
+                {"id": user_id}
+            ).fetchone()
+            preferences = db.execute(
+                text("SELECT allergies, disliked_ingredients FROM user_preferences WHERE id = :id"),
+                {"id": user_id}
+            ).fetchone()
+
+        if not row:
+            return None
+
+        return UserProfileRequest(
+            user_id=user_id,
+            height_cm=float(row.height_cm),
+            weight_kg=float(row.weight_kg),
+            activity_level=row.activity_level,
+            exercise_freq_per_week=row.exercise_freq_per_week or 0,
+            diabetic_type=row.diabetic_type,
+            allergies=json.loads(preferences.allergies or "[]") if preferences else [],
+            disliked_ingredients=json.loads(preferences.disliked_ingredients or "[]") if preferences else []
+        )
+
+    def append_messages(self, user_id, messages):
+        # Nanosecond timestamps order messages across workers without
+        # reading the history first; legacy rows hold small counters
+        seq = time.time_ns()
+        with self.session_factory() as db:
+            for role, content in messages:
+                db.execute(
+                    text("""
+                        INSERT INTO chat_history (id, user_id, role, content, metadata)
+                        VALUES (:id, :user_id, :role, :content, :metadata)
+                    """),
+                    {
+                        "id": str(uuid4()), "user_id": user_id, "role": role,
+                        "content": content, "metadata": json.dumps({"seq": seq})
+                    }
+                )
+                seq += 1
+
+    def load_messages(self, user_id):
+        with self.session_factory() as db:
+            rows = db.execute(
+                text("""
+                    SELECT role, content, metadata FROM chat_history
+                    WHERE user_id = :user_id ORDER BY created_at
+                """),
+                {"user_id": user_id}
+            ).fetchall()
+
+        # created_at has one-second resolution on some databases; seq breaks ties
+        rows = sorted(rows, key=lambda row: json.loads(row.metadata or "{}").get("seq", 0))
+        return [{"role": row.role, "content": row.content} for row in rows]
+
+    def count_messages(self, user_id):
+        with self.session_factory() as db:
+            return self._count(db, user_id)
+
+    def clear_messages(self, user_id):
+        with self.session_factory() as db:
+            db.execute(text("DELETE FROM chat_history WHERE user_id = :user_id"), {"user_id": user_id})
+
+    @staticmethod
+    def _upsert(db: Session, update_sql: str, insert_sql: str, values: Dict[str, Any]) -> None:
+        """
+        Update a row, or insert it if missing.
+
+        The insert runs in a savepoint, so a row created meanwhile by
+        another worker turns into the update instead of an error.
+        """
+        if db.execute(text(update_sql), values).rowcount:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(text(insert_sql), values)
+        except IntegrityError:
+            db.execute(text(update_sql), values)
+
+    @classmethod
+    def _upsert_many(
+        cls, db: Session, table: str, update_sql: str, insert_sql: str, rows: List[Dict[str, Any]]
+    ) -> None:
+        """
+        _upsert for many rows, with one executemany UPDATE and INSERT.
+
+        If the INSERT collides with rows created meanwhile by another
+        worker (or with a user listed twice), its rows are upserted one
+        at a time instead.
+        """
+        existing = cls._existing_ids(db, table, [row["id"] for row in rows])
+        updates = [row for row in rows if row["id"] in existing]
+        inserts = [row for row in rows if row["id"] not in existing]
+
+        if updates:
+            db.execute(text(update_sql), updates)
+        if not inserts:
+            return
+        try:
+            with db.begin_nested():
+                db.execute(text(insert_sql), inserts)
+        except IntegrityError:
+            for row in inserts:
+                cls._upsert(db, update_sql, insert_sql, row)
+
+    @staticmethod
+    def _existing_ids(db: Session, table: str, ids: List[str]) -> set:
+        """The ids among `ids` that already have a row in `table`."""
+        query = text(f"SELECT id FROM {table} WHERE id IN :ids").bindparams(bindparam("ids", expanding=True))
+        return set(db.execute(query, {"ids": ids}).scalars())
+
+    @staticmethod
+    def _count(db: Session, user_id: str) -> int:
+        return db.execute(
+            text("SELECT COUNT(*) FROM chat_history WHERE user_id = :user_id"),
+            {"user_id": user_id}
+        ).scalar() or 0
+
+
+class RedisSessionBackend(SessionBackend):
+    """
+    Backend on any Redis-protocol server.
+
+    The client only needs get/set/rpush/lrange/llen/delete/expire, so a
+    local stand-in (e.g. fakeredis) can replace redis.Redis.
+    """
+
+    def __init__(self, client: Any, prefix: str = "diabeatit", ttl_seconds: Optional[int] = None):
+        """
+        Args:
+            client: Redis-protocol client
+            prefix: Key prefix
+            ttl_seconds: Optional expiry refreshed on every write
+        """
+        self.client = client
+        self.prefix = prefix
+        self.ttl_seconds = ttl_seconds
+
+    def _profile_key(self, user_id: str) -> str:
+        return f"{self.prefix}:profile:{user_id}"
+
+    def _chat_key(self, user_id: str) -> str:
+        return f"{self.prefix}:chat:{user_id}"
+
+    def _refresh(self, key: str) -> None:
+        if self.ttl_seconds:
+            self.client.expire(key, self.ttl_seconds)
+
+    def save_profile(self, user_id, profile, metrics=None):
+        key = self._profile_key(user_id)
+        self.client.set(key, profile.model_dump_json())
+        self._refresh(key)
+
+    def load_profile(self, user_id):
+        key = self._profile_key(user_id)
+        data = self.client.get(key)
+        if not data:
+            return None
+        self._refresh(key)  # Active users keep their profile
+        return UserProfileRequest.model_validate_json(data)
+
+    def append_messages(self, user_id, messages):
+        if not messages:
+            return
+        key = self._chat_key(user_id)
+        self.client.rpush(key, *[
+            json.dumps({"role": role, "content": content}, ensure_ascii=False)
+            for role, content in messages
+        ])
+        self._refresh(key)
+
+    def load_messages(self, user_id):
+        return [json.loads(item) for item in self.client.lrange(self._chat_key(user_id), 0, -1)]
+
+    def count_messages(self, user_id):
+        return self.client.llen(self._chat_key(user_id))
+
+    def clear_messages(self, user_id):
+        self.client.delete(self._chat_key(user_id))
+
+
+def create_session_backend(
+    backend: str,
+    redis_url: Optional[str] = None,
+    ttl_seconds: int = 0,
+    max_profiles: int = 100000
+) -> SessionBackend:
+    """
+    Build the configured backend.
+
+    Args:
+        backend: memory, sql or redis
+        redis_url: Connection URL for the redis backend
+        ttl_seconds: Idle expiry of memory profiles and redis keys (0 disables)
+        max_profiles: Profiles kept by the memory backend
+    """
+    if backend == "sql":
+        from app.database.connection import get_db_context
+        return SQLSessionBackend(get_db_context)
+
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("SESSION_BACKEND=redis requires the 'redis' package") from e
+        return RedisSessionBackend(redis.Redis.from_url(redis_url), ttl_seconds=ttl_seconds or None)
+
+    return MemorySessionBackend(max_profiles=max_profiles, ttl_seconds=ttl_seconds)
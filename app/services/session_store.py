@@ -0,0 +1,188 @@
+"""
+Bounded in-memory store for per-user sessions.
+LRU eviction with idle TTL - evicted sessions are rebuilt from the backend.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from app.models.health import HealthMetrics
+from app.models.user import UserProfileRequest
+from app.services.session_backend import MemorySessionBackend, SessionBackend
+
+
+class SessionStore:
+    """
+    Holds live user sessions (agents, metrics) up to a size limit.
+
+    Profiles and chat history live in the SessionBackend, which may be
+    shared between workers; live sessions are a per-worker cache of the
+    objects rebuilt from it.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SessionBackend] = None,
+        max_sessions: int = 1000,
+        ttl_seconds: int = 3600
+    ):
+        """
+        Args:
+            backend: Profile and chat history storage (process-local by default)
+            max_sessions: Maximum number of live sessions (LRU beyond that)
+            ttl_seconds: Idle time after which a session expires (0 disables)
+        """
+        self.backend = backend or MemorySessionBackend()
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_access: Dict[str, float] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rebuilds = 0
+
+    def put(
+        self,
+        user_id: str,
+        profile: UserProfileRequest,
+        session: Dict[str, Any],
+        metrics: Optional[HealthMetrics] = None
+    ) -> None:
+        """Store a session and persist the profile it was built from."""
+        self.backend.save_profile(user_id, profile, metrics)
+        with self._lock:
+            self._store(user_id, session)
+
+    def get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Return the live session, or None if unknown, evicted or expired."""
+        with self._lock:
+            self._expire(time.monotonic())
+            session = self._sessions.get(user_id)
+            if session is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._touch(user_id)
+            return session
+
+    def get_or_rebuild(
+        self,
+        user_id: str,
+        factory: Callable[[UserProfileRequest], Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Return the live session, rebuilding it from the stored profile if needed.
+
+        Args:
+            user_id: User ID
+            factory: Builds a session from a profile
+
+        Returns:
+            The session, or None if the user never registered
+        """
+        session = self.get(user_id)
+        if session is not None:
+            return session
+        return self.rebuild(user_id, factory)
+
+    def rebuild(
+        self,
+        user_id: str,
+        factory: Callable[[UserProfileRequest], Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build and store a session from the stored profile.
+
+        Reads the backend, so async callers run it in a thread after get() missed.
+
+        Returns:
+            The session, or None if the user never registered
+        """
+        profile = self.get_profile(user_id)
+        if profile is None:
+            return None
+
+        session = factory(profile)
+        with self._lock:
+            self.rebuilds += 1
+            self._store(user_id, session)
+        return session
+
+    def discard(self, user_id: str) -> None:
+        """Drop a live session; the next request rebuilds it from the stored profile."""
+        with self._lock:
+            if self._sessions.pop(user_id, None) is not None:
+                del self._last_access[user_id]
+
+    def get_profile(self, user_id: str) -> Optional[UserProfileRequest]:
+        """Return the registered profile, even if the session was evicted."""
+        return self.backend.load_profile(user_id)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.get_profile(user_id) is not None
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for sizing workers."""
+        with self._lock:
+            self._expire(time.monotonic())
+            sessions = list(self._sessions.values())
+
+        chat_turns = 0
+        history_chars = 0
+        for session in sessions:
+            chat = getattr(session.get("conversation_agent"), "chat", None)
+            if chat is None:
+                continue
+            chat_turns += len(chat.history)
+            for content in chat.history:
+                for part in content.parts:
+                    history_chars += len(getattr(part, "text", "") or "")
+
+        return {
+            "live_sessions": len(sessions),
+            "backend": type(self.backend).__name__,
+            "max_sessions": self.max_sessions,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rebuilds": self.rebuilds,
+            "chat_turns": chat_turns,
+            "chat_history_chars": history_chars,
+        }
+
+    def _store(self, user_id: str, session: Dict[str, Any]) -> None:
+        """Insert a session and evict the least recently used beyond the limit."""
+        self._sessions[user_id] = session
+        self._touch(user_id)
+
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._last_access.pop(evicted, None)
+            self.evictions += 1
+
+    def _touch(self, user_id: str) -> None:
+        self._sessions.move_to_end(user_id)
+        self._last_access[user_id] = time.monotonic()
+
+    def _expire(self, now: float) -> None:
+        """Drop idle sessions; the oldest are always at the front."""
+        if not self.ttl_seconds:
+            return
+
+        while self._sessions:
+            user_id = next(iter(self._sessions))
+            if now - self._last_access[user_id] < self.ttl_seconds:
+                break
+            del self._sessions[user_id]
+            del self._last_access[user_id]
+            self.expirations += 1
@@ -0,0 +1,166 @@
+"""
+Merging per-day meal plans into a week.
+Deterministic, so the variety limit and the shopping list never depend
+on which model call produced a day - NO AI needed.
+"""
+
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models.recipe import MealPlan
+from app.services.ingredient_index import normalize_ingredient, parse_ingredients
+from app.services.meal_plan_solver import MealPlanSolver
+
+
+WEEK_DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+MEAL_SLOTS = MealPlanSolver.MEAL_SLOTS
+
+# A day: slot -> recipe ids; a week: day -> day
+DayPlan = Dict[str, List[str]]
+
+
+def group_by_category(recipes: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+    """Recipes grouped by category, keeping their order."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for recipe in recipes:
+        grouped.setdefault(recipe.get("category"), []).append(recipe)
+    return grouped
+
+
+def day_from_solver(plan: MealPlan) -> DayPlan:
+    """Recipe ids per slot of a MealPlanSolver plan."""
+    return {slot: [item.id for item in getattr(plan, slot).recipes] for slot in MEAL_SLOTS}
+
+
+def clean_day(value: Any, recipes_by_id: Dict[str, Dict[str, Any]]) -> Optional[DayPlan]:
+    """
+    Validate one day returned by Gemini.
+
+    Returns:
+        The day with unknown ids removed, or None if it is not a day at all
+    """
+    if not isinstance(value, dict):
+        return None
+
+    day = {}
+    for slot in MEAL_SLOTS:
+        ids = value.get(slot) or []
+        if not isinstance(ids, list):
+            return None
+        # Keep known ids once per meal, in the model's order
+        day[slot] = list(dict.fromkeys(rid for rid in ids if isinstance(rid, str) and rid in recipes_by_id))
+
+    return day if any(day.values()) else None
+
+
+def _meal_carbs(ids: List[str], recipes_by_id: Dict[str, Dict[str, Any]]) -> float:
+    return sum(float(recipes_by_id[rid].get("carbs") or 0) for rid in ids)
+
+
+def enforce_variety(
+    week: Dict[str, DayPlan],
+    recipes_by_id: Dict[str, Dict[str, Any]],
+    max_repeats: int,
+    max_carbs_per_meal: float
+) -> Tuple[int, int, int]:
+    """
+    Limit every recipe to `max_repeats` uses per week, in place.
+
+    Days are walked in order; a recipe past its limit is swapped for the
+    least-used recipe of the same category that keeps the meal within
+    the carb limit. Without such a recipe it is dropped, unless it is the
+    only recipe of its meal: a catalog too small for the limit keeps the
+    repeat rather than leaving the meal empty.
+
+    Returns:
+        (replaced, dropped, kept over the limit) recipe counts
+    """
+    uses: Counter = Counter()
+    replaced = dropped = over_limit = 0
+
+    for day in WEEK_DAYS:
+        for slot in MEAL_SLOTS:
+            meal = week.get(day, {}).get(slot, [])
+            kept: List[str] = []
+            for i, rid in enumerate(meal):
+                if uses[rid] < max_repeats:
+                    uses[rid] += 1
+                    kept.append(rid)
+                    continue
+
+                others = kept + meal[i + 1:]
+                budget = max_carbs_per_meal - _meal_carbs(others, recipes_by_id)
+                category = recipes_by_id[rid].get("category")
+                alternatives = sorted(
+                    (
+                        candidate for candidate in recipes_by_id.values()
+                        if candidate.get("category") == category
+                        and uses[candidate["id"]] < max_repeats
+                        and candidate["id"] not in others
+                        and float(candidate.get("carbs") or 0) <= budget
+                    ),
+                    key=lambda candidate: (uses[candidate["id"]], float(candidate.get("carbs") or 0), candidate["id"])
+                )
+                if alternatives:
+                    kept.append(alternatives[0]["id"])
+                    uses[kept[-1]] += 1
+                    replaced += 1
+                elif others:
+                    dropped += 1
+                else:
+                    kept.append(rid)
+                    uses[rid] += 1
+                    over_limit += 1
+
+            if kept != meal:
+                week[day][slot] = kept
+
+    return replaced, dropped, over_limit
+
+
+def empty_meals(week: Dict[str, DayPlan]) -> List[str]:
+    """Meals of the week without any recipe, as "day slot"."""
+    return [f"{day} {slot}" for day in WEEK_DAYS for slot in MEAL_SLOTS if not week.get(day, {}).get(slot)]
+
+
+def build_shopping_list(week: Dict[str, DayPlan], recipes_by_id: Dict[str, Dict[str, Any]]) -> List[str]:
+    """
+    Ingredients of every planned meal, merged by normalized name.
+
+    Items are sorted by name and note how many planned meals need them;
+    recipes without an ingredient list contribute their own name.
+    """
+    counts: Counter = Counter()
+    for day in week.values():
+        for ids in day.values():
+            for rid in ids:
+                recipe = recipes_by_id[rid]
+                items = {normalize_ingredient(line) for line in parse_ingredients(recipe.get("ingredients"))}
+                items.discard("")
+                counts.update(items or {(recipe.get("name_en") or recipe["name"]).lower()})
+
+    return [
+        f"{item} (for {count} meals)" if count > 1 else item
+        for item, count in sorted(counts.items())
+    ]
+
+
+def weekly_summary(week: Dict[str, DayPlan], recipes_by_id: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Average daily nutrition and the most-repeated recipe count."""
+    totals = {"calories": 0.0, "carbs": 0.0, "protein": 0.0}
+    uses: Counter = Counter()
+    for day in week.values():
+        for ids in day.values():
+            uses.update(ids)
+            for rid in ids:
+                for key in totals:
+                    totals[key] += float(recipes_by_id[rid].get(key) or 0)
+
+    days = max(len(week), 1)
+    return {
+        "avg_daily_calories": round(totals["calories"] / days),
+        "avg_daily_carbs": round(totals["carbs"] / days, 1),
+        "avg_daily_protein": round(totals["protein"] / days, 1),
+        "distinct_recipes": len(uses),
+        "max_recipe_uses": max(uses.values(), default=0),
+    }
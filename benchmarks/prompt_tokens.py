@@ -0,0 +1,95 @@
+"""
+Benchmark: prompt size of recipe candidates, JSON rows vs compact tables.
+
+Renders the recipe section of each Gemini prompt both ways - the previous
+json.dumps of full SELECT * rows and the RecipeTable encoding - and prints
+characters and tokens for each.
+
+Tokens are estimated at ~4 characters per token; pass --gemini to count
+them with the Gemini count_tokens API instead (needs GEMINI_API_KEY).
+
+Usage:
+    python -m benchmarks.prompt_tokens [--gemini]
+"""
+
+import argparse
+import json
+import random
+
+from app.agents.prompt_encoding import RecipeTable
+from app.agents.rate_limiter import estimate_tokens
+
+
+CATEGORIES = ["protein", "vegetable", "carb", "soup", "snack"]
+INGREDIENTS = ["Chicken breast 200g", "Garlic 3 cloves", "Ginger 3 slices", "Soy sauce 1 tbsp",
+               "Broccoli 150g", "Olive oil 1 tsp", "Tomato 2", "Egg 2", "Green onion 1", "Salt to taste"]
+
+
+def make_recipes(count: int, rng: random.Random) -> list:
+    """Rows shaped like RecipeRepository.search results."""
+    return [
+        {
+            "id": f"3f2c9a1e-8d4b-4c6f-9e21-{i:012d}",
+            "name": f"Steamed {rng.choice(['Chicken', 'Fish', 'Tofu', 'Broccoli'])} with {rng.choice(['Ginger', 'Garlic', 'Scallion'])}",
+            "name_en": None,
+            "description": "A light, home-style dish that keeps blood sugar steady.",
+            "category": rng.choice(CATEGORIES),
+            "calories": rng.randint(40, 450),
+            "carbs": round(rng.uniform(0, 40), 1),
+            "protein": round(rng.uniform(1, 35), 1),
+            "fat": round(rng.uniform(0, 15), 1),
+            "fiber": round(rng.uniform(0, 8), 1),
+            "sodium": rng.randint(50, 600),
+            "sugar": round(rng.uniform(0, 6), 1),
+            "gi_level": "low",
+            "diabetic_friendly": 1,
+            "blood_sugar_impact": "minimal",
+            "cooking_time_mins": rng.randint(5, 45),
+            "difficulty": "easy",
+            "servings": 1,
+            "cuisine": "chinese",
+            "tags": json.dumps(["low-gi", "high-protein"]),
+            "ingredients": json.dumps(rng.sample(INGREDIENTS, 5)),
+            "instructions": json.dumps(["Prepare the ingredients.", "Steam for 10 minutes.", "Season and serve."]),
+            "image_url": f"https://example.com/images/recipes/{i}.jpg",
+            "created_at": "2026-01-01 08:00:00",
+            "updated_at": "2026-01-01 08:00:00",
+        }
+        for i in range(count)
+    ]
+
+
+# (prompt, candidate count, previous encoding)
+PROMPTS = [
+    ("daily plan", 20, lambda recipes: json.dumps(recipes, ensure_ascii=False, indent=2)),
+    ("weekly plan", 30, lambda recipes: json.dumps(recipes, ensure_ascii=False)),
+    ("chat search results", 10, lambda recipes: json.dumps(recipes, ensure_ascii=False)),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--gemini", action="store_true", help="Count tokens with the Gemini API")
+    args = parser.parse_args()
+
+    count_tokens = estimate_tokens
+    if args.gemini:
+        from app.agents.gemini_client import get_gemini_client
+
+        model = get_gemini_client().get_model("benchmark", lambda: {})
+        count_tokens = lambda text: model.count_tokens(text).total_tokens
+
+    rng = random.Random(42)
+    print(f"{'prompt section':<22}{'JSON chars':>12}{'table chars':>13}{'JSON tokens':>13}{'table tokens':>14}{'saved':>8}")
+    for label, count, previous in PROMPTS:
+        recipes = make_recipes(count, rng)
+        before, after = previous(recipes), RecipeTable(recipes).encode()
+        tokens_before, tokens_after = count_tokens(before), count_tokens(after)
+        print(
+            f"{label + f' ({count})':<22}{len(before):>12,}{len(after):>13,}"
+            f"{tokens_before:>13,}{tokens_after:>14,}{1 - tokens_after / tokens_before:>8.0%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Benchmark: recipe search and chat history queries with and without the managed indexes.
+
+Builds a throwaway SQLite database with a synthetic catalog, runs the
+exact SQL issued by RecipeRepository.search, and prints the query plan
+and median latency of each query before and after create_indexes.
+
+Usage:
+    python -m benchmarks.recipe_search_indexes [--recipes 100000]
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+
+from app.database.indexes import create_indexes
+from app.services.recipe_repository import RecipeRepository
+
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "database", "schema.sql")
+
+CATEGORIES = ["protein", "vegetable", "carb", "soup", "snack", "beverage"]
+CUISINES = ["chinese", "japanese", "italian", "mexican", "indian", "mediterranean", None]
+
+# Search calls made by the API and the agents
+SEARCHES = {
+    "meal plan (max_carbs=45, limit=20)": dict(max_carbs=45, gi_level="low", limit=20),
+    "agent category search": dict(category="protein", max_carbs=45, limit=10),
+    "quick vegetables": dict(category="vegetable", max_cooking_time=15, limit=10),
+    "low sodium soups": dict(category="soup", max_sodium=300, limit=10),
+    "cuisine filter": dict(cuisine="italian", limit=10),
+}
+
+
+def populate(session_factory, recipes: int, users: int, messages_per_user: int) -> None:
+    """Insert a synthetic catalog and chat history."""
+    rng = random.Random(42)
+    with session_factory() as db:
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            for statement in f.read().split(";"):
+                if statement.strip():
+                    db.execute(text(statement))
+
+        rows = [
+            {
+                "id": f"r{i:06d}",
+                "name": f"Recipe {i}",
+                "category": rng.choice(CATEGORIES),
+                "calories": rng.randint(20, 700),
+                "carbs": round(rng.uniform(0, 90), 1),
+                "protein": round(rng.uniform(0, 45), 1),
+                "sodium": rng.choice([None, rng.randint(0, 1500)]),
+                "gi_level": rng.choices(["low", "medium", "high"], weights=[6, 3, 1])[0],
+                "diabetic_friendly": rng.random() < 0.9,
+                "cooking_time_mins": rng.choice([None, rng.randint(5, 120)]),
+                "cuisine": rng.choice(CUISINES),
+            }
+            for i in range(recipes)
+        ]
+        db.execute(
+            text("""
+                INSERT INTO recipes
+                (id, name, category, calories, carbs, protein, sodium, gi_level,
+                 diabetic_friendly, cooking_time_mins, cuisine)
+                VALUES (:id, :name, :category, :calories, :carbs, :protein, :sodium, :gi_level,
+                        :diabetic_friendly, :cooking_time_mins, :cuisine)
+            """),
+            rows
+        )
+
+        db.execute(
+            text("""
+                INSERT INTO chat_history (id, user_id, role, content, created_at)
+                VALUES (:id, :user_id, :role, :content, :created_at)
+            """),
+            [
+                {
+                    "id": f"m{u:05d}-{m:04d}",
+                    "user_id": f"u{u:05d}",
+                    "role": "user" if m % 2 == 0 else "assistant",
+                    "content": "Something light for dinner?",
+                    "created_at": f"2026-01-01 00:{m // 60:02d}:{m % 60:02d}",
+                }
+                for u in range(users)
+                for m in range(messages_per_user)
+            ]
+        )
+        db.commit()
+
+
+def capture_statement(engine, call):
+    """Run `call` and return the last SQL statement and parameters it executed."""
+    captured = {}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        captured["statement"], captured["parameters"] = statement, parameters
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured["statement"], captured["parameters"]
+
+
+def measure(call, repeat: int) -> float:
+    """Median latency of `call` in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def run_queries(engine, session_factory, repeat: int) -> dict:
+    """Plan and median latency of every benchmarked query."""
+    results = {}
+    with session_factory() as db:
+        repo = RecipeRepository(db, use_index=False)
+
+        for label, filters in SEARCHES.items():
+            search = lambda: repo.search(**filters)
+            statement, parameters = capture_statement(engine, search)
+            plan = db.connection().exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+            results[label] = (measure(search, repeat), [row[-1] for row in plan])
+
+        history_sql = text("SELECT role, content FROM chat_history WHERE user_id = :user_id ORDER BY created_at")
+        history = lambda: db.execute(history_sql, {"user_id": "u00042"}).fetchall()
+        plan = db.execute(text(f"EXPLAIN QUERY PLAN {history_sql.text}"), {"user_id": "u00042"}).fetchall()
+        results["chat history for one user"] = (measure(history, repeat), [row[-1] for row in plan])
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--users", type=int, default=2_000)
+    parser.add_argument("--messages-per-user", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        session_factory = sessionmaker(bind=engine)
+
+        print(f"Populating {args.recipes:,} recipes and {args.users * args.messages_per_user:,} chat messages...")
+        populate(session_factory, args.recipes, args.users, args.messages_per_user)
+
+        before = run_queries(engine, session_factory, args.repeat)
+        with engine.begin() as conn:
+            created = create_indexes(conn)
+            conn.exec_driver_sql("ANALYZE")
+        print(f"Created indexes: {', '.join(created)}\n")
+        after = run_queries(engine, session_factory, args.repeat)
+
+        for label in before:
+            (t_before, plan_before), (t_after, plan_after) = before[label], after[label]
+            print(f"{label}")
+            print(f"  without indexes: {t_before:8.2f} ms   plan: {'; '.join(plan_before)}")
+            print(f"  with indexes:    {t_after:8.2f} ms   plan: {'; '.join(plan_after)}")
+            print(f"  speedup:         {t_before / t_after:8.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+Benchmark: concurrent reads and writes on SQLite with and without the tuned PRAGMAs.
+
+Runs the same mixed workload twice, once on SQLite's defaults and once with
+the profile from app.database.sqlite: reader threads load chat history and
+today's meal logs while writer threads append chat turns and meal logs,
+one commit each. Prints throughput, p95 latency and "database is locked"
+errors for both.
+
+Usage:
+    python -m benchmarks.sqlite_pragmas [--readers 8] [--writers 4] [--seconds 10]
+
+Temporary files live on tmpfs on many systems, which hides fsync cost;
+pass --dir to run on the disk the app uses.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from types import SimpleNamespace
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.config import Settings
+from app.database.indexes import create_indexes
+from app.database.sqlite import configure_sqlite, read_pragmas, sqlite_pragmas
+
+
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), "..", "app", "database", "schema.sql")
+
+HISTORY_SQL = text("SELECT role, content FROM chat_history WHERE user_id = :user_id ORDER BY created_at")
+MEAL_LOGS_SQL = text("SELECT COUNT(*), SUM(total_carbs) FROM meal_logs WHERE user_id = :user_id")
+INSERT_MESSAGE_SQL = text("""
+    INSERT INTO chat_history (id, user_id, role, content) VALUES (:id, :user_id, :role, :content)
+""")
+INSERT_MEAL_LOG_SQL = text("""
+    INSERT INTO meal_logs (id, user_id, meal_type, recipe_ids, total_calories, total_carbs)
+    VALUES (:id, :user_id, 'lunch', '[]', :calories, :carbs)
+""")
+
+
+def default_profile() -> SimpleNamespace:
+    """The sqlite_* defaults of Settings, without needing a .env."""
+    return SimpleNamespace(**{
+        name: field.default for name, field in Settings.model_fields.items() if name.startswith("sqlite_")
+    })
+
+
+def populate(engine, users: int, messages_per_user: int) -> None:
+    """Create the schema and a synthetic chat history."""
+    with engine.begin() as conn:
+        with open(SCHEMA_PATH, "r", encoding="utf-8") as f:
+            for statement in f.read().split(";"):
+                if statement.strip():
+                    conn.execute(text(statement))
+        create_indexes(conn)
+        conn.execute(
+            text("""
+                INSERT INTO chat_history (id, user_id, role, content, created_at)
+                VALUES (:id, :user_id, :role, :content, :created_at)
+            """),
+            [
+                {
+                    "id": f"m{u:05d}-{m:04d}",
+                    "user_id": f"u{u:05d}",
+                    "role": "user" if m % 2 == 0 else "assistant",
+                    "content": "Something light for dinner?",
+                    "created_at": f"2026-01-01 00:{m // 60:02d}:{m % 60:02d}",
+                }
+                for u in range(users)
+                for m in range(messages_per_user)
+            ]
+        )
+
+
+def reader(engine, users: int, stop: threading.Event, result: dict) -> None:
+    rng = random.Random()
+    while not stop.is_set():
+        user_id = f"u{rng.randrange(users):05d}"
+        start = time.perf_counter()
+        try:
+            with engine.connect() as conn:
+                conn.execute(HISTORY_SQL, {"user_id": user_id}).fetchall()
+                conn.execute(MEAL_LOGS_SQL, {"user_id": user_id}).fetchall()
+        except OperationalError:
+            result["errors"] += 1
+            continue
+        result["latencies"].append((time.perf_counter() - start) * 1000)
+
+
+def writer(engine, users: int, stop: threading.Event, result: dict) -> None:
+    rng = random.Random()
+    while not stop.is_set():
+        user_id = f"u{rng.randrange(users):05d}"
+        start = time.perf_counter()
+        try:
+            with engine.begin() as conn:
+                conn.execute(INSERT_MESSAGE_SQL, [
+                    {"id": str(uuid.uuid4()), "user_id": user_id, "role": "user", "content": "What about lunch?"},
+                    {"id": str(uuid.uuid4()), "user_id": user_id, "role": "assistant", "content": "Try the tofu salad."},
+                ])
+                conn.execute(INSERT_MEAL_LOG_SQL, {
+                    "id": str(uuid.uuid4()), "user_id": user_id,
+                    "calories": rng.randint(200, 700), "carbs": round(rng.uniform(10, 60), 1)
+                })
+        except OperationalError:
+            result["errors"] += 1
+            continue
+        result["latencies"].append((time.perf_counter() - start) * 1000)
+
+
+def run_workload(engine, users: int, readers: int, writers: int, seconds: float) -> dict:
+    """Operations, p95 latency and errors per role over `seconds`."""
+    stop = threading.Event()
+    results = {
+        role: [{"latencies": [], "errors": 0} for _ in range(count)]
+        for role, count in (("reads", readers), ("writes", writers))
+    }
+    threads = [
+        threading.Thread(target=target, args=(engine, users, stop, result))
+        for target, role in ((reader, "reads"), (writer, "writes"))
+        for result in results[role]
+    ]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    summary = {}
+    for role, per_thread in results.items():
+        latencies = [ms for result in per_thread for ms in result["latencies"]]
+        summary[role] = {
+            "ops_per_sec": len(latencies) / seconds,
+            "p95_ms": statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else 0.0,
+            "errors": sum(result["errors"] for result in per_thread),
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--messages-per-user", type=int, default=40)
+    parser.add_argument("--dir", default=None, help="Directory for the database files")
+    args = parser.parse_args()
+
+    pragmas = sqlite_pragmas(default_profile())
+    print(f"Tuned profile: {', '.join(f'{name}={value}' for name, value in pragmas.items())}")
+    print(f"{args.readers} readers, {args.writers} writers, {args.seconds:g}s per run\n")
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for label, profile in (("sqlite defaults", {}), ("tuned", pragmas)):
+            engine = create_engine(
+                f"sqlite:///{os.path.join(tmp, label.replace(' ', '_') + '.db')}",
+                pool_size=args.readers + args.writers,
+                max_overflow=0
+            )
+            configure_sqlite(engine, profile)
+            populate(engine, args.users, args.messages_per_user)
+            with engine.connect() as conn:
+                in_effect = read_pragmas(conn, ["journal_mode", "synchronous"])
+            print(f"Running {label} (journal_mode={in_effect['journal_mode']}, synchronous={in_effect['synchronous']})...")
+            results[label] = run_workload(engine, args.users, args.readers, args.writers, args.seconds)
+            engine.dispose()
+
+    print()
+    for role in ("reads", "writes"):
+        before, after = results["sqlite defaults"][role], results["tuned"][role]
+        print(role)
+        for label, result in (("sqlite defaults", before), ("tuned", after)):
+            print(
+                f"  {label + ':':17}{result['ops_per_sec']:10.0f} ops/s   "
+                f"p95 {result['p95_ms']:8.2f} ms   locked errors: {result['errors']}"
+            )
+        if before["ops_per_sec"]:
+            print(f"  throughput:      {after['ops_per_sec'] / before['ops_per_sec']:10.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
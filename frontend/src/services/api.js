@@ -132,6 +132,20 @@ export const mealPlanApi = {
     return response.data;
   },
 
+  /**
+   * Regenerate one meal of today's stored plan, keeping the others
+   * @param {string} userId - User ID
+   * @param {string} mealType - breakfast, lunch, dinner or snacks
+   * @param {string} preferences - Optional preferences for the new meal
+   * @returns {Promise} New meal and the updated plan
+   */
+  regenerateMeal: async (userId, mealType, preferences = null) => {
+    const response = await api.post(`/meal-plan/${userId}/meals/${mealType}`, {
+      preferences: preferences,
+    });
+    return response.data;
+  },
+
   /**
    * Generate a weekly meal plan
    * @param {string} userId - User ID
@@ -144,6 +158,29 @@ export const mealPlanApi = {
     });
     return response.data;
   },
+
+  /**
+   * Queue a weekly meal plan in the background
+   * @param {string} userId - User ID
+   * @param {string} preferences - Optional user preferences
+   * @returns {Promise} Job id and status URLs
+   */
+  submitWeeklyJob: async (userId, preferences = null) => {
+    const response = await api.post(`/meal-plan/${userId}/weekly/jobs`, {
+      preferences: preferences,
+    });
+    return response.data;
+  },
+
+  /**
+   * Get a background job's status and result
+   * @param {string} jobId - Job ID returned by submitWeeklyJob
+   * @returns {Promise} Job with status, result and error
+   */
+  getJob: async (jobId) => {
+    const response = await api.get(`/jobs/${jobId}`);
+    return response.data;
+  },
 };
 
 /**
@@ -152,8 +189,8 @@ export const mealPlanApi = {
 export const recipeApi = {
   /**
    * Search recipes with filters
-   * @param {Object} filters - Search filters
-   * @returns {Promise} List of recipes
+   * @param {Object} filters - Search filters (pass `cursor: next_cursor` for the next page)
+   * @returns {Promise} Page of recipes with next_cursor
    */
   search: async (filters = {}) => {
     const params = new URLSearchParams();
@@ -162,6 +199,8 @@ export const recipeApi = {
     if (filters.maxCookingTime) params.append('max_cooking_time', filters.maxCookingTime);
     if (filters.giLevel) params.append('gi_level', filters.giLevel);
     if (filters.limit) params.append('limit', filters.limit);
+    if (filters.fields) params.append('fields', filters.fields);
+    if (filters.cursor) params.append('cursor', filters.cursor);
 
     const response = await api.get(`/recipes?${params.toString()}`);
     return response.data;
@@ -0,0 +1,58 @@
+"""
+Shared fixtures.
+Settings are read from the environment at import time, so the test
+database and a dummy Gemini key are set before any app module is imported.
+"""
+
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="diabeatit-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+os.environ.setdefault("APP_ENV", "test")
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from app.database.connection import DatabaseManager, SessionLocal, get_async_engine
+from app.services.recipe_index import recipe_index
+
+
+# Tables emptied before every test, children first
+TABLES = [
+    "recipe_ingredients", "meal_plan_meals", "meal_plans", "chat_history", "meal_logs",
+    "user_preferences", "user_health_profiles", "users", "generation_jobs", "recipes",
+]
+
+
+def reset_database() -> None:
+    """Schema, the sample recipes and their ingredient index, nothing else."""
+    DatabaseManager.create_tables()
+    with SessionLocal() as db:
+        for table in TABLES:
+            db.execute(text(f"DELETE FROM {table}"))
+        db.commit()
+    DatabaseManager.seed_sample_data()
+    DatabaseManager.rebuild_ingredient_index()
+    recipe_index.invalidate()
+
+
+@pytest.fixture
+def db():
+    """Session on a freshly seeded database."""
+    reset_database()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest_asyncio.fixture
+async def async_database():
+    """Freshly seeded database for async code; pooled connections are closed after the test."""
+    reset_database()
+    yield
+    await get_async_engine().dispose()
@@ -0,0 +1,98 @@
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.conversation_agent import ConversationAgent
+from app.models.user import UserProfileRequest
+from app.services.health_calculator import HealthCalculator
+
+
+RECIPES = [
+    {"id": "r001", "name": "Grilled Chicken Breast", "category": "protein", "carbs": 0},
+    {"id": "r002", "name": "Garlic Broccoli", "category": "vegetable", "carbs": 7},
+]
+
+
+def _text(text):
+    return SimpleNamespace(text=text, parts=[SimpleNamespace(function_call=None, text=text)])
+
+
+def _calls(*calls):
+    return SimpleNamespace(parts=[
+        SimpleNamespace(function_call=SimpleNamespace(name=name, args=args), text="") for name, args in calls
+    ])
+
+
+class FakeGemini:
+    """Replays canned responses and records every message sent to the chat."""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.sent = []
+
+    def start_chat(self, model, history):
+        return SimpleNamespace(history=list(history))
+
+    async def send_message(self, chat, content):
+        self.sent.append(content)
+        return self.responses.pop(0)
+
+    async def stream_message(self, chat, content):
+        self.sent.append(content)
+        yield self.responses.pop(0)
+
+
+@pytest.fixture
+def agent():
+    agent = ConversationAgent(lambda **kwargs: RECIPES)
+    profile = UserProfileRequest(height_cm=170, weight_kg=70, activity_level=2, diabetic_type="type2")
+    agent.start_conversation(HealthCalculator.calculate(profile))
+    return agent
+
+
+def _short_ids(message):
+    return re.findall(r"^([\d.]+[RPV]\d+),", message, re.MULTILINE)
+
+
+@pytest.mark.asyncio
+async def test_short_ids_are_unique_per_tool_turn(agent):
+    agent.client = FakeGemini(
+        _calls(("search_recipes", {"category": "protein"})), _text("ok"),
+        _calls(("search_recipes", {}), ("get_meal_suggestion", {"meal_type": "lunch"})), _text("ok"),
+        _calls(("search_recipes", {})), _text("ok"),
+    )
+    for question in ("protein?", "lunch?", "more?"):
+        await agent.process_message(question)
+
+    tool_results = agent.client.sent[1::2]
+    assert _short_ids(tool_results[0]) == ["1R1", "1R2"]
+    assert _short_ids(tool_results[1]) == ["2.1R1", "2.1R2", "2.2P1", "2.2P2", "2.2V1", "2.2V2"]
+    assert _short_ids(tool_results[2]) == ["3R1", "3R2"]
+
+
+@pytest.mark.asyncio
+async def test_short_ids_in_replies_become_recipe_names(agent):
+    agent.client = FakeGemini(
+        _calls(("search_recipes", {})), _text("Try 1R1 with 1R2."),
+        _text("1R2 is high in fiber."),
+    )
+    result = await agent.process_message("dinner?")
+    assert result["message"] == "Try Grilled Chicken Breast with Garlic Broccoli."
+
+    # Ids from earlier turns are still known
+    result = await agent.process_message("why broccoli?")
+    assert result == {"type": "text", "message": "Garlic Broccoli is high in fiber."}
+
+    # A new conversation forgets them
+    agent.reset_conversation()
+    agent.client = FakeGemini(_text("1R2"))
+    assert (await agent.process_message("?"))["message"] == "1R2"
+
+
+@pytest.mark.asyncio
+async def test_streamed_reply_restores_short_ids(agent):
+    agent.client = FakeGemini(_calls(("search_recipes", {})), _text("Have 1R1."))
+    events = [event async for event in agent.stream_message("dinner?")]
+    assert events[-1]["event"] == "done"
+    assert events[-1]["data"]["message"] == "Have Grilled Chicken Breast."
@@ -0,0 +1,53 @@
+from sqlalchemy import create_engine, text
+
+from app.database.fulltext import FULLTEXT_COLUMNS, build_fulltext_query, create_fulltext_index
+from app.services.recipe_repository import RecipeRepository
+
+
+def _ids(repo, query):
+    return [r["id"] for r in repo.search_text(query, gi_level=None)]
+
+
+def test_search_does_not_depend_on_recipes_rowid(db):
+    # recipes has a text primary key, so its rowid is implicit and may be
+    # renumbered (VACUUM, INSERT OR REPLACE); here it is moved by hand
+    db.execute(text("UPDATE recipes SET rowid = rowid + 100"))
+    db.commit()
+
+    repo = RecipeRepository(db)
+    assert _ids(repo, "salmon") == ["r005"]
+    assert _ids(repo, "edamame") == ["r008"]
+
+
+def test_index_follows_inserts_updates_and_deletes(db):
+    repo = RecipeRepository(db)
+    repo.save({
+        "id": "t001", "name": "Lemon Tofu", "name_en": "Lemon Tofu", "category": "protein",
+        "calories": 150, "carbs": 6, "protein": 14, "gi_level": "low", "diabetic_friendly": 1,
+    })
+    db.commit()
+    assert _ids(repo, "lemon") == ["t001"]
+
+    repo.save({"id": "t001", "name": "Ginger Tofu", "name_en": "Ginger Tofu"})
+    db.commit()
+    assert _ids(repo, "lemon") == []
+    assert _ids(repo, "ginger") == ["t001"]
+
+    db.execute(text("DELETE FROM recipes WHERE id = 't001'"))
+    db.commit()
+    assert _ids(repo, "ginger") == []
+
+
+def test_rowid_keyed_index_is_rebuilt():
+    engine = create_engine("sqlite://")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(f"CREATE TABLE recipes (id VARCHAR(36) PRIMARY KEY, {', '.join(FULLTEXT_COLUMNS)})")
+        connection.exec_driver_sql("INSERT INTO recipes (id, name) VALUES ('r1', 'Garlic Broccoli')")
+        connection.exec_driver_sql(
+            f"CREATE VIRTUAL TABLE recipes_fts USING fts5({', '.join(FULLTEXT_COLUMNS)}, content='recipes', content_rowid='rowid')"
+        )
+        assert create_fulltext_index(connection)
+        assert not create_fulltext_index(connection)
+
+        sql, params = build_fulltext_query("sqlite", "broccoli")
+        assert [row.id for row in connection.execute(text(sql), params)] == ["r1"]
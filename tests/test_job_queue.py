@@ -0,0 +1,97 @@
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+
+from app.database.connection import get_async_db_context
+from app.services.job_queue import JobQueue
+
+
+async def _echo(payload):
+    return {"echo": payload["value"]}
+
+
+def _queue(**options):
+    queue = JobQueue(get_async_db_context, **options)
+    queue.register("echo", _echo)
+    return queue
+
+
+async def _wait_finished(queue, job_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = await queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        await queue.wait(job_id, timeout=0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+async def _mark_running(job_id, started_at):
+    async with get_async_db_context() as db:
+        await db.execute(
+            text("UPDATE generation_jobs SET status = 'running', started_at = :started_at WHERE id = :id"),
+            {"id": job_id, "started_at": started_at}
+        )
+
+
+@pytest.mark.asyncio
+async def test_submit_runs_and_deduplicates(async_database):
+    queue = _queue()
+    await queue.start()
+    try:
+        job, created = await queue.submit("echo", "u1", {"value": 1})
+        again, created_again = await queue.submit("echo", "u1", {"value": 1})
+        assert created and not created_again
+        assert again["job_id"] == job["job_id"]
+
+        finished = await _wait_finished(queue, job["job_id"])
+        assert finished["status"] == "succeeded"
+        assert finished["result"] == {"echo": 1}
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_stale_running_job_is_not_reused(async_database):
+    queue = _queue(timeout_seconds=10)
+    job, _ = await queue.submit("echo", "u1", {"value": 1})
+    await _mark_running(job["job_id"], time.time() - 60)
+
+    replacement, created = await queue.submit("echo", "u1", {"value": 1})
+    assert created and replacement["job_id"] != job["job_id"]
+    assert await queue._requeue_stale(time.time()) == [job["job_id"]]
+
+
+@pytest.mark.asyncio
+async def test_sweep_requeues_stuck_job_while_running(async_database):
+    # Sweeps every timeout / 2; the job looks like it was left by a dead process
+    queue = _queue(timeout_seconds=0.4)
+    job, _ = await queue.submit("echo", "u1", {"value": 2})
+    await queue.start()
+    try:
+        await _mark_running(job["job_id"], time.time() - 60)
+        finished = await _wait_finished(queue, job["job_id"])
+        assert finished["result"] == {"echo": 2}
+        assert queue.stats()["requeued_stale"] >= 1
+    finally:
+        await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_wait_leaves_no_events_behind(async_database):
+    queue = _queue()
+
+    # Finished in another process: only the timeout ends the wait
+    await queue.wait("elsewhere", timeout=0.01)
+    assert queue._events == {} and queue._waiters == {}
+
+    # A waiter timing out must not strand the others
+    short = asyncio.create_task(queue.wait("job", timeout=0.01))
+    long = asyncio.create_task(queue.wait("job", timeout=5.0))
+    await short
+    assert not long.done()
+    queue._notify("job")
+    await asyncio.wait_for(long, 1.0)
+    assert queue._events == {} and queue._waiters == {}
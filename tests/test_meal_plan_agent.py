@@ -0,0 +1,50 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.agents.meal_plan_agent import MealPlanAgent
+from app.models.user import UserProfileRequest
+from app.services.health_calculator import HealthCalculator
+
+
+RECIPES = [
+    {"id": "r001", "name": "Grilled Chicken Breast", "category": "protein", "carbs": 0, "calories": 165},
+    {"id": "r002", "name": "Garlic Broccoli", "category": "vegetable", "carbs": 7, "calories": 55},
+]
+
+
+class FakeGemini:
+    """Returns one canned JSON response and records the prompt."""
+
+    def __init__(self, response):
+        self.response = response
+        self.prompts = []
+
+    async def generate_content(self, model, prompt):
+        self.prompts.append(prompt)
+        return SimpleNamespace(text=json.dumps(self.response))
+
+
+def _metrics():
+    profile = UserProfileRequest(height_cm=170, weight_kg=70, activity_level=2, diabetic_type="type2")
+    return HealthCalculator.calculate(profile)
+
+
+@pytest.mark.asyncio
+async def test_weekly_plan_returns_full_recipes():
+    agent = MealPlanAgent()
+    agent.cache = None
+    agent.client = FakeGemini({
+        "weekly_plan": {"monday": {"breakfast": ["R1"], "lunch": ["R1", "R2"], "dinner": [], "snacks": []}},
+        "shopping_list": ["chicken"],
+        "weekly_summary": {"avg_daily_calories": 385, "avg_daily_carbs": 7},
+    })
+
+    result = await agent.generate_weekly_plan(_metrics(), RECIPES)
+
+    assert "r001" not in agent.client.prompts[0]
+    monday = result["weekly_plan"]["monday"]
+    assert monday["breakfast"] == [RECIPES[0]]
+    assert monday["lunch"] == RECIPES
+    assert result["shopping_list"] == ["chicken"]
@@ -0,0 +1,54 @@
+from app.models.health import HealthMetrics
+from app.services.meal_plan_solver import MealPlanSolver
+
+
+def _recipe(recipe_id, category, calories, carbs=5, protein=20, sodium=100):
+    return {
+        "id": recipe_id, "name": recipe_id, "category": category,
+        "calories": calories, "carbs": carbs, "protein": protein, "sodium": sodium,
+    }
+
+
+def _metrics(**overrides):
+    values = dict(
+        bmr=1500, tdee=2000, daily_calories=1800, max_carbs_per_meal=45,
+        daily_carbs_limit=150, protein_target=90, sodium_limit=2000,
+    )
+    return HealthMetrics(**{**values, **overrides})
+
+
+GROUPED = {
+    "protein": [_recipe("chicken", "protein", 300, carbs=0, protein=35), _recipe("tofu", "protein", 250, carbs=6)],
+    "vegetable": [_recipe("broccoli", "vegetable", 60, carbs=7, protein=4)],
+    "carb": [_recipe("rice", "carb", 200, carbs=40, protein=4)],
+    "snack": [_recipe("nuts", "snack", 150, carbs=6, protein=5)],
+}
+
+
+def test_plan_stays_within_limits():
+    metrics = _metrics()
+    plan = MealPlanSolver(metrics).solve(GROUPED)
+
+    assert plan.daily_totals.within_limits
+    assert plan.daily_totals.calories <= metrics.daily_calories
+    for slot in MealPlanSolver.MEAL_SLOTS:
+        assert getattr(plan, slot).total_carbs <= metrics.max_carbs_per_meal
+    assert all(getattr(plan, slot).recipes for slot in ("breakfast", "lunch", "dinner"))
+
+
+def test_slot_left_empty_when_daily_budget_is_used_up():
+    # Every slot has candidates, but two meals already use most of the calories
+    metrics = _metrics(daily_calories=700)
+    plan = MealPlanSolver(metrics).solve(GROUPED)
+
+    meals = [getattr(plan, slot) for slot in MealPlanSolver.MEAL_SLOTS]
+    assert sum(1 for meal in meals[:3] if meal.recipes) == 2
+    assert plan.daily_totals.calories <= 700
+    assert plan.daily_totals.within_limits
+
+
+def test_prior_uses_steer_away_from_repeats():
+    solver = MealPlanSolver(_metrics())
+    first = {item.id for item in solver.solve(GROUPED).breakfast.recipes}
+    again = solver.solve(GROUPED, prior_uses={rid: 5 for rid in first})
+    assert not first & {item.id for item in again.breakfast.recipes}
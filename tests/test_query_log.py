@@ -0,0 +1,23 @@
+from app.database.query_log import SlowQueryLog, fingerprint
+
+
+def test_fingerprint_ignores_values_and_list_length():
+    assert fingerprint("SELECT * FROM recipes WHERE id IN (?, ?, ?) AND carbs < 20") == fingerprint(
+        "SELECT * FROM recipes WHERE id IN (?, ?) AND carbs < 35"
+    )
+
+
+def test_params_are_only_logged_when_enabled(capsys):
+    SlowQueryLog(threshold_ms=0).record("sync", "SELECT :email", {"email": "a@b.c"}, False, 1.0)
+    assert "a@b.c" not in capsys.readouterr().out
+
+    SlowQueryLog(threshold_ms=0, log_params=True).record("sync", "SELECT :email", {"email": "a@b.c"}, False, 1.0)
+    assert '"params": {"email": "a@b.c"}' in capsys.readouterr().out
+
+
+def test_fast_statements_are_counted_not_logged(capsys):
+    log = SlowQueryLog(threshold_ms=100)
+    log.record("sync", "SELECT 1", (), False, 5.0)
+    log.record("sync", "SELECT 2", (), False, 150.0)
+    assert log.statements == 2 and log.slow == 1 and log.logged == 1
+    assert capsys.readouterr().out.count("slow_query") == 1
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions as google_exceptions
+
+from app.agents import rate_limiter
+from app.agents.rate_limiter import GeminiRateLimiter, RateLimitExceeded
+
+
+def _flaky(failures, error=None):
+    """Call factory failing `failures` times before it returns "ok"."""
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) <= failures:
+            raise error or google_exceptions.ResourceExhausted("quota")
+        return "ok"
+
+    return call, attempts
+
+
+@pytest.mark.asyncio
+async def test_quota_errors_are_retried_with_backoff(monkeypatch):
+    delays = []
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: delays.append(high) or high)
+    limiter = GeminiRateLimiter(backoff_seconds=0.01, max_backoff_seconds=0.02)
+    call, attempts = _flaky(2)
+
+    assert await limiter.run(call) == "ok"
+    assert len(attempts) == 3
+    assert delays == [0.01, 0.02]
+    assert limiter.quota_errors == 2 and limiter.retries == 2
+
+
+@pytest.mark.asyncio
+async def test_last_quota_error_and_other_errors_are_raised():
+    limiter = GeminiRateLimiter(max_retries=1, backoff_seconds=0.01)
+    call, attempts = _flaky(5)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        await limiter.run(call)
+    assert len(attempts) == 2
+
+    call, attempts = _flaky(1, ValueError("bad prompt"))
+    with pytest.raises(ValueError):
+        await limiter.run(call)
+    assert len(attempts) == 1
+
+
+@pytest.mark.asyncio
+async def test_backoff_pauses_every_caller(monkeypatch):
+    monkeypatch.setattr(rate_limiter.random, "uniform", lambda low, high: high)
+    limiter = GeminiRateLimiter(backoff_seconds=0.2)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    failing, _ = _flaky(1)
+    admitted = []
+
+    async def other():
+        admitted.append(loop.time() - started)
+
+    async def arrives_during_backoff():
+        await asyncio.sleep(0.05)
+        await limiter.run(other)
+
+    await asyncio.gather(limiter.run(failing), arrives_during_backoff())
+    assert admitted[0] >= 0.15
+
+
+@pytest.mark.asyncio
+async def test_calls_past_their_deadline_are_rejected():
+    limiter = GeminiRateLimiter(requests_per_minute=1, queue_timeout_seconds=0.1)
+    await limiter.run(_flaky(0)[0])
+    with pytest.raises(RateLimitExceeded):
+        await limiter.run(_flaky(0)[0])
+    assert limiter.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_at_once():
+    limiter = GeminiRateLimiter(max_queue=0)
+    with pytest.raises(RateLimitExceeded, match="queue is full"):
+        await limiter.run(_flaky(0)[0])
@@ -0,0 +1,73 @@
+import pytest
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal, get_async_db_context
+from app.services.recipe_index import RecipeIndex
+from app.services.recipe_repository import RecipeRepository
+
+
+def _save_recipe(index):
+    """A recipe change committed elsewhere, and the invalidation it causes."""
+    with SessionLocal() as other:
+        RecipeRepository(other).save({
+            "id": "t001", "name": "Test", "category": "protein", "calories": 100,
+            "carbs": 1, "protein": 10, "gi_level": "low", "diabetic_friendly": 1,
+        })
+        other.commit()
+    index.invalidate()
+
+
+class RacingSession:
+    """Session whose first index load is followed by a recipe change."""
+
+    def __init__(self, db, index):
+        self.db, self.index, self.raced = db, index, False
+
+    def execute(self, statement):
+        rows = list(self.db.execute(statement))
+        if not self.raced:
+            self.raced = True
+            _save_recipe(self.index)
+        return rows
+
+
+class AsyncRacingSession(RacingSession):
+    async def execute(self, statement):
+        rows = list(await self.db.execute(statement))
+        if not self.raced:
+            self.raced = True
+            _save_recipe(self.index)
+        return rows
+
+
+def test_load_rejects_rows_read_before_an_invalidation():
+    index = RecipeIndex()
+    generation = index._generation
+    index.invalidate()
+    assert not index.load([], generation)
+    assert not index.is_built
+    assert index.load([])
+
+
+def test_build_racing_a_recipe_change_rebuilds(db):
+    index = RecipeIndex()
+    racing = RacingSession(db, index)
+
+    assert not index.build(racing)
+    assert not index.is_built
+
+    racing.raced = False
+    snapshot = index.ensure_built(racing)
+    assert len(snapshot["rows"]) == db.execute(text("SELECT COUNT(*) FROM recipes")).scalar()
+    assert "t001" in snapshot["id"]
+
+
+@pytest.mark.asyncio
+async def test_async_build_racing_a_recipe_change_rebuilds(async_database):
+    index = RecipeIndex()
+    async with get_async_db_context() as db:
+        snapshot = await index.ensure_built_async(AsyncRacingSession(db, index))
+        count = (await db.execute(text("SELECT COUNT(*) FROM recipes"))).scalar()
+
+    assert len(snapshot["rows"]) == count == 9
+    assert "t001" in snapshot["id"]
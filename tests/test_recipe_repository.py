@@ -0,0 +1,119 @@
+import pytest
+from sqlalchemy import text
+
+from app.database.connection import SessionLocal, get_async_db_context
+from app.services.recipe_index import recipe_index
+from app.services.recipe_repository import AsyncRecipeRepository, RecipeRepository
+
+
+def _recipe(recipe_id, name, carbs=10):
+    return {
+        "id": recipe_id, "name": name, "name_en": name, "category": "vegetable",
+        "calories": 100, "carbs": carbs, "protein": 5, "gi_level": "low", "diabetic_friendly": 1,
+    }
+
+
+def _count(db):
+    return db.execute(text("SELECT COUNT(*) FROM recipes")).scalar()
+
+
+def test_every_commit_refreshes_the_index(db):
+    repo = RecipeRepository(db, use_index=True)
+    repo.search(limit=-1)
+    assert recipe_index.size == _count(db)
+
+    for recipe_id in ("t001", "t002"):
+        repo.save(_recipe(recipe_id, f"Test {recipe_id}"))
+        db.commit()
+        repo.search(limit=-1)
+        assert recipe_index.size == _count(db)
+
+
+def test_rolled_back_save_does_not_notify(db):
+    repo = RecipeRepository(db, use_index=True)
+    repo.search(limit=-1)
+    repo.save(_recipe("t001", "Test"))
+    db.rollback()
+
+    # Nothing left to report: a later commit without saves keeps the snapshot
+    db.commit()
+    assert recipe_index.is_built
+
+
+def test_save_rejects_unknown_columns(db):
+    with pytest.raises(ValueError, match="Unknown recipe column"):
+        RecipeRepository(db).save({"name": "x", "id = 1; DROP TABLE recipes; --": 1})
+    assert _count(db) == 8
+
+
+def test_save_updates_existing_recipe(db):
+    repo = RecipeRepository(db)
+    repo.save({"id": "r002", "carbs": 9})
+    db.commit()
+    assert float(repo.get_by_id("r002")["carbs"]) == 9
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_allergy_exclusion_matches_recipe_names(db, use_index):
+    # The sample recipes have no ingredient lists; their names must still count
+    repo = RecipeRepository(db, use_index=use_index)
+    ids = {r["id"] for r in repo.search(gi_level=None, limit=100, exclude_ingredients=["seafood"])}
+    assert "r005" not in ids  # Pan-seared Salmon
+    assert "r001" in ids
+
+    grouped = repo.search_by_categories(["protein", "soup"], gi_level=None, exclude_ingredients=["fish", "egg"])
+    assert [r["id"] for r in grouped["protein"]] == ["r001"]
+    assert grouped["soup"] == []  # Tomato Egg Drop Soup
+
+
+def test_saved_recipe_names_are_indexed(db):
+    repo = RecipeRepository(db)
+    repo.save(_recipe("t001", "Grilled Tuna Steak"))
+    db.commit()
+    assert "t001" not in {r["id"] for r in repo.search(limit=100, exclude_ingredients=["seafood"])}
+
+    repo.save({"id": "t001", "name": "Grilled Tofu Steak", "name_en": "Grilled Tofu Steak"})
+    db.commit()
+    assert "t001" in {r["id"] for r in repo.search(limit=100, exclude_ingredients=["seafood"])}
+    assert "t001" not in {r["id"] for r in repo.search(limit=100, exclude_ingredients=["soy"])}
+
+
+def _all_pages(fetch, limit=3):
+    pages, cursor = [], None
+    while True:
+        page = fetch(limit=limit, cursor=cursor)
+        pages.append([r["id"] for r in page["recipes"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("use_index", [False, True])
+def test_cursor_pages_cover_the_results_once(db, use_index):
+    repo = RecipeRepository(db, use_index=use_index)
+    pages = _all_pages(lambda **page: repo.search_page(gi_level=None, fields=["summary"], **page))
+
+    assert [len(page) for page in pages] == [3, 3, 2]
+    assert sum(pages, []) == [r["id"] for r in repo.search(gi_level=None, limit=100)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("use_index", [False, True])
+async def test_async_cursor_pages_match_sync(async_database, use_index):
+    async with get_async_db_context() as async_db:
+        repo = AsyncRecipeRepository(async_db, use_index=use_index)
+        pages, cursor = [], None
+        while True:
+            page = await repo.search_page(limit=3, gi_level=None, cursor=cursor)
+            pages.extend(r["id"] for r in page["recipes"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    with SessionLocal() as db:
+        assert pages == [r["id"] for r in RecipeRepository(db).search(gi_level=None, limit=100)]
+
+
+def test_malformed_cursor_is_rejected(db):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        RecipeRepository(db).search_page(cursor="not-a-cursor")
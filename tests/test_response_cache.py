@@ -0,0 +1,39 @@
+from app.services import response_cache
+from app.services.response_cache import ResponseCache, make_cache_key
+
+
+def test_cache_key_ignores_dict_order():
+    assert make_cache_key("plan", {"a": 1, "b": [1, 2]}) == make_cache_key("plan", {"b": [1, 2], "a": 1})
+    assert make_cache_key("plan", {"a": 1}) != make_cache_key("weekly", {"a": 1})
+
+
+def test_hits_return_copies():
+    cache = ResponseCache()
+    cache.set("k", {"tips": ["a"]})
+    cache.get("k")["tips"].append("b")
+    assert cache.get("k") == {"tips": ["a"]}
+    assert cache.get("missing") is None
+    assert cache.stats()["memory_hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_memory_tier_is_bounded_and_expires(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl_seconds=60)
+    for key in ("a", "b", "c"):
+        cache.set(key, key)
+    assert cache.get("a") is None and cache.get("c") == "c"
+
+    now = response_cache.time.time()
+    monkeypatch.setattr(response_cache.time, "time", lambda: now + 61)
+    assert cache.get("c") is None
+
+
+def test_disk_tier_outlives_the_process_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(sqlite_path=path).set("k", {"message": "hi"})
+
+    cache = ResponseCache(sqlite_path=path)
+    assert cache.get("k") == {"message": "hi"}
+    assert cache.stats()["disk_hits"] == 1
+
+    cache.clear()
+    assert ResponseCache(sqlite_path=path).get("k") is None
@@ -0,0 +1,120 @@
+import json
+import threading
+
+import pytest
+
+from app.api import routes
+from app.database.connection import get_db_context
+from app.models.user import UserProfileRequest
+from app.services.session_backend import SQLSessionBackend
+from app.services.session_store import SessionStore
+
+
+PROFILE = {"height_cm": 170, "weight_kg": 70, "activity_level": 2, "diabetic_type": "type2"}
+
+
+class OffLoopBackend(SQLSessionBackend):
+    """SQL backend that records the calls made on the event loop's thread."""
+
+    def __init__(self):
+        super().__init__(get_db_context)
+        self.calls_on_loop = []
+
+    def _record(self, name):
+        if threading.current_thread() is threading.main_thread():
+            self.calls_on_loop.append(name)
+
+    def save_profile(self, *args, **kwargs):
+        self._record("save_profile")
+        return super().save_profile(*args, **kwargs)
+
+    def load_profile(self, *args, **kwargs):
+        self._record("load_profile")
+        return super().load_profile(*args, **kwargs)
+
+    def append_messages(self, *args, **kwargs):
+        self._record("append_messages")
+        return super().append_messages(*args, **kwargs)
+
+    def load_messages(self, *args, **kwargs):
+        self._record("load_messages")
+        return super().load_messages(*args, **kwargs)
+
+    def count_messages(self, *args, **kwargs):
+        self._record("count_messages")
+        return super().count_messages(*args, **kwargs)
+
+    def clear_messages(self, *args, **kwargs):
+        self._record("clear_messages")
+        return super().clear_messages(*args, **kwargs)
+
+    def register_profiles(self, *args, **kwargs):
+        self._record("register_profiles")
+        return super().register_profiles(*args, **kwargs)
+
+
+@pytest.fixture
+def store(db, monkeypatch):
+    """Route-level session store on the SQL backend, as with several workers."""
+    store = SessionStore(OffLoopBackend())
+    monkeypatch.setattr(routes, "session_store", store)
+    return store
+
+
+@pytest.mark.asyncio
+async def test_agent_picks_up_turns_stored_by_another_worker(store):
+    await routes.register_user(UserProfileRequest(user_id="u1", **PROFILE))
+    session = await routes._get_session("u1")
+    agent = await routes._get_conversation_agent("u1", session)
+    assert session["synced_messages"] == 0
+
+    # Another worker stores a turn; this one notices before its next turn
+    store.backend.append_messages("u1", [("user", "hi"), ("assistant", "hello")])
+    assert await routes._get_conversation_agent("u1", session) is agent
+    assert session["synced_messages"] == 2
+    assert len(agent.chat.history) == 4
+
+    await routes._store_turn("u1", session, "lunch?", "Try the salad.")
+    assert session["synced_messages"] == 4
+    assert len(store.backend.load_messages("u1")) == 4
+
+
+@pytest.mark.asyncio
+async def test_backend_calls_stay_off_the_event_loop(store, monkeypatch):
+    await routes.register_user(UserProfileRequest(user_id="u1", **PROFILE))
+
+    # A worker without the live session rebuilds it from the backend
+    monkeypatch.setattr(routes, "session_store", SessionStore(store.backend))
+    session = await routes._get_session("u1")
+    await routes._get_conversation_agent("u1", session)
+    await routes._store_turn("u1", session, "hi", "hello")
+    await routes.get_health_metrics("u1")
+    await routes.reset_chat("u1")
+
+    assert store.backend.calls_on_loop == []
+
+
+@pytest.mark.asyncio
+async def test_batch_registration_replaces_live_sessions(store, monkeypatch):
+    monkeypatch.setattr(routes.settings, "register_batch_chunk_size", 2)
+    await routes.register_user(UserProfileRequest(user_id="u1", **PROFILE))
+    session = await routes._get_session("u1")
+    store.backend.append_messages("u1", [("user", "hi")])
+    store.backend.calls_on_loop.clear()
+
+    profiles = [UserProfileRequest(user_id="u1", **{**PROFILE, "weight_kg": 90})] + [
+        UserProfileRequest(user_id=f"u{i}", **PROFILE) for i in range(2, 5)
+    ]
+    response = await routes.register_users_batch(profiles)
+    lines = [json.loads(line) async for line in response.body_iterator]
+
+    assert [line["index"] for line in lines] == [0, 1, 2, 3]
+    assert [line["user_id"] for line in lines] == ["u1", "u2", "u3", "u4"]
+    assert store.backend.calls_on_loop == []
+
+    # The live session with the old metrics is gone; the next request sees the new profile
+    assert store.get("u1") is None
+    rebuilt = await routes._get_session("u1")
+    assert rebuilt is not session and rebuilt["profile"].weight_kg == 90
+    assert rebuilt["metrics"].daily_calories == lines[0]["health_metrics"]["daily_calories"]
+    assert store.backend.load_messages("u1") == []
@@ -0,0 +1,154 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import fakeredis
+from sqlalchemy import text
+
+from app.database.connection import get_db_context
+from app.models.user import UserProfileRequest
+from app.services import session_backend
+from app.services.health_calculator import HealthCalculator
+from app.services.session_backend import MemorySessionBackend, RedisSessionBackend, SQLSessionBackend
+
+
+def _profile(weight_kg=70.0, allergies=None):
+    return UserProfileRequest(
+        height_cm=170, weight_kg=weight_kg, activity_level=2, diabetic_type="type2",
+        allergies=allergies or []
+    )
+
+
+# Redis, against an in-process stand-in
+
+def test_redis_profile_round_trip():
+    backend = RedisSessionBackend(fakeredis.FakeRedis())
+    assert backend.load_profile("u1") is None
+
+    backend.save_profile("u1", _profile(allergies=["seafood"]))
+    loaded = backend.load_profile("u1")
+    assert loaded.weight_kg == 70 and loaded.allergies == ["seafood"]
+
+
+def test_redis_messages():
+    backend = RedisSessionBackend(fakeredis.FakeRedis())
+    backend.append_messages("u1", [("user", "hi"), ("assistant", "hello")])
+    backend.append_messages("u1", [("user", "lunch?")])
+
+    assert backend.count_messages("u1") == 3
+    assert [m["content"] for m in backend.load_messages("u1")] == ["hi", "hello", "lunch?"]
+    backend.clear_messages("u1")
+    assert backend.load_messages("u1") == []
+
+
+def test_redis_keys_expire_and_reads_refresh_them():
+    client = fakeredis.FakeRedis()
+    backend = RedisSessionBackend(client, ttl_seconds=100)
+    backend.save_profile("u1", _profile())
+    backend.append_messages("u1", [("user", "hi")])
+    assert 0 < client.ttl("diabeatit:profile:u1") <= 100
+    assert 0 < client.ttl("diabeatit:chat:u1") <= 100
+
+    client.expire("diabeatit:profile:u1", 5)
+    backend.load_profile("u1")
+    assert client.ttl("diabeatit:profile:u1") > 5
+
+    short = RedisSessionBackend(client, prefix="short", ttl_seconds=1)
+    short.save_profile("u1", _profile())
+    time.sleep(1.1)
+    assert short.load_profile("u1") is None
+
+
+def test_redis_without_ttl_keeps_keys():
+    client = fakeredis.FakeRedis()
+    RedisSessionBackend(client).save_profile("u1", _profile())
+    assert client.ttl("diabeatit:profile:u1") == -1
+
+
+# Memory
+
+def test_memory_backend_keeps_no_messages():
+    backend = MemorySessionBackend()
+    backend.append_messages("u1", [("user", "hi")])
+    assert not backend.stores_messages
+    assert backend.load_messages("u1") == [] and backend.count_messages("u1") == 0
+
+
+def test_memory_backend_bounds_profiles(monkeypatch):
+    backend = MemorySessionBackend(max_profiles=2, ttl_seconds=60)
+    for user_id in ("u1", "u2", "u3"):
+        backend.save_profile(user_id, _profile())
+    assert backend.load_profile("u1") is None
+    assert backend.load_profile("u3") is not None
+
+    now = time.monotonic()
+    monkeypatch.setattr(session_backend.time, "monotonic", lambda: now + 61)
+    assert backend.load_profile("u3") is None
+
+
+# SQL
+
+def test_sql_concurrent_saves_leave_one_row(db):
+    backend = SQLSessionBackend(get_db_context)
+    profile = _profile()
+    metrics = HealthCalculator.calculate(profile)
+    errors = []
+
+    def save():
+        try:
+            backend.save_profile("u1", profile, metrics)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    for table in ("users", "user_health_profiles", "user_preferences"):
+        assert db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() == 1
+
+    backend.save_profile("u1", _profile(weight_kg=80))
+    assert backend.load_profile("u1").weight_kg == 80
+
+
+def test_sql_messages_keep_their_order(db):
+    backend = SQLSessionBackend(get_db_context)
+    backend.save_profile("u1", _profile())
+    for turn in range(5):
+        backend.append_messages("u1", [("user", f"q{turn}"), ("assistant", f"a{turn}")])
+
+    assert backend.count_messages("u1") == 10
+    assert [m["content"] for m in backend.load_messages("u1")] == [
+        content for turn in range(5) for content in (f"q{turn}", f"a{turn}")
+    ]
+
+
+def test_sql_register_profiles_in_one_transaction(db):
+    sessions = []
+
+    @contextmanager
+    def counting_context():
+        sessions.append(1)
+        with get_db_context() as session:
+            yield session
+
+    backend = SQLSessionBackend(counting_context)
+    backend.save_profile("u1", _profile())
+    backend.append_messages("u1", [("user", "hi")])
+    sessions.clear()
+
+    # u2 listed twice: the later registration wins
+    profiles = [("u1", _profile(weight_kg=90, allergies=["nuts"])), ("u2", _profile()), ("u2", _profile(weight_kg=60))]
+    backend.register_profiles([
+        (user_id, profile, HealthCalculator.calculate(profile)) for user_id, profile in profiles
+    ])
+
+    assert len(sessions) == 1
+    assert backend.load_profile("u1").weight_kg == 90 and backend.load_profile("u1").allergies == ["nuts"]
+    assert backend.load_profile("u2").weight_kg == 60
+    assert backend.load_messages("u1") == []
+    for table in ("users", "user_health_profiles", "user_preferences"):
+        assert db.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() == 2